@@ -0,0 +1,244 @@
+"""
+Benchmark der Verarbeitungspipeline auf synthetischen Rohdaten.
+
+Für jede Größe (Unfälle je Jahr, z. B. 10 Tsd. bis 10 Mio.) werden zunächst
+synthetische Rohdaten erzeugt (siehe synthetic.py, wiederverwendet, falls
+bereits vorhanden). Danach werden die einzelnen Schritte der Pipeline
+gemessen:
+
+    read_csv_auto, clean_coordinates, create_geodataframe, filter_by_boundaries
+        – die Einzelschritte auf der ganzen Datei
+    process_year – der tatsächliche Weg in main.py (typisiert, blockweise, Bounding Box)
+    export_all – Parquet, CSV, GeoJSON, Würfel, Kacheln und Heatmaps
+    load_cube, batch_analysis, find_hotspots – die Auswertungen
+
+Jede Größe läuft in einem eigenen Prozess, damit der maximale Speicherbedarf
+(Peak RSS) nicht von der vorherigen Größe verfälscht wird. Das Ergebnis wird
+als JSON geschrieben: Sekunden und Zeilen pro Sekunde je Schritt sowie den
+Peak RSS bisher im Prozess am Ende des Schritts ("process_peak_rss_mb"; kein
+Wert des einzelnen Schritts, da ru_maxrss nur den Höchststand kennt).
+Mit --baseline wird es mit einem früheren Ergebnis verglichen: Ist ein Schritt
+um mehr als --tolerance langsamer geworden, endet das Skript mit Exit-Code 1.
+
+Aufruf (aus dem Projektverzeichnis):
+    python benchmarks/pipeline.py --rows 10000 100000 1000000 --out benchmark.json
+    python benchmarks/pipeline.py --rows 1000000 --baseline benchmark.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJEKT_DIR = os.path.dirname(BENCHMARK_DIR)
+SRC_DIR = os.path.join(PROJEKT_DIR, "src")
+BEZIRKE_FILE = os.path.join(PROJEKT_DIR, "data", "raw", "Stadtbezirke_Leipzig_UTM33N.json")
+
+sys.path.insert(0, SRC_DIR)
+
+import synthetic  # noqa: E402
+
+# Standardgrößen (Unfälle je Jahr); bundesweit sind es etwa 270.000 pro Jahr
+GROESSEN = [10_000, 100_000, 1_000_000]
+
+# Erlaubte Verlangsamung gegenüber der Baseline (0.2 = 20 % weniger Zeilen/s)
+TOLERANZ = 0.2
+
+# Kürzere Schritte schwanken zu stark für einen Vergleich
+MIN_SEKUNDEN = 0.1
+
+
+def process_peak_rss_mb():
+    """Maximaler Speicherbedarf des Prozesses bisher in MB (None ohne resource-Modul)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux liefert KB, macOS Bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class Messung:
+    """Sammelt die Laufzeiten der Schritte; mehrere Aufrufe je Schritt werden summiert."""
+
+    def __init__(self):
+        self.schritte = {}
+
+    def __call__(self, name, zeilen, funktion, *args, **kwargs):
+        start = time.perf_counter()
+        ergebnis = funktion(*args, **kwargs)
+        dauer = time.perf_counter() - start
+
+        schritt = self.schritte.setdefault(name, {"seconds": 0.0, "rows": 0})
+        schritt["seconds"] += dauer
+        schritt["rows"] += zeilen
+        schritt["rows_per_s"] = round(schritt["rows"] / schritt["seconds"]) if schritt["rows"] else None
+        schritt["process_peak_rss_mb"] = process_peak_rss_mb()
+        print(f"  ✓ {name}: {dauer:.2f} s ({zeilen} Zeilen)", file=sys.stderr)
+        return ergebnis
+
+
+def run_size(rows, years, work_dir, bezirke_file, seed=0, leipzig_anteil=synthetic.LEIPZIG_ANTEIL):
+    """
+    Misst alle Schritte für eine Größe (läuft in einem eigenen Prozess).
+
+    Ausgaben der Pipeline gehen nach stderr, stdout bleibt für das JSON frei.
+
+    Returns:
+        dict: {'rows', 'years', 'leipzig_rows', 'stages', 'process_peak_rss_mb'}
+    """
+    with contextlib.redirect_stdout(sys.stderr):
+        return _run_size(rows, years, work_dir, bezirke_file, seed, leipzig_anteil)
+
+
+def _run_size(rows, years, work_dir, bezirke_file, seed, leipzig_anteil):
+    # Projektmodule erst hier laden, damit sie im Messprozess importiert werden
+    import pandas as pd
+    import aggregate_cube
+    import batch_analysis
+    import data_processing as dp
+    import density
+    import export_handlers as exp
+    import hotspots
+
+    raw_dir = os.path.join(work_dir, f"raw_{rows}")
+    processed_dir = os.path.join(work_dir, f"processed_{rows}")
+    for unterordner in ["csv", "geojson"]:
+        os.makedirs(os.path.join(processed_dir, unterordner), exist_ok=True)
+
+    start = time.perf_counter()
+    synthetic.generate(raw_dir, rows, years, seed, leipzig_anteil)
+    print(f"✓ {rows} Zeilen je Jahr bereit ({time.perf_counter() - start:.1f} s)", file=sys.stderr)
+
+    messen = Messung()
+    gdf_leipzig = dp.load_bezirke(bezirke_file)
+    locator = messen("district_locator", 0, dp.DistrictLocator, gdf_leipzig)
+
+    # Einzelschritte auf der ganzen Datei (wie ursprünglich in process_year)
+    for year in years:
+        path = synthetic.raw_path(raw_dir, year)
+        df = messen("read_csv_auto", rows, dp.read_csv_auto, path)
+        df = messen("clean_coordinates", rows, dp.clean_coordinates, df)
+        gdf_points = messen("create_geodataframe", rows, dp.create_geodataframe, df)
+        messen("filter_by_boundaries", rows, dp.filter_by_boundaries, gdf_points, gdf_leipzig, locator)
+        del df, gdf_points
+
+    # Der Weg, den main.py tatsächlich nimmt
+    all_results = [messen("process_year", rows, dp.process_year, year, raw_dir, gdf_leipzig, locator)
+                   for year in years]
+    leipzig_rows = sum(result["count"] for result in all_results)
+
+    messen("export_all", leipzig_rows, exp.export_all, all_results, processed_dir,
+           write_tiles=True, heatmap_raster=density.raster_from_boundaries(gdf_leipzig))
+
+    # Auswertungen
+    cube = messen("load_cube", leipzig_rows,
+                  lambda: aggregate_cube.add_jahreszeit(aggregate_cube.load_cube(processed_dir)))
+    messen("batch_analysis", leipzig_rows, batch_analysis.run, list(batch_analysis.AUSWERTUNGEN), cube,
+           os.path.join(processed_dir, "results"))
+    unfaelle = pd.concat([result["gdf_filtered"] for result in all_results])
+    messen("find_hotspots", leipzig_rows, hotspots.find_hotspots, unfaelle)
+
+    return {
+        "rows": rows,
+        "years": list(years),
+        "leipzig_rows": leipzig_rows,
+        "stages": messen.schritte,
+        "process_peak_rss_mb": process_peak_rss_mb(),
+    }
+
+
+def _git_commit():
+    """Aktueller Commit (für die Zuordnung der Ergebnisse), None außerhalb von git."""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJEKT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(ergebnis, baseline, toleranz=TOLERANZ):
+    """
+    Vergleicht die Durchsätze mit einem früheren Ergebnis.
+
+    Returns:
+        list: Meldungen für Schritte, die um mehr als `toleranz` langsamer sind
+            (Schritte unter MIN_SEKUNDEN werden nicht verglichen)
+    """
+    alt = {lauf["rows"]: lauf["stages"] for lauf in baseline.get("runs", [])}
+    meldungen = []
+    for lauf in ergebnis["runs"]:
+        for name, schritt in lauf["stages"].items():
+            vorher = alt.get(lauf["rows"], {}).get(name, {}).get("rows_per_s")
+            jetzt = schritt.get("rows_per_s")
+            if schritt["seconds"] < MIN_SEKUNDEN:
+                continue
+            if vorher and jetzt and jetzt < vorher * (1 - toleranz):
+                meldungen.append(f"{name} ({lauf['rows']} Zeilen): {jetzt} statt {vorher} Zeilen/s")
+    return meldungen
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark der Pipeline auf synthetischen Daten")
+    parser.add_argument("--rows", nargs="+", type=int, default=GROESSEN,
+                        help="Unfälle je Jahr, eine Messung je Größe (Standard: 10000 100000 1000000)")
+    parser.add_argument("--years", nargs="+", type=int, default=[2024], choices=sorted(synthetic.SPALTEN_JE_JAHR),
+                        metavar="JAHR", help="Jahrgänge (bestimmen die Spalten, Standard: 2024)")
+    parser.add_argument("--work-dir", default=os.path.join(tempfile.gettempdir(), "unfaelle_benchmark"),
+                        help="Verzeichnis für Rohdaten und Ergebnisse (Rohdaten werden wiederverwendet)")
+    parser.add_argument("--bezirke", default=BEZIRKE_FILE, help="GeoJSON der Stadtbezirke")
+    parser.add_argument("--seed", type=int, default=0, help="Startwert des Zufallsgenerators")
+    parser.add_argument("--leipzig-share", type=float, default=synthetic.LEIPZIG_ANTEIL,
+                        help=f"Anteil der Unfälle um Leipzig (Standard: {synthetic.LEIPZIG_ANTEIL})")
+    parser.add_argument("--out", default="-", help="JSON-Ergebnisdatei (Standard: Ausgabe auf stdout)")
+    parser.add_argument("--baseline", help="Früheres Ergebnis zum Vergleich")
+    parser.add_argument("--tolerance", type=float, default=TOLERANZ,
+                        help=f"Erlaubte Verlangsamung gegenüber der Baseline (Standard: {TOLERANZ})")
+    args = parser.parse_args(argv)
+
+    ergebnis = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "runs": [],
+    }
+    for rows in args.rows:
+        print(f"\nGröße: {rows} Unfälle je Jahr", file=sys.stderr)
+        # Eigener Prozess je Größe, damit Peak RSS nur diese Größe misst
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            ergebnis["runs"].append(executor.submit(
+                run_size, rows, args.years, args.work_dir, args.bezirke, args.seed, args.leipzig_share
+            ).result())
+
+    text = json.dumps(ergebnis, indent=2, ensure_ascii=False)
+    if args.out == "-":
+        print(text)
+    else:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"✓ Ergebnis: {args.out}", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            meldungen = compare(ergebnis, json.load(f), args.tolerance)
+        for meldung in meldungen:
+            print(f"✗ langsamer: {meldung}", file=sys.stderr)
+        if meldungen:
+            return 1
+        print("✓ Keine Verschlechterung gegenüber der Baseline", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
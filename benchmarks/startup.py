@@ -0,0 +1,121 @@
+"""
+Misst den Start von main.py bis zum Menü.
+
+Das Skript startet main.py mehrmals mit `python -X importtime`, misst die Zeit
+bis zur Eingabeaufforderung des Menüs und beendet das Programm dann mit "q".
+Es schlägt fehl (Exit-Code 1), wenn der Median über dem Grenzwert liegt oder
+vor dem Menü schwere Pakete (pandas, geopandas, matplotlib, ...) geladen werden.
+
+Voraussetzung: Die verarbeiteten Daten und alle Exporte (CSV, GeoJSON,
+Kacheln, Heatmaps) sind aktuell, sonst misst man die Verarbeitung. Deshalb
+läuft vor der Messung einmal main.py mit denselben Argumenten wie die
+Messung und wird am Menü mit "q" beendet.
+
+Aufruf (aus dem Projektverzeichnis):
+    python benchmarks/startup.py
+    python benchmarks/startup.py --runs 10 --limit-ms 200 --src /pfad/zu/src
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src")
+
+# Text der Menü-Eingabeaufforderung (siehe main.input_user)
+PROMPT = "Bitte Auswahl eingeben".encode("utf-8")
+
+# Pakete, die erst geladen werden dürfen, wenn eine Auswertung sie braucht
+SCHWERE_PAKETE = ["pandas", "geopandas", "matplotlib", "pyarrow", "shapely", "pyproj", "numpy"]
+
+
+def _importtime(stderr):
+    """
+    Wertet die Ausgabe von `-X importtime` aus.
+
+    Returns:
+        dict: Modul der obersten Ebene -> kumulierte Importzeit in ms
+    """
+    module = {}
+    for zeile in stderr.decode("utf-8", "replace").splitlines():
+        if not zeile.startswith("import time:") or "|" not in zeile:
+            continue
+        _, kumuliert, name = zeile[len("import time:"):].split("|")
+        if not kumuliert.strip().isdigit() or name.startswith("  "):
+            continue
+        module[name.strip()] = int(kumuliert) / 1000
+    return module
+
+
+def measure(src_dir, args):
+    """
+    Startet main.py einmal und misst die Zeit bis zum Menü.
+
+    Returns:
+        tuple: (Sekunden bis zum Menü, Importzeiten der obersten Ebene)
+    """
+    start = time.perf_counter()
+    prozess = subprocess.Popen(
+        [sys.executable, "-X", "importtime", "main.py"] + args,
+        cwd=src_dir, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+
+    # stdout lesen, bis die Eingabeaufforderung erscheint (input() leert den Puffer)
+    ausgabe = b""
+    while PROMPT not in ausgabe:
+        block = os.read(prozess.stdout.fileno(), 4096)
+        if not block:
+            break
+        ausgabe += block
+    dauer = time.perf_counter() - start
+
+    _, stderr = prozess.communicate(b"q\n")
+    if PROMPT not in ausgabe:
+        raise RuntimeError(f"Menü wurde nicht angezeigt:\n{stderr.decode('utf-8', 'replace')}")
+    return dauer, _importtime(stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Startzeit von main.py bis zum Menü")
+    parser.add_argument("--src", default=SRC_DIR, help="Verzeichnis mit main.py")
+    parser.add_argument("--runs", type=int, default=5, help="Anzahl Messungen (Standard: 5)")
+    parser.add_argument("--limit-ms", type=float, default=200, help="Grenzwert für den Median")
+    parser.add_argument("--top", type=int, default=10, help="Anzahl angezeigter Importe")
+    args, main_args = parser.parse_known_args(argv)
+    src_dir = os.path.abspath(args.src)
+
+    # Daten und Exporte einmal auf den aktuellen Stand bringen (Warmstart messen);
+    # derselbe Aufruf wie bei der Messung, damit auch dieselben Exporte entstehen
+    subprocess.run([sys.executable, "main.py"] + main_args, cwd=src_dir, input=b"q\n",
+                   stdout=subprocess.DEVNULL, check=True)
+
+    zeiten, importe = [], {}
+    for _ in range(args.runs):
+        dauer, importe = measure(src_dir, main_args)
+        zeiten.append(dauer * 1000)
+
+    median = statistics.median(zeiten)
+    print(f"Start bis Menü: Median {median:.0f} ms "
+          f"(min {min(zeiten):.0f} ms, max {max(zeiten):.0f} ms, {args.runs} Läufe)")
+    print(f"Importe (letzter Lauf, kumuliert): {sum(importe.values()):.0f} ms")
+    for name, ms in sorted(importe.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {ms:7.1f} ms  {name}")
+
+    fehler = []
+    geladen = [paket for paket in SCHWERE_PAKETE if paket in importe]
+    if geladen:
+        fehler.append(f"schwere Pakete vor dem Menü geladen: {', '.join(geladen)}")
+    if median > args.limit_ms:
+        fehler.append(f"Median {median:.0f} ms über dem Grenzwert von {args.limit_ms:.0f} ms")
+
+    for meldung in fehler:
+        print(f"✗ {meldung}")
+    if not fehler:
+        print("✓ Startzeit in Ordnung")
+    return 1 if fehler else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
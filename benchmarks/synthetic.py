@@ -0,0 +1,256 @@
+"""
+Erzeugt synthetische Unfallatlas-Rohdaten (Unfallorte{Jahr}_LinRef.csv) für Benchmarks.
+
+Die Dateien entsprechen dem Aufbau der echten Downloads des Statistischen
+Bundesamts: Semikolon als Trennzeichen, Dezimalkomma in den Koordinaten und
+die je Jahrgang unterschiedlichen Spalten (OBJECTID/OID_, IstSonstig/IstSonstige,
+STRZUSTAND/IstStrassenzustand, ...). Die Unfälle sind über ganz Deutschland
+verteilt, ein kleiner Anteil liegt in und um Leipzig – teils gehäuft, damit
+auch die Schwerpunktsuche etwas zu tun hat.
+
+Aufruf (aus dem Projektverzeichnis):
+    python benchmarks/synthetic.py --rows 1000000 --years 2023 2024 --out-dir /tmp/unfaelle
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from pyproj import Transformer
+
+# Spalten der Rohdateien je Jahrgang (in der Reihenfolge der Originaldateien)
+SPALTEN_2016 = [
+    "FID", "OBJECTID", "ULAND", "UREGBEZ", "UKREIS", "UGEMEINDE", "UJAHR", "UMONAT", "USTUNDE",
+    "UWOCHENTAG", "UKATEGORIE", "UART", "UTYP1", "ULICHTVERH", "IstStrasse", "IstRad", "IstPKW",
+    "IstFuss", "IstKrad", "IstGkfz", "IstSonstig", "LINREFX", "LINREFY", "XGCSWGS84", "YGCSWGS84"
+]
+SPALTEN_JE_JAHR = {
+    2016: SPALTEN_2016,
+    2017: [
+        "OBJECTID", "UIDENTSTLA", "ULAND", "UREGBEZ", "UKREIS", "UGEMEINDE", "UJAHR", "UMONAT",
+        "USTUNDE", "UWOCHENTAG", "UKATEGORIE", "UART", "UTYP1", "IstRad", "IstPKW", "IstFuss",
+        "IstKrad", "IstSonstig", "LICHT", "STRZUSTAND", "LINREFX", "LINREFY", "XGCSWGS84", "YGCSWGS84"
+    ],
+    2018: [
+        "OBJECTID_1", "ULAND", "UREGBEZ", "UKREIS", "UGEMEINDE", "UJAHR", "UMONAT", "USTUNDE",
+        "UWOCHENTAG", "UKATEGORIE", "UART", "UTYP1", "ULICHTVERH", "IstRad", "IstPKW", "IstFuss",
+        "IstKrad", "IstGkfz", "IstSonstig", "STRZUSTAND", "LINREFX", "LINREFY", "XGCSWGS84", "YGCSWGS84"
+    ],
+    2019: [
+        "OBJECTID", "ULAND", "UREGBEZ", "UKREIS", "UGEMEINDE", "UJAHR", "UMONAT", "USTUNDE",
+        "UWOCHENTAG", "UKATEGORIE", "UART", "UTYP1", "ULICHTVERH", "IstRad", "IstPKW", "IstFuss",
+        "IstKrad", "IstGkfz", "IstSonstige", "LINREFX", "LINREFY", "XGCSWGS84", "YGCSWGS84", "STRZUSTAND"
+    ],
+    2020: [
+        "OBJECTID", "UIDENTSTLAE", "ULAND", "UREGBEZ", "UKREIS", "UGEMEINDE", "UJAHR", "UMONAT",
+        "USTUNDE", "UWOCHENTAG", "UKATEGORIE", "UART", "UTYP1", "ULICHTVERH", "IstRad", "IstPKW",
+        "IstFuss", "IstKrad", "IstGkfz", "IstSonstige", "LINREFX", "LINREFY", "XGCSWGS84", "YGCSWGS84",
+        "STRZUSTAND"
+    ],
+    2021: [
+        "OID_", "ULAND", "UREGBEZ", "UKREIS", "UGEMEINDE", "UJAHR", "UMONAT", "USTUNDE", "UWOCHENTAG",
+        "UKATEGORIE", "UART", "UTYP1", "IstRad", "IstPKW", "IstFuss", "IstKrad", "IstSonstige",
+        "ULICHTVERH", "IstGkfz", "LINREFX", "LINREFY", "XGCSWGS84", "YGCSWGS84", "UIDENTSTLAE",
+        "IstStrassenzustand"
+    ],
+    2022: [
+        "OBJECTID", "UIDENTSTLAE", "ULAND", "UREGBEZ", "UKREIS", "UGEMEINDE", "UJAHR", "UMONAT",
+        "USTUNDE", "UWOCHENTAG", "UKATEGORIE", "UART", "UTYP1", "ULICHTVERH", "IstStrassenzustand",
+        "IstRad", "IstPKW", "IstFuss", "IstKrad", "IstGkfz", "IstSonstige", "LINREFX", "LINREFY",
+        "XGCSWGS84", "YGCSWGS84"
+    ],
+}
+SPALTEN_JE_JAHR[2023] = (
+    ["OID_"] + SPALTEN_JE_JAHR[2022][1:] + ["PLST"]
+)
+SPALTEN_JE_JAHR[2024] = SPALTEN_JE_JAHR[2023]
+
+# Ab diesem Jahrgang stehen Monat, Stunde und Gemeinde ohne führende Nullen in der Datei
+OHNE_NULLEN_AB = 2024
+
+# Bounding Boxes in WGS84 (min_x, min_y, max_x, max_y)
+DEUTSCHLAND = (5.87, 47.27, 15.04, 55.06)
+LEIPZIG = (12.23, 51.23, 12.55, 51.45)
+
+# Anteil der Unfälle in der Bounding Box von Leipzig (bundesweit etwa 1 %)
+LEIPZIG_ANTEIL = 0.01
+
+# Anteil der Leipziger Unfälle, die sich um wenige Kreuzungen häufen
+HAEUFUNG_ANTEIL = 0.3
+HAEUFUNG_STREUUNG = 0.0002   # etwa 15-20 m in Grad
+
+# Zeilen je geschriebenem Block (begrenzt den Speicherbedarf bei 10 Mio. Zeilen)
+BLOCK = 1_000_000
+
+# Wahrscheinlichkeiten der Unfallkategorien (1 = Getötete, 2 = Schwer-, 3 = Leichtverletzte)
+KATEGORIE_P = [0.01, 0.17, 0.82]
+
+# Wahrscheinlichkeit, dass ein Verkehrsmittel beteiligt ist
+BETEILIGUNG_P = {"IstRad": 0.3, "IstPKW": 0.75, "IstFuss": 0.08, "IstKrad": 0.09, "IstGkfz": 0.05,
+                 "IstSonstig": 0.06, "IstSonstige": 0.06}
+
+INFO_NAME = "synthetic.json"
+
+_LINREF = Transformer.from_crs("EPSG:4326", "EPSG:25832", always_xy=True)
+
+
+def raw_path(out_dir, year):
+    """Pfad der Rohdatei eines Jahres (wie in data/raw)."""
+    return os.path.join(out_dir, f"Unfallorte{year}_LinRef.csv")
+
+
+def _koordinaten(rng, n, leipzig_anteil):
+    """Bundesweit gleichverteilte Punkte, ein Anteil davon in Leipzig (teils gehäuft)."""
+    xs = rng.uniform(DEUTSCHLAND[0], DEUTSCHLAND[2], n)
+    ys = rng.uniform(DEUTSCHLAND[1], DEUTSCHLAND[3], n)
+
+    leipzig = np.flatnonzero(rng.random(n) < leipzig_anteil)
+    xs[leipzig] = rng.uniform(LEIPZIG[0], LEIPZIG[2], len(leipzig))
+    ys[leipzig] = rng.uniform(LEIPZIG[1], LEIPZIG[3], len(leipzig))
+
+    # Häufungen: Punkte um einige feste Kreuzungen streuen
+    gehaeuft = leipzig[rng.random(len(leipzig)) < HAEUFUNG_ANTEIL]
+    if len(gehaeuft):
+        zentren = np.random.default_rng(0).uniform(LEIPZIG[:2], LEIPZIG[2:], (200, 2))
+        wahl = zentren[rng.integers(0, len(zentren), len(gehaeuft))]
+        xs[gehaeuft] = wahl[:, 0] + rng.normal(0, HAEUFUNG_STREUUNG, len(gehaeuft))
+        ys[gehaeuft] = wahl[:, 1] + rng.normal(0, HAEUFUNG_STREUUNG, len(gehaeuft))
+    return xs, ys, leipzig
+
+
+def _codes(werte, breite, mit_nullen):
+    """Ganzzahl-Codes als Text, auf Wunsch mit führenden Nullen ("04")."""
+    if not mit_nullen:
+        return werte
+    texte = np.array([str(i).zfill(breite) for i in range(werte.max() + 1)], dtype=object)
+    return texte[werte]
+
+
+def generate_block(rng, year, start, n, leipzig_anteil=LEIPZIG_ANTEIL):
+    """
+    Erzeugt n Unfälle eines Jahres als DataFrame mit den Spalten des Jahrgangs.
+
+    Args:
+        rng (np.random.Generator): Zufallsgenerator
+        year (int): Unfalljahr (bestimmt die Spalten, siehe SPALTEN_JE_JAHR)
+        start (int): Laufende Nummer des ersten Unfalls (für die Kennungen)
+        n (int): Anzahl Unfälle
+        leipzig_anteil (float): Anteil der Unfälle in der Bounding Box von Leipzig
+
+    Returns:
+        pd.DataFrame: Unfälle mit numerischen Koordinaten (Komma erst beim Schreiben)
+    """
+    mit_nullen = year < OHNE_NULLEN_AB
+    xs, ys, leipzig = _koordinaten(rng, n, leipzig_anteil)
+    linref_x, linref_y = _LINREF.transform(xs, ys)
+
+    uland = rng.integers(1, 17, n)
+    uregbez = rng.integers(0, 5, n)
+    ukreis = rng.integers(1, 80, n)
+    ugemeinde = rng.integers(0, 400, n)
+    uland[leipzig], uregbez[leipzig], ukreis[leipzig], ugemeinde[leipzig] = 14, 7, 13, 0
+
+    monat = rng.integers(1, 13, n)
+    kennung = start + np.arange(n, dtype=np.int64)
+    unfall_id = (uland.astype(np.uint64) * 10**18 + (year % 100) * 10**16
+                 + rng.integers(0, 10**16, n, dtype=np.int64).astype(np.uint64))
+
+    spalten = {
+        "FID": kennung, "OBJECTID": kennung + 1, "OBJECTID_1": kennung + 1, "OID_": kennung + 1,
+        "UIDENTSTLA": unfall_id, "UIDENTSTLAE": unfall_id,
+        "ULAND": _codes(uland, 2, True),
+        "UREGBEZ": uregbez,
+        "UKREIS": _codes(ukreis, 2, True),
+        "UGEMEINDE": _codes(ugemeinde, 3, mit_nullen),
+        "UJAHR": np.full(n, year),
+        "UMONAT": _codes(monat, 2, mit_nullen),
+        "USTUNDE": _codes(rng.integers(0, 24, n), 2, mit_nullen),
+        "UWOCHENTAG": rng.integers(1, 8, n),
+        "UKATEGORIE": rng.choice([1, 2, 3], n, p=KATEGORIE_P),
+        "UART": rng.integers(0, 10, n),
+        "UTYP1": rng.integers(1, 8, n),
+        "ULICHTVERH": rng.integers(0, 3, n),
+        "LICHT": rng.integers(0, 3, n),
+        "STRZUSTAND": rng.integers(0, 3, n),
+        "IstStrasse": rng.integers(0, 3, n),
+        "IstStrassenzustand": rng.integers(0, 3, n),
+        "PLST": rng.integers(0, 2, n),
+        "LINREFX": linref_x,
+        "LINREFY": linref_y,
+        "XGCSWGS84": xs,
+        "YGCSWGS84": ys,
+    }
+    for spalte, p in BETEILIGUNG_P.items():
+        spalten[spalte] = (rng.random(n) < p).astype(np.uint8)
+
+    return pd.DataFrame({spalte: spalten[spalte] for spalte in SPALTEN_JE_JAHR[year]})
+
+
+def write_year(path, year, rows, seed=0, leipzig_anteil=LEIPZIG_ANTEIL, block=BLOCK):
+    """Schreibt die Rohdatei eines Jahres blockweise (Semikolon, Dezimalkomma)."""
+    rng = np.random.default_rng([seed, year])
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+        for start in range(0, rows, block):
+            df = generate_block(rng, year, start, min(block, rows - start), leipzig_anteil)
+            df.to_csv(f, sep=";", decimal=",", float_format="%.9f", index=False, header=start == 0)
+    os.replace(tmp_path, path)
+    return path
+
+
+def generate(out_dir, rows, years, seed=0, leipzig_anteil=LEIPZIG_ANTEIL):
+    """
+    Erzeugt die Rohdateien für alle Jahre in out_dir.
+
+    Dateien, die mit denselben Einstellungen bereits erzeugt wurden
+    (siehe synthetic.json), werden nicht neu geschrieben.
+
+    Args:
+        out_dir (str): Zielverzeichnis (entspricht data/raw)
+        rows (int): Unfälle je Jahr
+        years (list): Jahre (2016-2024)
+        seed (int): Startwert des Zufallsgenerators
+        leipzig_anteil (float): Anteil der Unfälle in der Bounding Box von Leipzig
+
+    Returns:
+        list: Pfade der Rohdateien
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    info_path = os.path.join(out_dir, INFO_NAME)
+    try:
+        with open(info_path, "r", encoding="utf-8") as f:
+            info = json.load(f)
+    except (OSError, ValueError):
+        info = {}
+
+    einstellungen = {"rows": rows, "seed": seed, "leipzig_anteil": leipzig_anteil}
+    paths = []
+    for year in years:
+        path = raw_path(out_dir, year)
+        if info.get(str(year)) != einstellungen or not os.path.isfile(path):
+            write_year(path, year, rows, seed, leipzig_anteil)
+            info[str(year)] = einstellungen
+            with open(info_path, "w", encoding="utf-8") as f:
+                json.dump(info, f, indent=2)
+        paths.append(path)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Synthetische Unfallatlas-Rohdaten erzeugen")
+    parser.add_argument("--rows", type=int, default=100_000, help="Unfälle je Jahr (Standard: 100000)")
+    parser.add_argument("--years", nargs="+", type=int, default=[2024], choices=sorted(SPALTEN_JE_JAHR),
+                        metavar="JAHR", help="Jahre (Standard: 2024)")
+    parser.add_argument("--out-dir", required=True, help="Zielverzeichnis der CSV-Dateien")
+    parser.add_argument("--seed", type=int, default=0, help="Startwert des Zufallsgenerators")
+    parser.add_argument("--leipzig-share", type=float, default=LEIPZIG_ANTEIL,
+                        help=f"Anteil der Unfälle um Leipzig (Standard: {LEIPZIG_ANTEIL})")
+    args = parser.parse_args(argv)
+
+    for path in generate(args.out_dir, args.rows, args.years, args.seed, args.leipzig_share):
+        print(f"✓ {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 import pandas as pd
-import matplotlib.pyplot as plt
 from pathlib import Path
+import parquet_store
 
 # Frage: Wie hat sich die Gesamtzahl der Unfälle im Lauf der Jahre entwickelt?
 
@@ -8,51 +8,86 @@ from pathlib import Path
 # Unfälle laden
 # --------------------------------------
 
-def lade_unfaelle():
+def lade_unfaelle(spalten=None):
     # Wo liegen Dateien? (→ eine Ebene über src)
     BASE_DIR = Path(__file__).resolve().parent.parent
     # Datenordner
-    DATA_DIR = BASE_DIR / "data" / "processed" / "csv"
+    PROCESSED_DIR = BASE_DIR / "data" / "processed"
+    DATA_DIR = PROCESSED_DIR / "csv"
 
-    # Zeitraum definieren (Achtung: Angabe bis 2025 nötig, weil 2025 ausgeschlossen wird!)
-    years = range(2016, 2025)
+    # Zeitraum: alle verarbeiteten Jahre (kommt ein neues Jahr dazu, ist es automatisch dabei)
 
+    # Bevorzugt aus dem Parquet-Datensatz laden: nur die benötigten Spalten
+    # (spalten=None → alle) werden gelesen
+    if parquet_store.dataset_exists(PROCESSED_DIR):
+        return parquet_store.read_dataset(PROCESSED_DIR, columns=spalten)
+
+    # Fallback: CSV-Dateien der einzelnen Jahre
     # Liste für Data Frames
     dfs = []
 
-    for year in years:
-        filepath = DATA_DIR / f"Unfallorte{year}_Leipzig.csv"
-
-        df_year = pd.read_csv(filepath, low_memory=False)
+    # ???? = genau vier Zeichen, also nur die Jahresdateien (nicht die Gesamtdatei)
+    for filepath in sorted(DATA_DIR.glob("Unfallorte????_Leipzig.csv")):
+        df_year = pd.read_csv(filepath, usecols=spalten, low_memory=False)
         dfs.append(df_year)
 
     # Alle Jahre zu einem Data Frame zusammenführen (.concat() hängt alle Tabellen untereinander)
     df_all = pd.concat(dfs, ignore_index=True)
     return df_all
-    # → df_all enthält jetzt alle Unfälle von 2016-2024!
+    # → df_all enthält jetzt alle Unfälle aller Jahre!
 
 # -------------------------------------
 # Unfalltrend als Liniendiagramm visualisieren
 # -------------------------------------
 
-def plot_unfalltrend(df_all):
+def plot_unfalltrend(df_all, path=None):
     # Jetzt können wir die Unfälle pro Jahr zählen
     # → jede Zeile = ein Unfall
     # → value_counts() zählt pro Jahr
     # → sort_index() sortiert chronologisch
-    unfaelle_pro_jahr = df_all["UJAHR"].value_counts().sort_index()
+    # (beim aggregierten Unfallwürfel steht jede Zeile für "ANZAHL" Unfälle → Roll-up per Summe)
+    if "ANZAHL" in df_all.columns:
+        unfaelle_pro_jahr = df_all.groupby("UJAHR")["ANZAHL"].sum().sort_index()
+    else:
+        unfaelle_pro_jahr = df_all["UJAHR"].value_counts().sort_index()
+
+    # matplotlib erst hier laden: wer ohne Bildschirm zeichnet, wählt vorher das Backend (Agg)
+    import matplotlib.pyplot as plt
 
     # Unfalltrend plotten mit .plot(): Liniendiagramm der Unfallentwicklung pro Jahr
+    fig, ax = plt.subplots()
     unfaelle_pro_jahr.plot(
+        ax=ax,
         kind="line",
         marker="o",
-        title="Unfallentwicklung in Leipzig (2016-2024)",
+        title=f"Unfallentwicklung in Leipzig ({unfaelle_pro_jahr.index.min()}-{unfaelle_pro_jahr.index.max()})",
         xlabel="Jahr",
         ylabel="Anzahl der Unfälle",
         grid=True
     )
 
-    plt.show()
+    # Mit path als Datei speichern (PNG/SVG/PDF je nach Endung) statt anzuzeigen
+    if path:
+        fig.savefig(path, dpi=150)
+        plt.close(fig)
+    else:
+        plt.show()
+
+# -------------------------------------
+# Monatsverlauf je Stadtbezirk (kleine Diagramme in einer Abbildung)
+# -------------------------------------
+
+def plot_zeitreihen(cube, art="Gesamt", path=None):
+    # Zeitreihen aus dem Unfallwürfel: Unfälle je Monat, gleitender Jahresmittelwert und Trend
+    # (Rechnung mit NumPy in time_series, für alle Stadtbezirke in wenigen Millisekunden)
+    import matplotlib.pyplot as plt
+    import time_series
+    zaehlungen = time_series.build_counts(cube)
+    fig = time_series.plot_small_multiples(zaehlungen, art=art, path=path)
+    if path:
+        plt.close(fig)
+    else:
+        plt.show()
 
 # -----------------------------------
 # Beide Funktionen aufrufen: Daten laden und Plot erzeugen
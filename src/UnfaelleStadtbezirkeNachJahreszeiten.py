@@ -1,50 +1,13 @@
 import geopandas as gpd
 import pandas as pd
 from pathlib import Path
+import parquet_store
+import point_store
 
-stadtteile = {
-    "Nord": [
-        "Gohlis-Mitte", "Gohlis-Nord", "Gohlis-Süd",
-        "Eutritzsch", "Wiederitzsch", "Seehausen"
-    ],
-    "Nordost": [
-        "Schönefeld-Ost", "Schönefeld-Abtnaundorf",
-        "Mockau-Nord", "Mockau-Süd", "Thekla", "Plaußig-Portitz"
-    ],
-    "Ost": [
-        "Neustadt-Neuschönefeld", "Volkmarsdorf",
-        "Anger-Crottendorf", "Sellerhausen-Stünz",
-        "Paunsdorf", "Heiterblick", "Mölkau", "Engelsdorf", "Baalsdorf", "Althen-KLeinpösna"
-    ],
-    "Südost": [
-        "Reudnitz-Thonberg", "Stötteritz",
-        "Probstheida", "Meusdorf", "Liebertwolkwitz",
-        "Holzhausen"
-    ],
-    "Süd": [
-        "Connewitz", "Marienbrunn", "Lößnig",
-        "Dölitz-Dösen", "Südvorstadt"
-    ],
-    "Südwest": [
-        "Kleinzschocher", "Knautkleeberg-Knauthain",
-        "Hartmannsdorf-Knautnaundorf", "Großzschocher", "Schleußig", "Plagwitz"
-    ],
-    "West": [
-        "Grünau-Ost", "Grünau-Mitte", "Grünau-Nord", "Grünau-Siedlung", "Lausen-Grünau", "Miltitz", "Schönau"
-    ],
-    "Nordwest": [
-        "Lindenthal", "Möckern", "Wahren", "Lützschena-Stahmeln"
-    ],
-
-    "Alt-West": [
-        "Böhlitz-Ehrenberg", "Leutzsch", "Altlindenau", "Lindenau", "Neulindenau", "Burghausen-Rückmarsdorf"
-    ],
-
-    "Mitte": [
-        "Zentrum", "Zentrum-Ost", "Zentrum-Süd",
-        "Zentrum-Südost", "Zentrum-Nord", "Zentrum-West", "Zentrum-Nordwest"
-    ]
-}
+# Stadtbezirke/Ortsteile, Verkehrsmittel und Jahreszeiten stehen in constants,
+# die Kategorien und die Jahreszeit-Zuordnung in aggregate_cube
+from constants import JAHRESZEITEN, VERKEHRSMITTEL, stadtteile
+from aggregate_cube import VERKEHRSMITTEL_SPALTEN, VERKEHRSMITTEL_TYP, als_kategorien, bezirk_maske
 
 # Jetzt können wir auf unseren erzeugten geojson-Dateien aufbauen
 # Frage 1: Wie sieht die prozentuale Verteilung der Unfälle in den jeweiligen Stadtbezirken gestaffelt nach Jahreszeiten aus?
@@ -55,58 +18,53 @@ stadtteile = {
 # -------------------------------------------
 
 # Wo liegen die Dateien? -> einen Ordner über "src"
-data_dir = Path("../data/processed/geojson")
+processed_dir = Path("../data/processed")
+data_dir = processed_dir / "geojson"
 geojson_files = sorted(data_dir.glob("Unfallorte*.geojson")) # * als Platzhalter, um alle Jahre von 2016-2024 zu erfassen
+if not geojson_files:
+    # zeilenweise exportierte Dateien (--geojson-format geojsonseq)
+    geojson_files = sorted(data_dir.glob("Unfallorte*.geojsonl"))
+
+def collect_data(jahre=None, stadtbezirke=None):
+    """
+    Lädt die Unfälle aller Jahre mit den für die Auswertung benötigten Spalten.
+    Optional nur bestimmte Jahre bzw. Stadtbezirke (wird beim Parquet-Datensatz
+    direkt beim Lesen gefiltert).
+    """
+    spalten = ["Name", "UMONAT", "UJAHR"] + VERKEHRSMITTEL_SPALTEN
+
+    # Am schnellsten aus dem binären Punktspeicher (Memory-Mapping, kein Parsen)
+    if point_store.points_exist(processed_dir):
+        return als_kategorien(point_store.read_frame(processed_dir, columns=spalten,
+                                                     years=jahre, districts=stadtbezirke))
+
+    # Sonst aus dem Parquet-Datensatz laden (nur benötigte Spalten)
+    if parquet_store.dataset_exists(processed_dir):
+        unfaelle = parquet_store.read_dataset(processed_dir, columns=spalten,
+                                              years=jahre, districts=stadtbezirke)
+        return als_kategorien(unfaelle)
 
-def collect_data():
 # Leere Liste anlegen
     alle_unfaelle_geojson = []
 
 # Sortierte geojson_files einlesen
     for file in geojson_files:
         gdf = gpd.read_file(file)
-        if "IstSonstig" in gdf.columns:
-            gdf.rename(columns={"IstSonstig": "IstSonstige"}, inplace=True)
-        # Sicherstellen, dass alle benötigten Spalten existieren
-        for spalte in ["IstPKW", "IstRad", "IstFuss", "IstKrad", "IstSonstige"]:
-            if spalte not in gdf.columns: # wenn eine der Spalten in einer der Dateien nicht vorhanden ist, wird 0 eingesetzt
-                gdf[spalte] = 0
 
     # Benötigte Spalten auswählen
-        gdf = gdf[[ "Name", "UMONAT", "UJAHR", "IstPKW", "IstRad", "IstFuss", "IstKrad", "IstSonstige"]]
+        gdf = gdf[spalten]
 
     # Liste befüllen
         alle_unfaelle_geojson.append(gdf)
 
     # Alle Jahre zusammenführen
     unfaelle = pd.concat(alle_unfaelle_geojson, ignore_index=True)
+    if jahre is not None:
+        unfaelle = unfaelle[unfaelle["UJAHR"].isin(list(jahre))]
+    if stadtbezirke is not None:
+        unfaelle = unfaelle[unfaelle["Name"].isin(list(stadtbezirke))]
 
-    unfaelle["Jahreszeit"] = unfaelle["UMONAT"].astype(int).apply(monat_zu_jahreszeit)
-
-    return unfaelle
-
-# ----------------------------------
-# Monate den Jahreszeiten zuordnen
-# ----------------------------------
-
-"""Grundannahme: Frühling = März, April, Mai / Sommer = Juni, Juli, August /
-Herbst = September, Oktober, November / Winter = Dezember, Januar, Februar"""
-
-def monat_zu_jahreszeit(monat:int) -> str:
-    """Ordnet die Monate der jeweiligen Jahreszeit zu."""
-    if monat in [3, 4, 5]:
-        return "Frühling"
-    elif monat in [6, 7, 8]:
-        return "Sommer"
-    elif monat in [9, 10, 11]:
-        return "Herbst"
-    else:
-        return "Winter"
-
-# Neue Spalte für Jahreszeiten erzeugen
-# .astype erzeugt temporäre Kopie der Spalte "UMONAT"
-# .apply wendet Funktion auf Kopie der Spalte an
-
+    return als_kategorien(unfaelle)
 
 
 # ------------------------------------------
@@ -115,10 +73,13 @@ def monat_zu_jahreszeit(monat:int) -> str:
 
 def unfaelle_nach_jahreszeit(unfaelle, stadtbezirk: str):
     """Zählt Unfälle pro Jahreszeit für einen Stadtbezirk und berechnet die
-    prozentuale Unfallverteilung auf Basis der zurückliegenden Jahre."""
+    prozentuale Unfallverteilung auf Basis der zurückliegenden Jahre.
+
+    'unfaelle' kann einzelne Unfälle oder den aggregierten Unfallwürfel
+    (mit Spalte "ANZAHL", siehe aggregate_cube) enthalten."""
 
     # DataFrame 'unfaelle' nach dem eingegebenen Stadtbezirk filtern, also z. B. "Nord"
-    gefiltert = unfaelle[unfaelle["Name"] == stadtbezirk]
+    gefiltert = unfaelle[bezirk_maske(unfaelle, stadtbezirk)]
 
     if gefiltert.empty:
         print(f"Keine Daten für den Stadtbezirk '{stadtbezirk}' gefunden.")
@@ -127,13 +88,13 @@ def unfaelle_nach_jahreszeit(unfaelle, stadtbezirk: str):
     # Anzahl der Unfälle pro Jahreszeit zählen
     # DataFrame, das vorher nach dem Stadtbezirk gefiltert wurde, wird jetzt mit .groupby in Gruppen nach Jahreszeit aufgeteilt
     # .size zählt, wie viele Zeilen (also Unfälle) in jeder "Jahreszeit-Gruppe" passiert sind
+    # beim Würfel steht jede Zeile für mehrere Unfälle, daher wird dort "ANZAHL" summiert (Roll-up)
     # .reindex stellt sicher, dass die Serie immer in der festgelegten Reihenfolge der Jahreszeiten ausgegeben wird; fill_value = 0 (falls eine Jahreszeit nicht vorkommt)
-    jahreszeit_counts = (
-        gefiltert
-        .groupby("Jahreszeit")
-        .size()
-        .reindex(["Frühling", "Sommer", "Herbst", "Winter"], fill_value=0)
-    )
+    if "ANZAHL" in gefiltert.columns:
+        jahreszeit_counts = gefiltert.groupby("Jahreszeit", observed=False)["ANZAHL"].sum()
+    else:
+        jahreszeit_counts = gefiltert.groupby("Jahreszeit", observed=False).size()
+    jahreszeit_counts = jahreszeit_counts.reindex(JAHRESZEITEN, fill_value=0)
 
     # jahreszeit_counts enthält für jede Jahreszeit die Anzahl der Unfälle im gewählten Stadtbezirk
     # 'gesamt' erfasst nun die Summe dieser Unfälle
@@ -156,7 +117,7 @@ checken kann, wo man den gesuchten Stadtteil einordnen muss.
 
 
 
-def user_input_choice():
+def user_input_choice(datensatz=None):
     # Tabelle ausgeben
     print("=" * 63)
     print("Nachfolgend findest du die Leipziger Stadtteile sortiert nach Himmelsrichtungen.\nDas Tool funktioniert über die Eingabe der Himmelsrichtung.\n"
@@ -179,7 +140,12 @@ def user_input_choice():
                               "Du hast die Wahl zwischen Nord, Nordwest, Nordost, Ost, Südost, Süd, Südwest, West, Alt-West und Mitte: "))
 
     # Ausgabe der prozentualen Verteilung der Unfälle nach Jahreszeit in einem bestimmten Stadtbezirk
-    prozentuale_unfallverteilung = unfaelle_nach_jahreszeit(collect_data(), stadtbezirk_input)
+    # Gemeinsamen Datensatz der Sitzung nutzen, sonst nur diesen Stadtbezirk laden
+    if datensatz is not None:
+        unfaelle = datensatz.stadtbezirk(stadtbezirk_input)
+    else:
+        unfaelle = collect_data(stadtbezirke=[stadtbezirk_input])
+    prozentuale_unfallverteilung = unfaelle_nach_jahreszeit(unfaelle, stadtbezirk_input)
 
     if prozentuale_unfallverteilung is not None:
         print(f"\nDie prozentuale Verteilung der Unfälle im Stadtbezirk '{stadtbezirk_input}' (absteigend sortiert): ")
@@ -201,10 +167,13 @@ def user_input_choice():
 
 def unfaelle_nach_jahreszeit_und_verkehrsmittel(unfaelle, stadtbezirk: str):
     """Berechnet die prozentuale Verteilung der Unfälle nach Fortbewegungsmittel
-    und Jahreszeit für einen bestimmten Stadtbezirk"""
+    und Jahreszeit für einen bestimmten Stadtbezirk
+
+    Funktioniert mit einzelnen Unfällen und mit dem aggregierten Unfallwürfel,
+    da in beiden Fällen die Ist*-Spalten aufsummiert werden."""
 
     # DataFrame 'unfaelle' nach dem eingegebenen Stadtbezirk filtern, also z. B. "Nord"
-    gefiltert = unfaelle[unfaelle["Name"] == stadtbezirk]
+    gefiltert = unfaelle[bezirk_maske(unfaelle, stadtbezirk)]
 
     # überprüfen, ob nach dem Filtern keine Zeilen übrig bleiben (also keine Daten vorhanden sind)
     # sind tatsächlich keine Daten vorhanden, wird die Funktion beendet
@@ -212,31 +181,23 @@ def unfaelle_nach_jahreszeit_und_verkehrsmittel(unfaelle, stadtbezirk: str):
         print(f"Keine Daten für den Stadtbezirk '{stadtbezirk}' gefunden.")
         return None
 
-    # Dictionary der Verkehrsmittel erzeugen und sinnvolle Bezeichnungen vergeben
-    verkehrsmittel = {
-    "PKW": "IstPKW",
-    "Rad": "IstRad",
-    "Fußgänger": "IstFuss",
-    "Kraftrad": "IstKrad",
-    "Sonstige": "IstSonstige",
-    }
+    # Summen je Jahreszeit und Verkehrsmittel in einem einzigen groupby berechnen
+    # (Spalten = Verkehrsmittel als Kategorie mit fester Reihenfolge)
+    summen = (
+        gefiltert[list(VERKEHRSMITTEL.values())]
+        .groupby(gefiltert["Jahreszeit"], observed=False)
+        .sum()
+        .reindex(JAHRESZEITEN, fill_value=0)
+    )
+    summen.columns = pd.CategoricalIndex(list(VERKEHRSMITTEL), dtype=VERKEHRSMITTEL_TYP)
 
     # Leeres Dictionary anlegen, in dem später die Ergebnisse pro Jahreszeit gespeichert werden
     ergebnis = {}
 
     # Schleife durchläuft alle vier Jahreszeiten nacheinander
-    for jahreszeit in ["Frühling", "Sommer", "Herbst", "Winter"]:
-        daten_js = gefiltert[gefiltert["Jahreszeit"] == jahreszeit]
-
-        # Bedingung: wenn es für eine Jahreszeit keine Einträge gibt, wird diese übersprungen
-        if daten_js.empty:
-            continue
-
-        # Dictionary anlegen, das für die jeweilige Jahreszeit die Anzahl der Unfälle pro Verkehrsmittel enthält
-        counts = {
-            name: daten_js[spalte].astype(int).sum()
-            for name, spalte in verkehrsmittel.items()
-        }
+    for jahreszeit in JAHRESZEITEN:
+        # Dictionary, das für die jeweilige Jahreszeit die Anzahl der Unfälle pro Verkehrsmittel enthält
+        counts = summen.loc[jahreszeit].to_dict()
 
         # Summe der Unfälle in jeweiliger Jahreszeit berechnen (über alle Verkehrsmittel)
         # Falls keine Unfälle gezählt wurden, wird die jeweilige Jahreszeit übersprungen
@@ -259,12 +220,16 @@ def unfaelle_nach_jahreszeit_und_verkehrsmittel(unfaelle, stadtbezirk: str):
 # Input 2 und Funktion aufrufen
 # --------------------------
 
-def user_input_choice_2():
+def user_input_choice_2(datensatz=None):
     stadtbezirk_input2 = str(input("Gib den Stadtbezirk ein, für den du die prozentuale Verteilung "
                                    "der Unfälle nach Fortbewegungsmittel und Jahreszeit erfahren möchtest.\n"
                                    "Du hast die Wahl zwischen Nord, Nordwest, Nordost, Ost, Südost, Süd, Südwest, West, Alt-West und Mitte: "))
 
-    verteilung = unfaelle_nach_jahreszeit_und_verkehrsmittel(collect_data(),stadtbezirk_input2)
+    if datensatz is not None:
+        unfaelle = datensatz.stadtbezirk(stadtbezirk_input2)
+    else:
+        unfaelle = collect_data(stadtbezirke=[stadtbezirk_input2])
+    verteilung = unfaelle_nach_jahreszeit_und_verkehrsmittel(unfaelle, stadtbezirk_input2)
 
     # prüfen, ob überhaupt Daten für den Stadtbezirk gefunden wurden
     # wenn ja, wird Unfallverteilung nach Jahreszeit und Fortbewegungsmittel ausgegeben
@@ -283,4 +248,4 @@ def user_input_choice_2():
             for verkehrsmittel, prozent in sortiert_verkehrsmittel:
                 # Totenkopf nur beim höchsten Wert
                 emoji = " 🚨" if prozent == max_wert else ""
-                print(f"  {verkehrsmittel}: {prozent:.2f} %{emoji}")
\ No newline at end of file
+                print(f"  {verkehrsmittel}: {prozent:.2f} %{emoji}")
\ No newline at end of file
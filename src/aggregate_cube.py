@@ -0,0 +1,192 @@
+"""
+Modul für den vorberechneten Unfallwürfel.
+
+Der Würfel zählt die Unfälle je Kombination aus Stadtbezirk, Ortsteil, Jahr, Monat,
+Stunde, Wochentag und Unfallkategorie und summiert pro Zelle die beteiligten
+Verkehrsmittel (Ist*-Spalten). Er wird einmal beim Export erstellt; alle
+Auswertungen rechnen danach nur noch auf den aggregierten Zellen
+(Roll-up per groupby/sum), unabhängig von der Anzahl der Unfälle.
+
+Da jede Zelle Ortsteil und Stadtbezirk trägt, lässt sich dieselbe Tabelle vom
+Ortsteil über den Stadtbezirk bis zur ganzen Stadt verdichten. Ohne
+Ortsteil-Datei bleiben "OT" und "Ortsteil" leer.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+import constants
+import metrics
+import parquet_store
+
+# Dimensionen des Würfels
+RAUM = ["SBZ", "Name", "OT", "Ortsteil"]
+ZEIT_UND_ART_TYPEN = {"UJAHR": "uint16", "UMONAT": "uint8", "USTUNDE": "uint8",
+                      "UWOCHENTAG": "uint8", "UKATEGORIE": "uint8"}
+ZEIT_UND_ART = list(ZEIT_UND_ART_TYPEN)
+DIMENSIONEN = RAUM + ZEIT_UND_ART
+
+# Ganzzahltypen mit NA für Würfel mit fehlenden Codes (wie in schema)
+_MIT_NA = {"uint8": "UInt8", "uint16": "UInt16"}
+
+# Kennzahlen: Anzahl der Unfälle und Summe je Verkehrsmittel
+VERKEHRSMITTEL = ["IstPKW", "IstRad", "IstFuss", "IstKrad", "IstGkfz", "IstSonstige"]
+KENNZAHLEN = ["ANZAHL"] + VERKEHRSMITTEL
+
+# Verkehrsmittel der Auswertungen (constants.VERKEHRSMITTEL) als Kategorie und ihre
+# Spalten (gibt es dank schema.normalize in allen Jahren, fehlende Werte = 0)
+VERKEHRSMITTEL_TYP = pd.CategoricalDtype(list(constants.VERKEHRSMITTEL), ordered=True)
+VERKEHRSMITTEL_SPALTEN = list(constants.VERKEHRSMITTEL.values())
+
+CUBE_NAME = "Unfallwuerfel_Leipzig.parquet"
+
+
+# Monate den Jahreszeiten zuordnen (Frühling = März–Mai, Sommer = Juni–August,
+# Herbst = September–November, Winter = Dezember–Februar) über eine
+# Nachschlagetabelle: Index = Monat (0–12), Wert = Position in JAHRESZEITEN.
+# Ungültige Monate (0 und > 12) werden dem Winter zugeordnet, fehlende (NA) keiner
+# Jahreszeit (siehe jahreszeit_spalte).
+_JAHRESZEIT_NACH_MONAT = np.array([3, 3, 3, 0, 0, 0, 1, 1, 1, 2, 2, 2, 3], dtype=np.int8)
+
+# Feste Kategorien (Reihenfolge) für die Beschriftungsspalten: Vergleiche und
+# groupby laufen dann auf den ganzzahligen Codes statt auf Zeichenketten
+JAHRESZEIT_TYP = pd.CategoricalDtype(constants.JAHRESZEITEN, ordered=True)
+STADTBEZIRK_TYP = pd.CategoricalDtype(list(constants.stadtteile), ordered=True)
+
+
+def jahreszeit_spalte(monate):
+    """Ordnet eine ganze Monatsspalte vektorisiert den Jahreszeiten zu (Categorical)."""
+    monate = pd.Series(monate).to_numpy(dtype="float64", na_value=np.nan)
+    fehlt = np.isnan(monate)
+    codes = _JAHRESZEIT_NACH_MONAT[np.clip(np.where(fehlt, 0, monate), 0, 12).astype(np.int64)]
+    # Fehlender Monat (NA) -> fehlende Jahreszeit (Code -1)
+    codes = np.where(fehlt, -1, codes)
+    return pd.Categorical.from_codes(codes, dtype=JAHRESZEIT_TYP)
+
+
+def als_kategorien(unfaelle):
+    """Wandelt "Name" in eine Kategorie um und ergänzt "Jahreszeit" (falls noch nicht vorhanden)."""
+    unfaelle = unfaelle.copy()
+    unfaelle["Name"] = unfaelle["Name"].astype(STADTBEZIRK_TYP)
+    if "Jahreszeit" not in unfaelle.columns:
+        unfaelle["Jahreszeit"] = jahreszeit_spalte(unfaelle["UMONAT"])
+    return unfaelle
+
+
+def bezirk_maske(unfaelle, stadtbezirk: str):
+    """Filtermaske für einen Stadtbezirk; bei Kategorien wird nur der Code verglichen."""
+    spalte = unfaelle["Name"]
+    if isinstance(spalte.dtype, pd.CategoricalDtype):
+        if stadtbezirk not in spalte.cat.categories:
+            return np.zeros(len(spalte), dtype=bool)
+        return spalte.cat.codes.to_numpy() == spalte.cat.categories.get_loc(stadtbezirk)
+    return (spalte == stadtbezirk).to_numpy()
+
+
+def cube_path(processed_dir):
+    """Pfad des gespeicherten Würfels."""
+    return os.path.join(processed_dir, "cube", CUBE_NAME)
+
+
+def _aggregate(df):
+    """
+    Aggregiert einen DataFrame mit einzelnen Unfällen (im Schema von
+    schema.normalize) zu Würfelzellen.
+    """
+    df = pd.DataFrame(df[DIMENSIONEN + VERKEHRSMITTEL])
+    df["ANZAHL"] = 1
+
+    return df.groupby(DIMENSIONEN, dropna=False, sort=True)[KENNZAHLEN].sum().reset_index()
+
+
+def build_cube(frames):
+    """
+    Erstellt den Würfel aus den Unfällen der einzelnen Jahre.
+
+    Args:
+        frames (iterable): DataFrames mit einzelnen Unfällen (z. B. je Jahr)
+
+    Returns:
+        pd.DataFrame: Eine Zeile je belegter Zelle, Spalten DIMENSIONEN + KENNZAHLEN
+            (ohne Unfälle ein leerer Würfel mit denselben Spalten)
+    """
+    teile = [_aggregate(df) for df in frames]
+    if not teile:
+        teile = [pd.DataFrame(columns=DIMENSIONEN + KENNZAHLEN)]
+    cube = pd.concat(teile, ignore_index=True)
+    cube = cube.groupby(DIMENSIONEN, dropna=False, sort=True)[KENNZAHLEN].sum().reset_index()
+
+    # Kleine Ganzzahltypen sparen Speicher; fehlen Codes (leer oder ungültig,
+    # siehe schema.normalize), bleiben sie als NA erhalten (UInt8/UInt16)
+    for spalte, dtype in ZEIT_UND_ART_TYPEN.items():
+        if cube[spalte].isna().any():
+            dtype = _MIT_NA[dtype]
+        cube[spalte] = cube[spalte].astype(dtype)
+    for spalte in KENNZAHLEN:
+        cube[spalte] = cube[spalte].astype("int32")
+    return cube
+
+
+def write_cube(cube, processed_dir):
+    """Speichert den Würfel neben den verarbeiteten Daten."""
+    path = cube_path(processed_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    cube.to_parquet(path, index=False)
+    return path
+
+
+def load_cube(processed_dir):
+    """
+    Lädt den gespeicherten Würfel. Fehlt er, wird er einmalig aus dem
+    Parquet-Datensatz erstellt und gespeichert.
+    """
+    path = cube_path(processed_dir)
+    if not os.path.isfile(path):
+        with metrics.stage("build_cube") as schritt:
+            schritt.read(parquet_store.dataset_dir(processed_dir))
+            unfaelle = parquet_store.read_dataset(
+                processed_dir, columns=DIMENSIONEN + VERKEHRSMITTEL
+            )
+            schritt.rows_in = len(unfaelle)
+            schritt.wrote(write_cube(build_cube([unfaelle]), processed_dir))
+
+    with metrics.stage("load_cube") as schritt:
+        schritt.read(path)
+        cube = pd.read_parquet(path)
+        schritt.rows_out = len(cube)
+    return cube
+
+
+def add_jahreszeit(cube):
+    """
+    Ergänzt die Spalte "Jahreszeit" (aus UMONAT) für die Würfelzellen und
+    wandelt "Name" in eine Kategorie um (siehe als_kategorien).
+    """
+    return als_kategorien(cube)
+
+
+def roll_up(cube, nach, **filter):
+    """
+    Verdichtet den Würfel auf die gewünschten Dimensionen.
+
+    Beispiel:
+        roll_up(cube, ["Jahreszeit"], Name="Nord")   # Unfälle je Jahreszeit in Nord
+        roll_up(cube, ["UJAHR"])                     # Unfälle je Jahr (ganz Leipzig)
+        roll_up(cube, ["Ortsteil"], Name="Süd")      # Unfälle je Ortsteil in Süd
+
+    Args:
+        cube (pd.DataFrame): Würfel (ggf. mit abgeleiteten Spalten wie "Jahreszeit")
+        nach (list): Dimensionen, nach denen gruppiert wird
+        **filter: Dimension=Wert bzw. Dimension=[Werte] zur Einschränkung
+
+    Returns:
+        pd.DataFrame: Summierte KENNZAHLEN je Ausprägung von `nach`
+    """
+    # isin statt ==: fehlende Codes (NA) ergeben False statt einer NA-Maske
+    for dimension, wert in filter.items():
+        werte = list(wert) if isinstance(wert, (list, tuple, set)) else [wert]
+        cube = cube[cube[dimension].isin(werte)]
+
+    # dropna=False: Zellen ohne Ortsteil zählen beim Verdichten mit
+    return cube.groupby(list(nach), sort=True, observed=True, dropna=False)[KENNZAHLEN].sum()
@@ -0,0 +1,175 @@
+"""
+Modul für nicht-interaktive Auswertungen (Batch-Betrieb, z. B. nächtliche Berichte).
+
+Alle Auswertungen laufen auf dem Unfallwürfel (siehe aggregate_cube): Der
+Würfel wird einmal auf Stadtbezirk × Jahr × Jahreszeit verdichtet, alle
+angeforderten Tabellen werden danach aus diesen wenigen Zellen berechnet –
+egal ob für einen oder alle zehn Stadtbezirke. Die Ergebnisse sind lange
+Tabellen (eine Zeile je Kombination), die als JSON oder CSV geschrieben werden.
+
+Mit einer Ortsteil-Datei lassen sich alle Auswertungen zusätzlich auf
+einzelne Ortsteile einschränken, "subdistricts" verdichtet vom Ortsteil über
+den Stadtbezirk bis zur Gesamtsumme.
+"""
+import json
+import os
+
+import pandas as pd
+
+import aggregate_cube
+import metrics
+from constants import VERKEHRSMITTEL
+
+
+def _auswahl(stadtbezirke=None, jahre=None, ortsteile=None):
+    """Schränkt den Würfel auf die gewünschten Stadtbezirke, Ortsteile und Jahre ein."""
+    filter = {}
+    if stadtbezirke:
+        filter["Name"] = list(stadtbezirke)
+    if ortsteile:
+        filter["Ortsteil"] = list(ortsteile)
+    if jahre:
+        filter["UJAHR"] = [int(jahr) for jahr in jahre]
+    return filter
+
+
+# Feinste Gliederung, die eine der Auswertungen benötigt
+ZELLEN = ["Name", "Ortsteil", "UJAHR", "Jahreszeit"]
+
+
+def trend_table(cube, stadtbezirke=None, jahre=None, ortsteile=None):
+    """
+    Unfälle je Stadtbezirk und Jahr.
+
+    Returns:
+        pd.DataFrame: Spalten Name, UJAHR, ANZAHL
+    """
+    tabelle = aggregate_cube.roll_up(cube, ["Name", "UJAHR"], **_auswahl(stadtbezirke, jahre, ortsteile))
+    return tabelle[["ANZAHL"]].reset_index()
+
+
+def seasons_table(cube, stadtbezirke=None, jahre=None, ortsteile=None):
+    """
+    Prozentuale Verteilung der Unfälle auf die Jahreszeiten je Stadtbezirk
+    (wie unfaelle_nach_jahreszeit, aber für alle Stadtbezirke auf einmal).
+
+    Returns:
+        pd.DataFrame: Spalten Name, Jahreszeit, ANZAHL, ANTEIL (in %)
+    """
+    tabelle = aggregate_cube.roll_up(cube, ["Name", "Jahreszeit"], **_auswahl(stadtbezirke, jahre, ortsteile))
+    tabelle = tabelle[["ANZAHL"]].reset_index()
+
+    gesamt = tabelle.groupby("Name", observed=True)["ANZAHL"].transform("sum")
+    tabelle["ANTEIL"] = tabelle["ANZAHL"] / gesamt * 100
+    return tabelle[gesamt > 0].reset_index(drop=True)
+
+
+def modes_table(cube, stadtbezirke=None, jahre=None, ortsteile=None):
+    """
+    Prozentuale Verteilung der Unfälle auf die Verkehrsmittel je Stadtbezirk
+    und Jahreszeit (wie unfaelle_nach_jahreszeit_und_verkehrsmittel, aber für
+    alle Stadtbezirke auf einmal).
+
+    Returns:
+        pd.DataFrame: Spalten Name, Jahreszeit, Verkehrsmittel, ANZAHL, ANTEIL (in %)
+    """
+    tabelle = aggregate_cube.roll_up(cube, ["Name", "Jahreszeit"], **_auswahl(stadtbezirke, jahre, ortsteile))
+    tabelle = tabelle[list(VERKEHRSMITTEL.values())].rename(
+        columns={spalte: name for name, spalte in VERKEHRSMITTEL.items()}
+    )
+
+    # Breite Tabelle (eine Spalte je Verkehrsmittel) in lange Form bringen
+    tabelle = tabelle.melt(ignore_index=False, var_name="Verkehrsmittel", value_name="ANZAHL").reset_index()
+    tabelle["Verkehrsmittel"] = tabelle["Verkehrsmittel"].astype(aggregate_cube.VERKEHRSMITTEL_TYP)
+
+    gesamt = tabelle.groupby(["Name", "Jahreszeit"], observed=True)["ANZAHL"].transform("sum")
+    tabelle["ANTEIL"] = tabelle["ANZAHL"] / gesamt * 100
+
+    # Jahreszeiten ohne Unfälle werden wie in der interaktiven Auswertung weggelassen
+    tabelle = tabelle[gesamt > 0]
+    return tabelle.sort_values(["Name", "Jahreszeit", "Verkehrsmittel"]).reset_index(drop=True)
+
+
+def subdistricts_table(cube, stadtbezirke=None, jahre=None, ortsteile=None):
+    """
+    Unfälle je Jahr auf drei Ebenen: je Ortsteil, je Stadtbezirk und gesamt
+    (Summe über die Auswahl). Alle Ebenen stammen aus demselben Roll-up.
+    Unfälle ohne Ortsteil (z. B. ohne Ortsteil-Datei) zählen nur in den
+    oberen Ebenen.
+
+    Returns:
+        pd.DataFrame: Spalten Ebene, Name, Ortsteil, UJAHR, ANZAHL
+    """
+    ortsteil = aggregate_cube.roll_up(cube, ["Name", "Ortsteil", "UJAHR"],
+                                      **_auswahl(stadtbezirke, jahre, ortsteile))
+    ortsteil = ortsteil[["ANZAHL"]].reset_index()
+    bezirk = ortsteil.groupby(["Name", "UJAHR"], observed=True)["ANZAHL"].sum().reset_index()
+    gesamt = bezirk.groupby("UJAHR")["ANZAHL"].sum().reset_index()
+
+    ebenen = [("Gesamt", gesamt), ("Stadtbezirk", bezirk), ("Ortsteil", ortsteil.dropna(subset=["Ortsteil"]))]
+    tabelle = pd.concat([teil.assign(Ebene=ebene) for ebene, teil in ebenen], ignore_index=True)
+    return tabelle[["Ebene", "Name", "Ortsteil", "UJAHR", "ANZAHL"]]
+
+
+AUSWERTUNGEN = {
+    "trend": trend_table,
+    "seasons": seasons_table,
+    "modes": modes_table,
+    "subdistricts": subdistricts_table,
+}
+
+
+def write_table(tabelle, path):
+    """
+    Schreibt eine Ergebnistabelle als JSON (Liste von Datensätzen) oder CSV.
+    Das Format ergibt sich aus der Dateiendung.
+
+    Args:
+        tabelle (pd.DataFrame): Ergebnis einer Auswertung
+        path (str): Zieldatei (.json oder .csv)
+
+    Returns:
+        str: Pfad der geschriebenen Datei
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    if path.lower().endswith(".csv"):
+        tabelle.to_csv(path, index=False, encoding="utf-8")
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(json.loads(tabelle.to_json(orient="records", force_ascii=False)),
+                      f, ensure_ascii=False, indent=2)
+    return path
+
+
+def run(auswertungen, cube, out_dir, stadtbezirke=None, jahre=None, fmt="json", ortsteile=None):
+    """
+    Führt mehrere Auswertungen in einem Durchlauf über den Würfel aus.
+
+    Args:
+        auswertungen (list): Namen aus AUSWERTUNGEN ("trend", "seasons", "modes")
+        cube (pd.DataFrame): Unfallwürfel inkl. "Jahreszeit"
+        out_dir (str): Zielverzeichnis (eine Datei je Auswertung)
+        stadtbezirke (list): Stadtbezirke (None = alle)
+        jahre (list): Jahre (None = alle)
+        fmt (str): "json" oder "csv"
+        ortsteile (list): Ortsteile (None = alle)
+
+    Returns:
+        dict: Auswertung -> Pfad der Ergebnisdatei
+    """
+    # Einmal filtern und verdichten, die Auswertungen rechnen nur noch auf den Zellen
+    with metrics.stage("roll_up") as schritt:
+        zellen = aggregate_cube.roll_up(cube, ZELLEN, **_auswahl(stadtbezirke, jahre, ortsteile)).reset_index()
+        schritt.rows_in, schritt.rows_out = len(cube), len(zellen)
+
+    ergebnisse = {}
+    for name in auswertungen:
+        with metrics.stage(name) as schritt:
+            tabelle = AUSWERTUNGEN[name](zellen)
+            ergebnisse[name] = write_table(tabelle, os.path.join(out_dir, f"{name}.{fmt}"))
+            schritt.rows_in, schritt.rows_out = len(zellen), len(tabelle)
+            schritt.wrote(ergebnisse[name])
+    return ergebnisse
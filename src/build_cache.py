@@ -0,0 +1,399 @@
+"""
+Modul für den inkrementellen Build: merkt sich in einem Manifest, aus welchen
+Rohdaten die verarbeiteten Dateien entstanden sind, und verarbeitet beim
+nächsten Start nur die Jahre neu, deren Eingaben sich geändert haben.
+"""
+import glob
+import hashlib
+import json
+import os
+import shutil
+
+import schema
+import sources
+
+# Bei Änderungen an der Verarbeitung erhöhen, damit alle Jahre neu berechnet werden
+# (Änderungen am Spaltenschema: schema.SCHEMA_VERSION)
+PIPELINE_VERSION = "3"
+
+MANIFEST_NAME = "manifest.json"
+
+# Dateiendung je Exportformat; beide GeoJSON-Varianten stehen im Manifest unter "geojson"
+EXPORT_ENDUNGEN = {"csv": ".csv", "geojson": ".geojson", "geojsonseq": ".geojsonl"}
+
+# Ordner der Heatmap-Raster wie density.HEATMAP_DIR; density lädt numpy und
+# wird hier nicht importiert, damit main.py schnell startet
+HEATMAP_DIR = "heatmaps"
+
+
+def cache_dir(processed_dir):
+    """Verzeichnis für Manifest und zwischengespeicherte Jahresergebnisse."""
+    return os.path.join(processed_dir, "cache")
+
+
+def _artifact_path(processed_dir, year):
+    """Pfad des zwischengespeicherten Ergebnisses eines Jahres."""
+    return os.path.join(cache_dir(processed_dir), f"Unfallorte{year}_Leipzig.pkl")
+
+
+def _sha256(path, block_size=1024 * 1024):
+    """Berechnet den SHA-256-Hash einer Datei blockweise."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_signature(path, previous=None):
+    """
+    Ermittelt die Signatur einer Datei (Größe, Änderungszeit, Inhalts-Hash).
+
+    Stimmen Größe und Änderungszeit mit der vorherigen Signatur überein,
+    wird der Hash übernommen statt die Datei erneut zu lesen.
+
+    Args:
+        path (str): Pfad zur Datei
+        previous (dict): Signatur aus dem letzten Lauf (optional)
+
+    Returns:
+        dict: {'size', 'mtime_ns', 'sha256'}
+    """
+    stat = os.stat(path)
+    if (previous
+            and previous.get("size") == stat.st_size
+            and previous.get("mtime_ns") == stat.st_mtime_ns):
+        return dict(previous)
+
+    return {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": _sha256(path)
+    }
+
+
+def _same_content(signature, previous):
+    """Vergleicht zwei Signaturen über den Inhalts-Hash."""
+    return previous is not None and signature["sha256"] == previous.get("sha256")
+
+
+def optional_signature(path, previous=None):
+    """Signatur einer optionalen Eingabedatei (None, wenn sie fehlt)."""
+    if not path or not os.path.isfile(path):
+        return None
+    return file_signature(path, previous)
+
+
+def _same_optional(signature, previous):
+    """Wie _same_content, aber eine fehlende Datei gleicht einer fehlenden Datei."""
+    if signature is None or previous is None:
+        return signature is None and previous is None
+    return _same_content(signature, previous)
+
+
+def load_manifest(processed_dir):
+    """Lädt das Manifest des letzten Laufs (leeres Dict, falls keins existiert)."""
+    path = os.path.join(cache_dir(processed_dir), MANIFEST_NAME)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(processed_dir, manifest):
+    """Schreibt das Manifest atomar (erst temporäre Datei, dann umbenennen)."""
+    os.makedirs(cache_dir(processed_dir), exist_ok=True)
+    path = os.path.join(cache_dir(processed_dir), MANIFEST_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def plan_build(manifest, years, raw_dir, bezirke_file, processed_dir, exports=("csv", "geojson"),
+               force=False, ortsteile_file=None, precision=None):
+    """
+    Vergleicht die aktuellen Eingaben mit dem Manifest.
+
+    Ein Jahr muss neu verarbeitet werden, wenn sich seine Rohdatei, die
+    Bezirks- bzw. Ortsteilgrenzen, die Pipeline- oder die Schema-Version
+    geändert haben oder wenn das zwischengespeicherte Ergebnis bzw. die
+    Parquet-Partition fehlen. Fehlen
+    nur die abgeleiteten Exporte (CSV/GeoJSON) oder wurde das GeoJSON in
+    einem anderen Format bzw. mit anderer Genauigkeit geschrieben, werden sie
+    aus dem Cache geschrieben, ohne die Rohdaten erneut zu verarbeiten.
+
+    Die Rohdaten werden mit sources.discover gefunden. Welche Jahre in einer
+    Datei mit mehreren Jahren stehen, steht erst nach dem Lesen fest; eine
+    solche Quelle wird daher als Ganzes neu verarbeitet ('changed_sources'),
+    sonst werden ihre Jahre aus dem letzten Lauf übernommen.
+
+    Jahre im Manifest, deren Rohdatei nicht mehr gefunden wird, stehen unter
+    'removed'; ihre Dateien entfernt remove_year (unabhängig von `years`).
+
+    Args:
+        manifest (dict): Manifest des letzten Laufs
+        years (iterable): Gewünschte Jahre (None = alle gefundenen Jahre;
+            Dateien mit mehreren Jahren liefern immer alle ihre Jahre)
+        raw_dir (str): Verzeichnis der Rohdaten
+        bezirke_file (str): Pfad zur GeoJSON-Datei der Bezirke
+        processed_dir (str): Verzeichnis der verarbeiteten Daten
+        exports (tuple): Abgeleitete Exportformate ("csv", "geojson" oder "geojsonseq")
+        force (bool): Alle Jahre neu verarbeiten
+        ortsteile_file (str): Pfad zur GeoJSON-Datei der Ortsteile (optional)
+        precision (int): Nachkommastellen der GeoJSON-Koordinaten (None = Standard)
+
+    Returns:
+        dict: {'changed': [Jahre], 'export_only': [Jahre], 'cached': [Jahre],
+               'removed': [Jahre], 'changed_sources': [Source], 'exclude_years': [Jahre],
+               'year_sources': {Jahr: Schlüssel der Quelle}, 'precision': precision,
+               'signatures': {...}}
+    """
+    old_years = manifest.get("years", {})
+    old_sources = manifest.get("sources", {})
+    bezirke_signature = file_signature(bezirke_file, manifest.get("bezirke"))
+    ortsteile_signature = optional_signature(ortsteile_file, manifest.get("ortsteile"))
+
+    rebuild_all = (
+        force
+        or manifest.get("pipeline_version") != PIPELINE_VERSION
+        or manifest.get("schema_version") != schema.SCHEMA_VERSION
+        or not _same_content(bezirke_signature, manifest.get("bezirke"))
+        or not _same_optional(ortsteile_signature, manifest.get("ortsteile"))
+    )
+
+    gefunden = sources.discover(raw_dir)
+    # Jahre, deren Quelle verschwunden ist (eigene Datei und Mehrjahresdatei fehlen)
+    schluessel = {source.key for source in gefunden["years"].values()}
+    schluessel.update(source.key for source in gefunden["multi"])
+    removed = sorted(int(year) for year, entry in old_years.items()
+                     if int(year) not in gefunden["years"] and entry.get("source") not in schluessel)
+
+    if years is not None:
+        years = {int(year) for year in years}
+        gefunden["years"] = {year: source for year, source in gefunden["years"].items() if year in years}
+    # Jahre mit eigener Datei werden nicht aus Mehrjahresdateien übernommen
+    exclude_years = sorted(gefunden["years"])
+
+    changed, export_only, cached, changed_sources = [], [], [], []
+    year_sources = {}
+    signatures = {"bezirke": bezirke_signature, "ortsteile": ortsteile_signature,
+                  "years": {}, "sources": {}}
+
+    def einordnen(year, signature, neu):
+        old_entry = old_years.get(str(year), {})
+        processed = [_artifact_path(processed_dir, year), old_entry.get("parquet")]
+        exported = [old_entry.get("geojson" if fmt.startswith("geojson") else fmt) for fmt in exports]
+        endungen = [EXPORT_ENDUNGEN[fmt] for fmt in exports]
+
+        if (neu
+                or not _same_content(signature, old_entry.get("raw"))
+                or not all(path and os.path.isfile(path) for path in processed)):
+            return changed
+        if not all(path and path.endswith(endung) and os.path.isfile(path)
+                   for path, endung in zip(exported, endungen)):
+            return export_only
+        if any(fmt.startswith("geojson") for fmt in exports) and old_entry.get("precision") != precision:
+            return export_only
+        return cached
+
+    for year, source in gefunden["years"].items():
+        old_entry = old_years.get(str(year), {})
+        signature = file_signature(source.path, old_entry.get("raw"))
+        signatures["years"][str(year)] = signature
+        year_sources[year] = source.key
+        # Eine andere Quelle (z. B. .csv.gz statt .csv) zählt als Änderung
+        neu = rebuild_all or old_entry.get("source", source.key) != source.key
+        einordnen(year, signature, neu).append(year)
+
+    for source in gefunden["multi"]:
+        old_entry = old_sources.get(source.key, {})
+        signature = file_signature(source.path, old_entry.get("raw"))
+        signatures["sources"][source.key] = signature
+        source_years = [year for year in old_entry.get("years", [])
+                        if years is None or year in years]
+
+        if (rebuild_all
+                or not _same_content(signature, old_entry.get("raw"))
+                or old_entry.get("exclude_years") != exclude_years
+                or any(einordnen(year, signature, False) is changed for year in source_years)):
+            changed_sources.append(source)
+            continue
+        for year in source_years:
+            signatures["years"][str(year)] = signature
+            year_sources[year] = source.key
+            einordnen(year, signature, False).append(year)
+
+    return {"changed": changed, "export_only": export_only, "cached": cached, "removed": removed,
+            "changed_sources": changed_sources, "exclude_years": exclude_years,
+            "year_sources": year_sources, "precision": precision, "signatures": signatures}
+
+
+def store_result(processed_dir, result):
+    """Speichert das Ergebnis eines Jahres (GeoDataFrame) im Cache."""
+    os.makedirs(cache_dir(processed_dir), exist_ok=True)
+    result["gdf_filtered"].to_pickle(_artifact_path(processed_dir, result["year"]))
+
+
+def load_cached_result(processed_dir, year):
+    """Lädt ein zwischengespeichertes Jahresergebnis im Format von process_year."""
+    import pandas as pd
+
+    gdf = pd.read_pickle(_artifact_path(processed_dir, year))
+    return {
+        'year': year,
+        'gdf_filtered': gdf,
+        'count': len(gdf)
+    }
+
+
+def remove_year(processed_dir, year, entry):
+    """
+    Entfernt die verarbeiteten Dateien eines Jahres, dessen Rohdatei fehlt:
+    zwischengespeichertes Ergebnis, Parquet-Partition, CSV, GeoJSON und
+    Heatmap-Raster.
+    Würfel, Punktspeicher und Gesamtdatei entstehen danach ohne das Jahr neu.
+
+    Args:
+        processed_dir (str): Verzeichnis der verarbeiteten Daten
+        year (int): Jahr
+        entry (dict): Eintrag des Jahres im Manifest
+
+    Returns:
+        list: Pfade der entfernten Dateien bzw. Ordner
+    """
+    entfernt = []
+    parquet = entry.get("parquet")
+    if parquet and os.path.isdir(os.path.dirname(parquet)):
+        # Die ganze Partition UJAHR=<Jahr>, sonst liest der Datensatz das Jahr weiter mit
+        shutil.rmtree(os.path.dirname(parquet))
+        entfernt.append(os.path.dirname(parquet))
+    for path in (_artifact_path(processed_dir, year), entry.get("csv"), entry.get("geojson")):
+        if path and os.path.isfile(path):
+            os.remove(path)
+            entfernt.append(path)
+    for path in sorted(glob.glob(os.path.join(processed_dir, HEATMAP_DIR, f"Heatmap{year}_*.tif"))):
+        os.remove(path)
+        entfernt.append(path)
+    return entfernt
+
+
+def created_files_from_manifest(manifest):
+    """
+    Baut die Rückgabe von export_all aus dem Manifest nach, ohne Daten zu laden.
+
+    Returns:
+        dict: {'parquet_files', 'cube', 'points', 'hotspots', 'tiles', 'heatmaps', 'csv_files',
+               'geojson_files', 'combined_csv'}
+    """
+    entries = sorted(manifest.get("years", {}).items(), key=lambda item: int(item[0]))
+    return {
+        'parquet_files': [entry["parquet"] for _, entry in entries],
+        'cube': manifest.get("cube"),
+        'points': manifest.get("points"),
+        'hotspots': manifest.get("hotspots"),
+        'tiles': manifest.get("tiles"),
+        'heatmaps': manifest.get("heatmaps"),
+        'csv_files': [entry["csv"] for _, entry in entries if entry.get("csv")],
+        'geojson_files': [
+            {'path': entry["geojson"], 'year': int(year), 'count': entry["count"]}
+            for year, entry in entries if entry.get("geojson")
+        ],
+        'combined_csv': manifest.get("combined_csv")
+    }
+
+
+def refresh_signatures(manifest, plan):
+    """
+    Übernimmt die aktuellen Signaturen ins Manifest (z. B. nach einem bloßen
+    `touch`), damit die Dateien beim nächsten Start nicht erneut gehasht werden.
+    """
+    manifest["bezirke"] = plan["signatures"]["bezirke"]
+    manifest["ortsteile"] = plan["signatures"]["ortsteile"]
+    for year, signature in plan["signatures"]["years"].items():
+        if year in manifest.get("years", {}):
+            manifest["years"][year]["raw"] = signature
+    for key, signature in plan["signatures"]["sources"].items():
+        if key in manifest.get("sources", {}):
+            manifest["sources"][key]["raw"] = signature
+    return manifest
+
+
+def build_manifest(plan, all_results, created_files, previous=None):
+    """
+    Erstellt das neue Manifest nach einem erfolgreichen Export.
+
+    Abgeleitete Exporte unveränderter Jahre, die in diesem Lauf nicht
+    geschrieben wurden (z. B. mit --no-csv), bleiben aus dem vorherigen
+    Manifest erhalten.
+
+    Args:
+        plan (dict): Ergebnis von plan_build
+        all_results (list): Ergebnisse aller Jahre (neu und aus dem Cache)
+        created_files (dict): Rückgabe von export_all
+        previous (dict): Manifest des letzten Laufs (optional)
+
+    Returns:
+        dict: Manifest
+    """
+    years = [result["year"] for result in all_results]
+    parquet_by_year = dict(zip(years, created_files["parquet_files"]))
+    csv_by_year = dict(zip(years, created_files["csv_files"]))
+    geojson_by_year = {info["year"]: info["path"] for info in created_files["geojson_files"]}
+
+    old_years = (previous or {}).get("years", {})
+    # Neu verarbeitete Ergebnisse kennen ihre Quelle, übernommene stehen im Plan
+    source_by_year = {result["year"]: result.get("source") or plan["year_sources"].get(result["year"])
+                      for result in all_results}
+    signatures = plan["signatures"]
+    raw_by_year = {year: signatures["years"].get(str(year)) or signatures["sources"].get(key)
+                   for year, key in source_by_year.items()}
+
+    # Auch Mehrjahresdateien ohne Unfälle in Leipzig merken (sonst jedes Mal neu gelesen)
+    multi = {key: [] for key in signatures["sources"]}
+    for year, key in sorted(source_by_year.items()):
+        if key in multi:
+            multi[key].append(year)
+
+    # Genauigkeit der GeoJSON-Koordinaten: neu geschriebene Jahre aus dem Plan
+    exportiert = set(plan["changed"]) | set(plan["export_only"]) if geojson_by_year else set()
+    precision_by_year = {year: plan.get("precision") if year in exportiert
+                         else old_years.get(str(year), {}).get("precision") for year in years}
+
+    for year in years:
+        if year in plan["changed"]:
+            continue
+        old_entry = old_years.get(str(year), {})
+        csv_by_year.setdefault(year, old_entry.get("csv"))
+        geojson_by_year.setdefault(year, old_entry.get("geojson"))
+
+    return {
+        "pipeline_version": PIPELINE_VERSION,
+        "schema_version": schema.SCHEMA_VERSION,
+        "bezirke": plan["signatures"]["bezirke"],
+        "ortsteile": plan["signatures"]["ortsteile"],
+        "combined_csv": created_files["combined_csv"],
+        "cube": created_files["cube"],
+        "points": created_files.get("points"),
+        "hotspots": created_files.get("hotspots"),
+        "tiles": created_files.get("tiles"),
+        "heatmaps": created_files.get("heatmaps"),
+        "sources": {
+            key: {"raw": signatures["sources"][key], "years": source_years,
+                  "exclude_years": plan["exclude_years"]}
+            for key, source_years in multi.items()
+        },
+        "years": {
+            str(result["year"]): {
+                "raw": raw_by_year[result["year"]],
+                "source": source_by_year[result["year"]],
+                "count": result["count"],
+                "parquet": parquet_by_year[result["year"]],
+                "csv": csv_by_year.get(result["year"]),
+                "geojson": geojson_by_year.get(result["year"]),
+                "precision": precision_by_year[result["year"]]
+            }
+            for result in all_results
+        }
+    }
@@ -0,0 +1,64 @@
+"""
+Feste Stammdaten der Auswertungen (Stadtbezirke mit ihren Ortsteilen,
+Verkehrsmittel, Jahreszeiten).
+
+Das Modul kommt ohne pandas/geopandas aus, damit main.py das Menü und die
+Kommandozeilen-Optionen anzeigen kann, ohne die schweren Pakete zu laden.
+"""
+
+# Leipziger Stadtbezirke (Himmelsrichtungen) und die zugehörigen Ortsteile
+stadtteile = {
+    "Nord": [
+        "Gohlis-Mitte", "Gohlis-Nord", "Gohlis-Süd",
+        "Eutritzsch", "Wiederitzsch", "Seehausen"
+    ],
+    "Nordost": [
+        "Schönefeld-Ost", "Schönefeld-Abtnaundorf",
+        "Mockau-Nord", "Mockau-Süd", "Thekla", "Plaußig-Portitz"
+    ],
+    "Ost": [
+        "Neustadt-Neuschönefeld", "Volkmarsdorf",
+        "Anger-Crottendorf", "Sellerhausen-Stünz",
+        "Paunsdorf", "Heiterblick", "Mölkau", "Engelsdorf", "Baalsdorf", "Althen-KLeinpösna"
+    ],
+    "Südost": [
+        "Reudnitz-Thonberg", "Stötteritz",
+        "Probstheida", "Meusdorf", "Liebertwolkwitz",
+        "Holzhausen"
+    ],
+    "Süd": [
+        "Connewitz", "Marienbrunn", "Lößnig",
+        "Dölitz-Dösen", "Südvorstadt"
+    ],
+    "Südwest": [
+        "Kleinzschocher", "Knautkleeberg-Knauthain",
+        "Hartmannsdorf-Knautnaundorf", "Großzschocher", "Schleußig", "Plagwitz"
+    ],
+    "West": [
+        "Grünau-Ost", "Grünau-Mitte", "Grünau-Nord", "Grünau-Siedlung", "Lausen-Grünau", "Miltitz", "Schönau"
+    ],
+    "Nordwest": [
+        "Lindenthal", "Möckern", "Wahren", "Lützschena-Stahmeln"
+    ],
+
+    "Alt-West": [
+        "Böhlitz-Ehrenberg", "Leutzsch", "Altlindenau", "Lindenau", "Neulindenau", "Burghausen-Rückmarsdorf"
+    ],
+
+    "Mitte": [
+        "Zentrum", "Zentrum-Ost", "Zentrum-Süd",
+        "Zentrum-Südost", "Zentrum-Nord", "Zentrum-West", "Zentrum-Nordwest"
+    ]
+}
+
+# Verkehrsmittel mit sinnvollen Bezeichnungen und den zugehörigen Spalten
+VERKEHRSMITTEL = {
+    "PKW": "IstPKW",
+    "Rad": "IstRad",
+    "Fußgänger": "IstFuss",
+    "Kraftrad": "IstKrad",
+    "Sonstige": "IstSonstige",
+}
+
+# Reihenfolge der Jahreszeiten in allen Auswertungen
+JAHRESZEITEN = ["Frühling", "Sommer", "Herbst", "Winter"]
@@ -2,9 +2,177 @@
 Modul für das Einlesen und Filtern von Unfalldaten.
 """
 import csv
+import io
+import numpy as np
 import pandas as pd
 import geopandas as gpd
 import os
+from concurrent.futures import ProcessPoolExecutor
+
+import metrics
+import schema
+import sources
+from district_locator import DistrictLocator
+
+# Bezirksgrenzen und Bezirkssuche des jeweiligen Worker-Prozesses (einmal pro Prozess geladen)
+_worker_bezirke = None
+_worker_locator = None
+
+
+# Spalten der Ortsteil-Datei (Original -> Name in den verarbeiteten Daten);
+# "Name" heißt bei den Stadtbezirken genauso, daher "Ortsteil"
+ORTSTEIL_SPALTEN = {"OT": "OT", "Name": "Ortsteil"}
+
+
+# Spaltenschema für das Einlesen der Unfallatlas-CSVs: Spaltenname -> dtype.
+# Enthält nur Spalten, die exportiert oder ausgewertet werden. Spalten, die es
+# in einem Jahrgang nicht gibt, werden beim Einlesen einfach übersprungen.
+CSV_SCHEMA = {
+    # Kennungen und Gebietsschlüssel (führende Nullen bleiben erhalten)
+    "OBJECTID": "string",
+    "OBJECTID_1": "string",
+    "OID_": "string",
+    "FID": "string",
+    "UIDENTSTLA": "string",
+    "UIDENTSTLAE": "string",
+    "ULAND": "string",
+    "UREGBEZ": "string",
+    "UKREIS": "string",
+    "UGEMEINDE": "string",
+    # Zeitangaben und Unfallmerkmale (kleine Ganzzahl-Codes); als float32 gelesen,
+    # damit leere Zellen NaN werden – schema.normalize macht daraus uint8/uint16
+    "UJAHR": "float32",
+    "UMONAT": "float32",
+    "USTUNDE": "float32",
+    "UWOCHENTAG": "float32",
+    "UKATEGORIE": "float32",
+    "UART": "float32",
+    "UTYP1": "float32",
+    "ULICHTVERH": "float32",
+    "LICHT": "float32",
+    "STRZUSTAND": "float32",
+    "IstStrasse": "float32",
+    "IstStrassenzustand": "float32",
+    # Beteiligte Verkehrsmittel (0/1)
+    "IstRad": "float32",
+    "IstPKW": "float32",
+    "IstFuss": "float32",
+    "IstKrad": "float32",
+    "IstGkfz": "float32",
+    "IstSonstig": "float32",
+    "IstSonstige": "float32",
+    # Koordinaten (Dezimalkomma oder -punkt je Spalte, siehe detect_decimals)
+    "LINREFX": "float64",
+    "LINREFY": "float64",
+    "XGCSWGS84": "float64",
+    "YGCSWGS84": "float64",
+}
+
+# Koordinatenspalten, deren Dezimaltrennzeichen detect_decimals erkennt
+KOORDINATEN = ["LINREFX", "LINREFY", "XGCSWGS84", "YGCSWGS84"]
+
+
+def _sample(path):
+    """
+    Liest die ersten 2048 Zeichen einer CSV-Datei.
+
+    Statt eines Pfads ist auch ein gepufferter Binär-Datenstrom möglich
+    (Source.open); er wird nur angesehen (peek), nicht weitergelesen.
+    """
+    if hasattr(path, 'peek'):
+        return path.peek(2048)[:2048].decode('utf-8', errors='ignore')
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read(2048)
+
+
+def detect_delimiter(path, sample=None):
+    """
+    Erkennt das Trennzeichen einer CSV-Datei anhand der ersten Zeilen.
+    Fallback auf das häufigere Zeichen (Semikolon oder Komma).
+
+    Statt eines Pfads ist auch ein gepufferter Binär-Datenstrom möglich
+    (Source.open); er wird nur angesehen (peek), nicht weitergelesen.
+    Mit `sample` wird der bereits gelesene Dateianfang verwendet.
+    """
+    if sample is None:
+        sample = _sample(path)
+
+    # Versuche automatische Erkennung
+    try:
+        return csv.Sniffer().sniff(sample).delimiter
+    except csv.Error:
+        # Fallback: Prüfe ob Semikolon oder Komma häufiger vorkommt
+        semicolon_count = sample.count(';')
+        comma_count = sample.count(',')
+        delimiter = ';' if semicolon_count > comma_count else ','
+        print(f"    → Automatische Erkennung fehlgeschlagen, verwende '{delimiter}'")
+        return delimiter
+
+
+def detect_decimals(sample, delimiter):
+    """
+    Erkennt das Dezimaltrennzeichen jeder Koordinatenspalte anhand der ersten Zeilen.
+
+    Die Jahrgänge verwenden meist das deutsche Dezimalkomma, einzelne
+    Dateien aber einen Punkt – teils auch nur in einem Teil der Spalten
+    (z. B. LINREFX/Y mit Komma, XGCSWGS84/YGCSWGS84 mit Punkt). Spalten
+    ohne Wert mit Trennzeichen in der Probe fehlen im Ergebnis.
+
+    Args:
+        sample (str): Anfang der CSV-Datei
+        delimiter (str): Trennzeichen (detect_delimiter)
+
+    Returns:
+        dict: Spaltenname -> "," oder "."
+    """
+    zeilen = list(csv.reader(io.StringIO(sample), delimiter=delimiter))
+    trennzeichen = {}
+    if zeilen:
+        kopf = zeilen[0]
+        spalten = {spalte: kopf.index(spalte) for spalte in KOORDINATEN if spalte in kopf}
+        for zeile in zeilen[1:]:
+            for spalte, i in spalten.items():
+                if spalte in trennzeichen or i >= len(zeile):
+                    continue
+                if "," in zeile[i]:
+                    trennzeichen[spalte] = ","
+                elif "." in zeile[i]:
+                    trennzeichen[spalte] = "."
+    return trennzeichen
+
+
+def _decimal(trennzeichen, delimiter):
+    """
+    Wählt das Dezimaltrennzeichen für read_csv: das der meisten Koordinatenspalten.
+
+    Ohne erkannte Spalte (z. B. Datei ohne Zeilen) gilt das Komma – außer es
+    ist das Trennzeichen.
+    """
+    werte = list(trennzeichen.values())
+    if not werte:
+        return "." if delimiter == "," else ","
+    return max(sorted(set(werte)), key=werte.count)
+
+
+def _koordinaten(chunk):
+    """
+    Wandelt die Koordinaten eines Blocks in float64 um.
+
+    Spalten, die read_csv nicht als Zahl erkannt hat (anderes
+    Dezimaltrennzeichen oder einzelne nicht lesbare Werte), werden mit
+    pd.to_numeric umgewandelt; nicht lesbare Werte werden zu NaN und fallen
+    beim Vorfilter heraus, statt das ganze Jahr abzubrechen.
+    """
+    for spalte in KOORDINATEN:
+        if spalte not in chunk.columns:
+            continue
+        if pd.api.types.is_numeric_dtype(chunk[spalte]):
+            if chunk[spalte].dtype != "float64":
+                chunk[spalte] = chunk[spalte].astype("float64")
+        else:
+            werte = chunk[spalte].astype("string").str.replace(",", ".", regex=False)
+            chunk[spalte] = pd.to_numeric(werte, errors="coerce").astype("float64")
+    return chunk
 
 
 def read_csv_auto(path):
@@ -13,23 +181,8 @@ def read_csv_auto(path):
     Fallback auf Semikolon falls Sniffer fehlschlägt.
     """
     try:
-        with open(path, 'r', encoding='utf-8') as f:
-            sample = f.read(2048)
-            f.seek(0)
-
-            # Versuche automatische Erkennung
-            try:
-                dialect = csv.Sniffer().sniff(sample)
-                delimiter = dialect.delimiter
-            except csv.Error:
-                # Fallback: Prüfe ob Semikolon oder Komma häufiger vorkommt
-                semicolon_count = sample.count(';')
-                comma_count = sample.count(',')
-                delimiter = ';' if semicolon_count > comma_count else ','
-                print(f"    → Automatische Erkennung fehlgeschlagen, verwende '{delimiter}'")
-
-            f.seek(0)
-            return pd.read_csv(f, delimiter=delimiter, dtype=str, low_memory=False)
+        delimiter = detect_delimiter(path)
+        return pd.read_csv(path, delimiter=delimiter, dtype=str, low_memory=False, encoding='utf-8')
 
     except Exception as e:
         print(f"    ✗ Fehler beim Einlesen: {e}")
@@ -37,6 +190,71 @@ def read_csv_auto(path):
         return pd.read_csv(path, delimiter=';', dtype=str, low_memory=False, encoding='utf-8')
 
 
+def read_csv_typed(path, schema=None, chunksize=250_000, chunk_filter=None):
+    """
+    Liest eine Unfallatlas-CSV spaltenweise typisiert und blockweise ein.
+
+    Es werden nur die Spalten aus `schema` gelesen. Die Codes werden als
+    float32 gelesen (leere Zellen = NaN, schema.normalize wandelt sie um).
+    Das Dezimaltrennzeichen der Koordinaten wird je Spalte am Dateianfang
+    erkannt (detect_decimals): Spalten mit dem häufigsten Trennzeichen liest
+    der C-Parser direkt als Zahl, die übrigen werden als Text gelesen und je
+    Block umgewandelt. Nicht lesbare Koordinaten werden zu NaN.
+    Mit `chunk_filter` wird jeder Block sofort gefiltert, sodass der
+    Speicherbedarf nicht von der Dateigröße abhängt.
+
+    Args:
+        path (str): Pfad zur CSV-Datei oder Binär-Datenstrom (Source.open)
+        schema (dict): Spaltenname -> dtype (Standard: CSV_SCHEMA)
+        chunksize (int): Zeilen pro Block (None = ganze Datei auf einmal)
+        chunk_filter (callable): Funktion DataFrame -> DataFrame, die auf
+            jeden Block angewendet wird (optional)
+
+    Returns:
+        pd.DataFrame: Eingelesene (und gefilterte) Daten
+    """
+    if schema is None:
+        schema = CSV_SCHEMA
+
+    sample = _sample(path)
+    delimiter = detect_delimiter(path, sample)
+    trennzeichen = detect_decimals(sample, delimiter)
+    decimal = _decimal(trennzeichen, delimiter)
+
+    # Koordinaten ohne festen dtype: der C-Parser liefert float64 oder, bei
+    # einzelnen nicht lesbaren Werten im Block, Text statt eines Abbruchs
+    dtypes = {spalte: dtype for spalte, dtype in schema.items() if spalte not in KOORDINATEN}
+    for spalte in KOORDINATEN:
+        if spalte in schema and trennzeichen.get(spalte, decimal) != decimal:
+            dtypes[spalte] = "string"
+
+    reader = pd.read_csv(
+        path,
+        delimiter=delimiter,
+        usecols=lambda spalte: spalte in schema,
+        dtype=dtypes,
+        decimal=decimal,
+        encoding="utf-8",
+        low_memory=False,
+        chunksize=chunksize
+    )
+
+    if chunksize is None:
+        df = _koordinaten(reader)
+        return chunk_filter(df) if chunk_filter else df
+
+    chunks = []
+    with reader:
+        for chunk in reader:
+            chunk = _koordinaten(chunk)
+            chunks.append(chunk_filter(chunk) if chunk_filter else chunk)
+
+    if not chunks:
+        # Datei ohne Zeilen: leerer Block mit den Spalten des Schemas
+        return pd.DataFrame({spalte: pd.Series(dtype=dtype) for spalte, dtype in schema.items()})
+    return pd.concat(chunks)
+
+
 def load_bezirke(bezirke_path):
     """
     Lädt die Leipziger Bezirksgrenzen (nur einmal).
@@ -50,9 +268,31 @@ def load_bezirke(bezirke_path):
     return gpd.read_file(bezirke_path)
 
 
+def load_ortsteile(ortsteile_path, crs):
+    """
+    Lädt die Leipziger Ortsteilgrenzen (optional).
+
+    Args:
+        ortsteile_path (str): Pfad zur GeoJSON-Datei der Ortsteile (oder None)
+        crs: CRS der Bezirksgrenzen, in das die Ortsteile umgerechnet werden
+
+    Returns:
+        gpd.GeoDataFrame: Ortsteilgrenzen mit den Spalten "OT" und "Ortsteil"
+            oder None, wenn keine Datei vorhanden ist
+    """
+    if not ortsteile_path or not os.path.exists(ortsteile_path):
+        return None
+
+    gdf = gpd.read_file(ortsteile_path)
+    gdf = gdf[list(ORTSTEIL_SPALTEN) + [gdf.geometry.name]].rename(columns=ORTSTEIL_SPALTEN)
+    gdf["OT"] = gdf["OT"].astype("string")
+    return gdf.to_crs(crs)
+
+
 def clean_coordinates(df):
     """
     Korrigiert Dezimaltrennzeichen in Koordinaten.
+    Bereits numerische Spalten (z. B. aus read_csv_typed) bleiben unverändert.
 
     Args:
         df (pd.DataFrame): DataFrame mit Koordinaten
@@ -60,11 +300,50 @@ def clean_coordinates(df):
     Returns:
         pd.DataFrame: Bereinigter DataFrame
     """
-    df["XGCSWGS84"] = df["XGCSWGS84"].str.replace(",", ".").astype(float)
-    df["YGCSWGS84"] = df["YGCSWGS84"].str.replace(",", ".").astype(float)
+    for spalte in ["XGCSWGS84", "YGCSWGS84"]:
+        if not pd.api.types.is_numeric_dtype(df[spalte]):
+            df[spalte] = df[spalte].str.replace(",", ".").astype(float)
     return df
 
 
+def boundaries_bbox_wgs84(gdf_boundaries, margin=0.01):
+    """
+    Ermittelt die Bounding Box der Bezirksgrenzen in WGS84 (Längen-/Breitengrad).
+
+    Args:
+        gdf_boundaries (gpd.GeoDataFrame): Bezirksgrenzen
+        margin (float): Sicherheitsabstand in Grad, der rundherum addiert wird
+            (deckt Abweichungen durch die Umprojektion der Polygonkanten ab)
+
+    Returns:
+        tuple: (min_x, min_y, max_x, max_y) in EPSG:4326
+    """
+    min_x, min_y, max_x, max_y = gdf_boundaries.to_crs("EPSG:4326").total_bounds
+    return (min_x - margin, min_y - margin, max_x + margin, max_y + margin)
+
+
+def prefilter_bbox(df, bbox):
+    """
+    Verwirft alle Zeilen außerhalb der Bounding Box (vektorisiert).
+
+    Läuft direkt auf den WGS84-Koordinaten, bevor Punktgeometrien erzeugt
+    oder umprojiziert werden. Der eigentliche Spatial Join bleibt danach
+    unverändert, das Ergebnis ist daher identisch.
+
+    Args:
+        df (pd.DataFrame): DataFrame mit numerischen XGCSWGS84/YGCSWGS84-Spalten
+        bbox (tuple): (min_x, min_y, max_x, max_y) in EPSG:4326
+
+    Returns:
+        pd.DataFrame: Zeilen innerhalb der Bounding Box
+    """
+    min_x, min_y, max_x, max_y = bbox
+    x = df["XGCSWGS84"].to_numpy()
+    y = df["YGCSWGS84"].to_numpy()
+    mask = (x >= min_x) & (x <= max_x) & (y >= min_y) & (y <= max_y)
+    return df[mask]
+
+
 def create_geodataframe(df):
     """
     Erstellt GeoDataFrame aus Koordinaten.
@@ -82,30 +361,110 @@ def create_geodataframe(df):
     )
 
 
-def filter_by_boundaries(gdf_points, gdf_boundaries):
+def filter_by_boundaries(gdf_points, gdf_boundaries, locator=None):
     """
-    Filtert Punkte nach Bezirksgrenzen (Spatial Join).
+    Filtert Punkte nach Bezirksgrenzen und ergänzt die Bezirksspalten.
+
+    Das Ergebnis entspricht gpd.sjoin(..., how="inner", predicate="within")
+    (gleiche Zeilen, Spalten und Suffixe), die Zuordnung übernimmt aber der
+    DistrictLocator, der die Grenzen nur einmal aufbereitet. Kennt der
+    Locator die Ortsteile, werden im selben Durchlauf die Spalten "OT" und
+    "Ortsteil" ergänzt (leer für Punkte ohne Ortsteil).
 
     Args:
         gdf_points (gpd.GeoDataFrame): Unfall-Punkte
         gdf_boundaries (gpd.GeoDataFrame): Bezirksgrenzen
+        locator (DistrictLocator): Bereits erstellte Bezirkssuche für
+            gdf_boundaries (optional, wird sonst neu erstellt)
 
     Returns:
         gpd.GeoDataFrame: Gefilterte Punkte innerhalb der Grenzen
     """
+    if locator is None:
+        locator = DistrictLocator(gdf_boundaries)
+
     # CRS matchen
-    gdf_points_matched = gdf_points.to_crs(gdf_boundaries.crs)
-
-    # Spatial Join: nur Punkte innerhalb der Bezirksgrenzen
-    return gpd.sjoin(
-        gdf_points_matched,
-        gdf_boundaries,
-        how="inner",
-        predicate="within"
-    )
+    with metrics.stage("reproject") as schritt:
+        schritt.rows_in = len(gdf_points)
+        gdf_points_matched = gdf_points.to_crs(gdf_boundaries.crs)
+
+    with metrics.stage("locate") as schritt:
+        xs = gdf_points_matched.geometry.x.to_numpy()
+        ys = gdf_points_matched.geometry.y.to_numpy()
+        bezirk = locator.locate_index(xs, ys)
+        innen = bezirk >= 0
+        schritt.rows_in, schritt.rows_out = len(xs), int(innen.sum())
+
+    # Bezirksspalten wie beim Spatial Join anhängen (index_right, dann Attribute)
+    punkte = gdf_points_matched[innen]
+    bezirke = gdf_boundaries.drop(columns=gdf_boundaries.geometry.name).iloc[bezirk[innen]]
+    doppelt = [spalte for spalte in bezirke.columns if spalte in punkte.columns]
+    punkte = punkte.rename(columns={spalte: f"{spalte}_left" for spalte in doppelt})
+    bezirke = bezirke.rename(columns={spalte: f"{spalte}_right" for spalte in doppelt})
+
+    bezirke = bezirke.rename_axis("index_right").reset_index().set_axis(punkte.index)
+    ergebnis = pd.concat([punkte, bezirke], axis=1)
+
+    if locator.ortsteile is not None:
+        ortsteil = locator.locate_ortsteil_index(xs[innen], ys[innen])
+        for spalte in ORTSTEIL_SPALTEN.values():
+            werte = locator.ortsteile[spalte].to_numpy(dtype=object)
+            ergebnis[spalte] = pd.array(np.where(ortsteil >= 0, werte[ortsteil], None), dtype="string")
+    return ergebnis
+
+
+def _read_source(source, gdf_leipzig, exclude_years=()):
+    """
+    Liest eine Quelle als Datenstrom blockweise ein; jeder Block wird sofort
+    grob auf die Bounding Box von Leipzig reduziert (nur diese Zeilen werden
+    zu Punkten). Jahre in `exclude_years` werden dabei verworfen.
+
+    Returns:
+        tuple: (vorgefilterte Zeilen als DataFrame, Anzahl gelesener Zeilen)
+    """
+    bbox = boundaries_bbox_wgs84(gdf_leipzig)
+    exclude_years = list(exclude_years)
+    gelesen = 0
+
+    def vorfilter(chunk):
+        nonlocal gelesen
+        gelesen += len(chunk)
+        if exclude_years:
+            chunk = chunk[~chunk["UJAHR"].isin(exclude_years)]
+        return prefilter_bbox(chunk, bbox)
+
+    with metrics.stage("read_csv") as schritt:
+        schritt.read(source.path)
+        with source.open() as stream:
+            df = read_csv_typed(stream, chunk_filter=vorfilter)
+        schritt.rows_in, schritt.rows_out = gelesen, len(df)
+    return df, gelesen
+
+
+def _filter_frame(df, gdf_leipzig, locator=None):
+    """
+    Bereinigt die vorgefilterten Zeilen, ordnet sie den Bezirken zu und
+    bringt sie in das einheitliche Spaltenschema (schema.normalize).
+    """
+    with metrics.stage("clean_coordinates") as schritt:
+        df = clean_coordinates(df)
+        schritt.rows_in = schritt.rows_out = len(df)
+
+    with metrics.stage("create_geodataframe") as schritt:
+        gdf_points = create_geodataframe(df)
+        schritt.rows_in = schritt.rows_out = len(df)
+
+    with metrics.stage("filter_by_boundaries") as schritt:
+        gdf_filtered = filter_by_boundaries(gdf_points, gdf_leipzig, locator)
+        schritt.rows_in, schritt.rows_out = len(gdf_points), len(gdf_filtered)
+
+    with metrics.stage("normalize_schema") as schritt:
+        gdf_filtered = schema.normalize(gdf_filtered)
+        schritt.rows_in = schritt.rows_out = len(gdf_filtered)
+    return gdf_filtered
 
 
-def process_year(year, data_dir, gdf_leipzig):
+def process_year(year, data_dir, gdf_leipzig, locator=None, source=None):
     """
     Verarbeitet ein einzelnes Jahr: CSV einlesen, filtern.
 
@@ -113,25 +472,153 @@ def process_year(year, data_dir, gdf_leipzig):
         year (int): Jahr
         data_dir (str): Pfad zum Datenverzeichnis
         gdf_leipzig (gpd.GeoDataFrame): Leipziger Bezirksgrenzen
+        locator (DistrictLocator): Bezirkssuche für gdf_leipzig (optional)
+        source (sources.Source): Quelle des Jahres (optional, wird sonst in
+            data_dir gesucht – unkomprimiert, .gz, .zst oder im ZIP-Archiv)
 
     Returns:
-        dict: Verarbeitete Daten {'year', 'gdf_filtered', 'count'} oder None
+        dict: Verarbeitete Daten {'year', 'gdf_filtered', 'count', 'source'} oder None
     """
-    csv_path = f"{data_dir}/Unfallorte{year}_LinRef.csv"
+    if source is None:
+        source = sources.year_source(data_dir, year)
 
     # Prüfen ob Datei existiert
-    if not os.path.exists(csv_path):
+    if source is None:
         print(f"  ⊘ Jahr {year}: Datei nicht gefunden")
         return None
 
-    # CSV einlesen und verarbeiten
-    df = read_csv_auto(csv_path)
-    df = clean_coordinates(df)
-    gdf_points = create_geodataframe(df)
-    gdf_filtered = filter_by_boundaries(gdf_points, gdf_leipzig)
+    with metrics.stage("process_year", year=year) as gesamt:
+        gesamt.read(source.path)
+        df, gelesen = _read_source(source, gdf_leipzig)
+        gdf_filtered = _filter_frame(df, gdf_leipzig, locator)
+        gesamt.rows_in, gesamt.rows_out = gelesen, len(gdf_filtered)
 
     return {
         'year': year,
         'gdf_filtered': gdf_filtered,
-        'count': len(gdf_filtered)
+        'count': len(gdf_filtered),
+        'source': source.key
     }
+
+
+def process_source(source, gdf_leipzig, locator=None, exclude_years=()):
+    """
+    Verarbeitet eine Datei mit mehreren Jahren in einem Durchlauf und teilt
+    das Ergebnis anhand der Spalte UJAHR auf.
+
+    Die Datei wird nur einmal gelesen und entpackt; Bounding-Box-Vorfilter und
+    Bezirkszuordnung laufen über alle Jahre gemeinsam.
+
+    Args:
+        source (sources.Source): Quelle mit mehreren Jahren
+        gdf_leipzig (gpd.GeoDataFrame): Leipziger Bezirksgrenzen
+        locator (DistrictLocator): Bezirkssuche für gdf_leipzig (optional)
+        exclude_years (iterable): Jahre, die übersprungen werden (z. B. weil
+            es eine eigene Jahresdatei gibt)
+
+    Returns:
+        list: Ergebnisse wie bei process_year, eines je Jahr (aufsteigend)
+    """
+    with metrics.stage("process_source", source=source.name) as gesamt:
+        gesamt.read(source.path)
+        df, gelesen = _read_source(source, gdf_leipzig, exclude_years)
+        gdf_filtered = _filter_frame(df, gdf_leipzig, locator)
+        gesamt.rows_in, gesamt.rows_out = gelesen, len(gdf_filtered)
+
+    results = []
+    for year, gdf_year in gdf_filtered.groupby("UJAHR", sort=True):
+        results.append({
+            'year': int(year),
+            'gdf_filtered': gdf_year,
+            'count': len(gdf_year),
+            'source': source.key
+        })
+    return results
+
+
+def _init_worker(bezirke_path, ortsteile_path=None, profile_dir=None):
+    """
+    Initializer für die Worker-Prozesse: lädt die Bezirksgrenzen und baut die
+    Bezirkssuche einmal pro Prozess, damit beides nicht für jedes Jahr erneut
+    gepickelt bzw. aufbereitet werden muss.
+    """
+    global _worker_bezirke, _worker_locator
+    # Beim Start per fork geerbte Messungen des Hauptprozesses verwerfen
+    metrics.take_records()
+    if profile_dir:
+        metrics.enable_profiling(profile_dir)
+    _worker_bezirke = load_bezirke(bezirke_path)
+    _worker_locator = DistrictLocator(
+        _worker_bezirke, ortsteile=load_ortsteile(ortsteile_path, _worker_bezirke.crs)
+    )
+
+
+def _process(aufgabe, data_dir, gdf_leipzig, locator, exclude_years):
+    """
+    Verarbeitet ein Jahr (int) oder eine Quelle mit mehreren Jahren (Source).
+
+    Returns:
+        list: Ergebnisse (bei einem fehlenden Jahr [None])
+    """
+    if isinstance(aufgabe, sources.Source):
+        return process_source(aufgabe, gdf_leipzig, locator, exclude_years)
+    return [process_year(aufgabe, data_dir, gdf_leipzig, locator)]
+
+
+def _process_in_worker(aufgabe, data_dir, exclude_years):
+    """
+    Verarbeitet ein Jahr bzw. eine Quelle mit den Bezirksgrenzen des Worker-Prozesses.
+
+    Returns:
+        tuple: (Ergebnisse, Messungen für den Hauptprozess)
+    """
+    results = _process(aufgabe, data_dir, _worker_bezirke, _worker_locator, exclude_years)
+    return results, metrics.take_records()
+
+
+def process_years(years, data_dir, bezirke_path, gdf_leipzig=None, workers=1, ortsteile_path=None,
+                  multi_sources=(), exclude_years=()):
+    """
+    Verarbeitet mehrere Jahre, optional parallel in einem Prozess-Pool.
+
+    Die Ergebnisse werden immer in der Reihenfolge von `years` geliefert,
+    danach die Jahre aus `multi_sources` (je Quelle aufsteigend), damit der
+    Export unabhängig von der Anzahl der Worker identisch bleibt.
+
+    Args:
+        years (iterable): Jahre, die verarbeitet werden sollen
+        data_dir (str): Pfad zum Datenverzeichnis
+        bezirke_path (str): Pfad zur GeoJSON-Datei der Bezirke
+        gdf_leipzig (gpd.GeoDataFrame): Bereits geladene Bezirksgrenzen
+            (nur für die serielle Verarbeitung, optional)
+        workers (int): Anzahl paralleler Prozesse (1 = seriell)
+        ortsteile_path (str): Pfad zur GeoJSON-Datei der Ortsteile (optional)
+        multi_sources (iterable): Quellen mit mehreren Jahren (sources.Source)
+        exclude_years (iterable): Jahre, die aus multi_sources nicht übernommen
+            werden (z. B. weil es eine eigene Jahresdatei gibt)
+
+    Yields:
+        dict oder None: Ergebnis von process_year bzw. process_source je Jahr
+    """
+    aufgaben = list(years) + list(multi_sources)
+    exclude_years = sorted(exclude_years)
+
+    if workers <= 1 or len(aufgaben) <= 1:
+        if gdf_leipzig is None:
+            gdf_leipzig = load_bezirke(bezirke_path)
+        locator = DistrictLocator(gdf_leipzig, ortsteile=load_ortsteile(ortsteile_path, gdf_leipzig.crs))
+        for aufgabe in aufgaben:
+            yield from _process(aufgabe, data_dir, gdf_leipzig, locator, exclude_years)
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(aufgaben)),
+        initializer=_init_worker,
+        initargs=(bezirke_path, ortsteile_path, metrics.profile_dir())
+    ) as executor:
+        # executor.map liefert die Ergebnisse in Eingabereihenfolge
+        for results, messungen in executor.map(_process_in_worker, aufgaben,
+                                               [data_dir] * len(aufgaben),
+                                               [exclude_years] * len(aufgaben)):
+            metrics.add_records(messungen)
+            yield from results
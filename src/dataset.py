@@ -0,0 +1,103 @@
+"""
+Modul für den gemeinsamen Unfall-Datensatz einer Sitzung.
+
+Die Daten werden einmal aufgebaut – direkt aus den Verarbeitungsergebnissen im
+Speicher oder bei Bedarf von der Festplatte – und dann von allen Auswertungen
+im Menü gemeinsam genutzt. Abgeleitete Spalten wie "Jahreszeit" werden nur
+einmal berechnet.
+
+Für die Standard-Auswertungen wird der vorberechnete Unfallwürfel genutzt
+(siehe aggregate_cube), die einzelnen Unfälle werden nur bei Bedarf geladen.
+
+pandas und die Auswertungsmodule werden erst beim ersten Zugriff importiert,
+damit main.py das Menü ohne diese Pakete anzeigen kann.
+"""
+from pathlib import Path
+
+from constants import VERKEHRSMITTEL
+
+# Spalten, die die Auswertungen benötigen
+ANALYSE_SPALTEN = ["Name", "UMONAT", "UJAHR"] + list(VERKEHRSMITTEL.values())
+
+
+class AccidentDataset:
+    """
+    Unfalldaten einer Sitzung, die von allen Auswertungen geteilt werden.
+
+    Beispiel:
+        datensatz = AccidentDataset.from_results(all_results)
+        datensatz.unfaelle                  # alle Unfälle inkl. "Jahreszeit"
+        datensatz.wuerfel                   # aggregierter Würfel inkl. "Jahreszeit"
+        datensatz.stadtbezirk("Nord")       # zwischengespeicherte Würfel-Teilmenge
+    """
+
+    def __init__(self, unfaelle=None, loader=None, wuerfel=None,
+                 processed_dir=Path("../data/processed")):
+        """
+        Args:
+            unfaelle (pd.DataFrame): Bereits geladene Unfälle (optional)
+            loader (callable): Lädt die Unfälle bei Bedarf (Standard: collect_data
+                aus UnfaelleStadtbezirkeNachJahreszeiten)
+            wuerfel (pd.DataFrame): Bereits erstellter Unfallwürfel (optional)
+            processed_dir (Path): Verzeichnis, aus dem der Würfel geladen wird
+        """
+        self._unfaelle = unfaelle
+        self._loader = loader
+        self._wuerfel = wuerfel
+        self._processed_dir = processed_dir
+        self._stadtbezirke = {}
+
+    @classmethod
+    def from_results(cls, all_results, wuerfel=None):
+        """
+        Baut den Datensatz aus den Ergebnissen von process_year auf,
+        ohne die gerade exportierten Dateien erneut einzulesen.
+
+        Args:
+            all_results (list): Ergebnisse aller Jahre
+            wuerfel (pd.DataFrame): Beim Export erstellter Würfel (sonst wird er hier gebaut)
+        """
+        import pandas as pd
+
+        import aggregate_cube
+
+        def loader():
+            frames = [pd.DataFrame(result['gdf_filtered'][ANALYSE_SPALTEN]) for result in all_results]
+            return pd.concat(frames, ignore_index=True)
+
+        if wuerfel is None:
+            wuerfel = aggregate_cube.build_cube(result['gdf_filtered'] for result in all_results)
+        return cls(loader=loader, wuerfel=wuerfel)
+
+    @classmethod
+    def from_disk(cls):
+        """Datensatz, der beim ersten Zugriff von der Festplatte geladen wird."""
+        return cls()
+
+    @property
+    def unfaelle(self):
+        """Alle Unfälle inkl. der Spalte "Jahreszeit" (wird nur einmal geladen/berechnet)."""
+        if self._unfaelle is None:
+            from aggregate_cube import als_kategorien
+            from UnfaelleStadtbezirkeNachJahreszeiten import collect_data
+            self._unfaelle = als_kategorien((self._loader or collect_data)())
+        return self._unfaelle
+
+    @property
+    def wuerfel(self):
+        """Aggregierter Unfallwürfel inkl. der Spalte "Jahreszeit" (einmal geladen)."""
+        import aggregate_cube
+
+        if self._wuerfel is None:
+            self._wuerfel = aggregate_cube.load_cube(self._processed_dir)
+        if "Jahreszeit" not in self._wuerfel.columns:
+            self._wuerfel = aggregate_cube.add_jahreszeit(self._wuerfel)
+        return self._wuerfel
+
+    def stadtbezirk(self, name):
+        """Würfelzellen eines Stadtbezirks (Teilmenge wird zwischengespeichert)."""
+        if name not in self._stadtbezirke:
+            from aggregate_cube import bezirk_maske
+            wuerfel = self.wuerfel
+            self._stadtbezirke[name] = wuerfel[bezirk_maske(wuerfel, name)]
+        return self._stadtbezirke[name]
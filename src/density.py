@@ -0,0 +1,273 @@
+"""
+Modul für vorberechnete Heatmaps (Kerndichte-Raster).
+
+Statt die Dichte in QGIS bei jedem Neuzeichnen zu schätzen (QgsHeatmapRenderer),
+werden die Kerndichten einmal beim Export berechnet: auf einem festen Raster
+über die Leipziger Stadtbezirke (EPSG:25833, Zellgröße ZELLE Meter), für jedes
+Jahr insgesamt und je Verkehrsmittel (Ist*-Spalten). Die Glättung mit einem
+Gauß-Kern erfolgt per FFT-Faltung (NumPy), die Punkte werden vorher per
+bincount auf das Raster gezählt.
+
+Alle Raster einer Art (z. B. "IstRad") teilen sich eine Farbskala (Maximum über
+alle Jahre), damit die Jahre in QGIS direkt vergleichbar sind. Geschrieben
+werden unkomprimierte GeoTIFFs für QGIS und ein JSON-Index; aus Python lassen
+sich die Raster über load_grid direkt als NumPy-Array (memmap) lesen.
+"""
+import json
+import os
+import struct
+
+import numpy as np
+
+from aggregate_cube import VERKEHRSMITTEL
+
+HEATMAP_DIR = "heatmaps"
+INDEX_NAME = "Heatmaps_Leipzig.json"
+
+# Rasterweite und Bandbreite (Standardabweichung des Gauß-Kerns) in Metern
+ZELLE = 50
+SIGMA = 150
+
+# Raster je Jahr: alle Unfälle und je Verkehrsmittel
+ARTEN = ["GESAMT"] + VERKEHRSMITTEL
+
+# EPSG-Code des Rasters (ETRS89 / UTM 33N, wie die Stadtbezirke)
+EPSG = 25833
+
+
+def heatmap_dir(processed_dir):
+    """Verzeichnis der Heatmap-Raster."""
+    return os.path.join(processed_dir, HEATMAP_DIR)
+
+
+def raster_from_boundaries(gdf_boundaries, zelle=ZELLE, sigma=SIGMA):
+    """
+    Legt das feste Raster über die Ausdehnung der Stadtbezirke fest
+    (mit einem Rand von 3 Sigma, damit die Dichte am Rand nicht abbricht).
+
+    Returns:
+        dict: {'xmin', 'ymax', 'breite', 'hoehe', 'zelle', 'sigma'}
+    """
+    xmin, ymin, xmax, ymax = gdf_boundaries.to_crs(epsg=EPSG).total_bounds
+    rand = 3 * sigma
+    xmin = np.floor((xmin - rand) / zelle) * zelle
+    ymax = np.ceil((ymax + rand) / zelle) * zelle
+    return {
+        "xmin": float(xmin),
+        "ymax": float(ymax),
+        "breite": int(np.ceil((xmax + rand - xmin) / zelle)),
+        "hoehe": int(np.ceil((ymax - (ymin - rand)) / zelle)),
+        "zelle": zelle,
+        "sigma": sigma,
+    }
+
+
+def _fft_groesse(n):
+    """Kleinste Länge >= n, die nur die Primfaktoren 2, 3 und 5 hat (schnelle FFT)."""
+    while True:
+        rest = n
+        for faktor in (2, 3, 5):
+            while rest % faktor == 0:
+                rest //= faktor
+        if rest == 1:
+            return n
+        n += 1
+
+
+def _kernel_fft(form, zelle, sigma):
+    """
+    Fourier-Transformierte des Gauß-Kerns für ein (gepolstertes) Raster.
+    Der Kern ist auf 1 normiert, die Summe der Dichte bleibt also erhalten.
+    """
+    hoehe, breite = form
+    dy = np.minimum(np.arange(hoehe), hoehe - np.arange(hoehe)) * zelle
+    dx = np.minimum(np.arange(breite), breite - np.arange(breite)) * zelle
+    kern = np.exp(-(dy[:, None] ** 2 + dx[None, :] ** 2) / (2 * sigma ** 2))
+    return np.fft.rfft2(kern / kern.sum())
+
+
+def _zellindex(xs, ys, raster):
+    """Lineare Rasterindizes (Zeile von Norden) der Punkte; -1 außerhalb."""
+    spalte = np.floor((xs - raster["xmin"]) / raster["zelle"]).astype(np.int64)
+    zeile = np.floor((raster["ymax"] - ys) / raster["zelle"]).astype(np.int64)
+    innen = (spalte >= 0) & (spalte < raster["breite"]) & (zeile >= 0) & (zeile < raster["hoehe"])
+    return np.where(innen, zeile * raster["breite"] + spalte, -1)
+
+
+def _kern(raster):
+    """Polster, Rastergröße für die FFT und Kern-FFT für ein Raster."""
+    # Polster gegen das Umschlagen der zyklischen FFT-Faltung an den Rändern
+    polster = int(np.ceil(4 * raster["sigma"] / raster["zelle"]))
+    form = (_fft_groesse(raster["hoehe"] + 2 * polster), _fft_groesse(raster["breite"] + 2 * polster))
+    return polster, form, _kernel_fft(form, raster["zelle"], raster["sigma"])
+
+
+def kde_grids(xs, ys, gewichte, raster, kern=None):
+    """
+    Kerndichte mehrerer Gewichtungen derselben Punkte.
+
+    Alle Gewichtungen werden gemeinsam gezählt und in einem FFT-Aufruf
+    gefaltet.
+
+    Args:
+        xs, ys (np.ndarray): Koordinaten in EPSG:25833
+        gewichte (dict): Name -> Gewicht je Punkt (z. B. 1 für alle, IstRad)
+        raster (dict): Rückgabe von raster_from_boundaries
+        kern (tuple): Rückgabe von _kern (wird sonst für jeden Aufruf neu berechnet)
+
+    Returns:
+        dict: Name -> np.ndarray (hoehe x breite, float32) in Unfällen je km²
+    """
+    hoehe, breite = raster["hoehe"], raster["breite"]
+    polster, form, kern_fft = kern or _kern(raster)
+    je_km2 = 1e6 / raster["zelle"] ** 2
+
+    index = _zellindex(xs, ys, raster)
+    innen = index >= 0
+
+    gepolstert = np.zeros((len(gewichte),) + form)
+    for i, gewicht in enumerate(gewichte.values()):
+        zaehlung = np.bincount(index[innen], weights=np.asarray(gewicht, dtype=np.float64)[innen],
+                               minlength=hoehe * breite)
+        gepolstert[i, polster:polster + hoehe, polster:polster + breite] = zaehlung.reshape(hoehe, breite)
+
+    dichte = np.fft.irfft2(np.fft.rfft2(gepolstert) * kern_fft, s=form)
+    dichte = dichte[:, polster:polster + hoehe, polster:polster + breite]
+    # Rundungsrauschen der FFT entfernen
+    dichte = (np.clip(dichte, 0, None) * je_km2).astype(np.float32)
+    return dict(zip(gewichte, dichte))
+
+
+def write_geotiff(path, grid, raster):
+    """
+    Schreibt ein Raster als unkomprimiertes Float32-GeoTIFF (EPSG:25833).
+
+    Es werden nur die Tags geschrieben, die QGIS/GDAL für Lage und CRS
+    benötigen (ModelPixelScale, ModelTiepoint, GeoKeyDirectory).
+
+    Returns:
+        int: Byte-Versatz der Bilddaten in der Datei (für load_grid)
+    """
+    hoehe, breite = grid.shape
+    daten = np.ascontiguousarray(grid, dtype="<f4").tobytes()
+
+    pixel_scale = struct.pack("<3d", raster["zelle"], raster["zelle"], 0.0)
+    tiepoint = struct.pack("<6d", 0.0, 0.0, 0.0, raster["xmin"], raster["ymax"], 0.0)
+    # GTModelType = projiert, GTRasterType = PixelIsArea, ProjectedCSType = EPSG
+    geokeys = struct.pack("<16H", 1, 1, 0, 3, 1024, 0, 1, 1, 1025, 0, 1, 1, 3072, 0, 1, EPSG)
+
+    # (Tag, Typ, Anzahl, Wert bzw. Zusatzdaten); Typen: 3 = SHORT, 4 = LONG, 12 = DOUBLE
+    eintraege = [
+        (256, 4, 1, breite),
+        (257, 4, 1, hoehe),
+        (258, 3, 1, 32),
+        (259, 3, 1, 1),
+        (262, 3, 1, 1),
+        (273, 4, 1, None),  # Offset der Bilddaten, wird unten gesetzt
+        (277, 3, 1, 1),
+        (278, 4, 1, hoehe),
+        (279, 4, 1, len(daten)),
+        (284, 3, 1, 1),
+        (339, 3, 1, 3),
+        (33550, 12, 3, pixel_scale),
+        (33922, 12, 6, tiepoint),
+        (34735, 3, 16, geokeys),
+    ]
+
+    ifd_start = 8
+    extra_start = ifd_start + 2 + 12 * len(eintraege) + 4
+    extra = b"".join(wert for _, _, _, wert in eintraege if isinstance(wert, bytes))
+    daten_start = extra_start + len(extra)
+
+    ifd = struct.pack("<H", len(eintraege))
+    versatz = extra_start
+    for tag, typ, anzahl, wert in eintraege:
+        if isinstance(wert, bytes):
+            ifd += struct.pack("<HHII", tag, typ, anzahl, versatz)
+            versatz += len(wert)
+        else:
+            wert = daten_start if tag == 273 else wert
+            fmt = "<HHIHxx" if typ == 3 else "<HHII"
+            ifd += struct.pack(fmt, tag, typ, anzahl, wert)
+    ifd += struct.pack("<I", 0)
+
+    with open(path, "wb") as f:
+        f.write(b"II" + struct.pack("<HI", 42, ifd_start))
+        f.write(ifd)
+        f.write(extra)
+        f.write(daten)
+    return daten_start
+
+
+def build_heatmaps(results, processed_dir, raster):
+    """
+    Berechnet die Heatmaps aller Jahre und Verkehrsmittel und speichert sie.
+    Jahre ohne Unfälle in Leipzig erhalten leere Raster.
+
+    Args:
+        results (iterable): Ergebnisse je Jahr ({'year', 'gdf_filtered'}, siehe process_year)
+        processed_dir (str): Verzeichnis der verarbeiteten Daten
+        raster (dict): Rückgabe von raster_from_boundaries
+
+    Returns:
+        str: Pfad des JSON-Index (Raster-Dateien, gemeinsame Farbskala)
+    """
+    ziel = heatmap_dir(processed_dir)
+    os.makedirs(ziel, exist_ok=True)
+
+    eintraege = []
+    skala = dict.fromkeys(ARTEN, 0.0)
+    kern = _kern(raster)
+
+    for result in results:
+        year = int(result["year"])
+        gdf = result["gdf_filtered"]
+        geometrie = gdf.geometry.to_crs(epsg=EPSG)
+
+        gewichte = {"GESAMT": np.ones(len(gdf))}
+        for art in VERKEHRSMITTEL:
+            gewichte[art] = gdf[art].to_numpy(dtype=np.float64)
+
+        grids = kde_grids(geometrie.x.to_numpy(), geometrie.y.to_numpy(), gewichte, raster, kern)
+        for art, grid in grids.items():
+            path = os.path.join(ziel, f"Heatmap{year}_{art}.tif")
+            offset = write_geotiff(path, grid, raster)
+            eintraege.append({"path": os.path.abspath(path), "year": year, "art": art, "offset": offset})
+            skala[art] = max(skala[art], float(grid.max()))
+
+    index_path = os.path.join(ziel, INDEX_NAME)
+    with open(index_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "crs": f"EPSG:{EPSG}",
+            "einheit": "Unfälle je km²",
+            "raster": raster,
+            "skala": skala,
+            "dateien": eintraege,
+        }, f, indent=2, ensure_ascii=False)
+    return index_path
+
+
+def load_index(index_path):
+    """Lädt den JSON-Index der Heatmaps."""
+    with open(index_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_grid(index, year, art="GESAMT"):
+    """
+    Liest ein Heatmap-Raster als NumPy-Array, ohne die Datei zu kopieren
+    (memmap auf die Bilddaten des GeoTIFFs).
+
+    Args:
+        index (dict): Rückgabe von load_index
+        year (int): Jahr
+        art (str): "GESAMT" oder eine Ist*-Spalte
+
+    Returns:
+        np.memmap: hoehe x breite, Unfälle je km²
+    """
+    for eintrag in index["dateien"]:
+        if eintrag["year"] == year and eintrag["art"] == art:
+            form = (index["raster"]["hoehe"], index["raster"]["breite"])
+            return np.memmap(eintrag["path"], dtype="<f4", mode="r", offset=eintrag["offset"], shape=form)
+    raise KeyError(f"Keine Heatmap für {year}/{art}")
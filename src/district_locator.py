@@ -0,0 +1,184 @@
+"""
+Modul für die Zuordnung von Koordinaten zu Leipziger Stadtbezirken.
+
+Der DistrictLocator wird einmal aus den Bezirksgrenzen (load_bezirke) gebaut
+und beantwortet danach beliebig viele Anfragen "In welchem Stadtbezirk liegt
+dieser Punkt?" – für ganze NumPy-Arrays auf einmal oder einzeln mit Cache.
+
+Für die schnelle Suche wird ein Raster über die Stadtbezirke gelegt: Zellen,
+die vollständig in einem Bezirk liegen, liefern den Bezirk direkt per
+Array-Zugriff. Nur Punkte in Zellen an einer Bezirksgrenze werden exakt
+geprüft (STRtree für die Kandidaten, vorbereitete Geometrien für den Test).
+
+Optional kennt der Locator zusätzlich die Ortsteile: Beide Ebenen werden dann
+im selben Durchlauf über die Koordinaten bestimmt (locate_index und
+locate_ortsteil_index teilen sich die umgerechneten Punkte).
+"""
+from functools import lru_cache
+
+import numpy as np
+import shapely
+
+# Kantenlänge der Rasterzellen in Einheiten des Bezirks-CRS (Meter bei EPSG:25833)
+RASTER_ZELLE = 25
+
+# Anzahl zwischengespeicherter Einzelabfragen (locate_one)
+CACHE_GROESSE = 65536
+
+# Rasterwerte: außerhalb aller Bezirke bzw. Zelle an einer Grenze (exakt prüfen)
+_AUSSERHALB = -1
+_GRENZE = -2
+
+
+class DistrictLocator:
+    """
+    Punkt-in-Polygon-Suche für die Stadtbezirke.
+
+    Beispiel:
+        locator = DistrictLocator(load_bezirke(bezirke_file))
+        locator.locate(xs, ys)          # SBZ-Codes für ganze Arrays (None = außerhalb)
+        locator.locate_one(x, y)        # einzelner Punkt (mit LRU-Cache)
+
+        locator = DistrictLocator(bezirke, ortsteile=load_ortsteile(ortsteile_file, bezirke.crs))
+        locator.locate_ortsteil_index(xs, ys)   # Position in ortsteile, -1 ohne Ortsteil
+
+    Die Koordinaten werden im CRS der Bezirksgrenzen erwartet (locator.crs).
+    Ein Punkt auf einer Bezirksgrenze gehört – wie bei gpd.sjoin mit
+    predicate="within" – zu keinem Bezirk.
+    """
+
+    def __init__(self, gdf_bezirke, code_column="SBZ", zelle=RASTER_ZELLE, cache_size=CACHE_GROESSE,
+                 ortsteile=None):
+        """
+        Args:
+            gdf_bezirke (gpd.GeoDataFrame): Bezirksgrenzen (z. B. aus load_bezirke)
+            code_column (str): Spalte mit dem Bezirkscode
+            zelle (float): Kantenlänge der Rasterzellen
+            cache_size (int): Größe des LRU-Caches für locate_one (0 = kein Cache)
+            ortsteile (gpd.GeoDataFrame): Ortsteilgrenzen im selben CRS mit den
+                Spalten "OT" und "Ortsteil" (optional, z. B. aus load_ortsteile)
+        """
+        self.crs = gdf_bezirke.crs
+        self.codes = gdf_bezirke[code_column].to_numpy()
+
+        self._geometrien = np.asarray(gdf_bezirke.geometry.array)
+        shapely.prepare(self._geometrien)
+        self._tree = shapely.STRtree(self._geometrien)
+
+        self._zelle = zelle
+        self._raster_bauen()
+
+        # Ortsteile als zweite, feinere Ebene mit eigenem Raster
+        self.ortsteile = None
+        if ortsteile is not None and len(ortsteile):
+            self.ortsteile = ortsteile.drop(columns=ortsteile.geometry.name)
+            self._ortsteil_locator = DistrictLocator(ortsteile, code_column="OT", zelle=zelle, cache_size=0)
+
+        self.locate_one = lru_cache(maxsize=cache_size)(self._locate_one) if cache_size else self._locate_one
+
+    def _raster_bauen(self):
+        """Ordnet jeder Rasterzelle einen Bezirk zu (bzw. _AUSSERHALB/_GRENZE)."""
+        xmin, ymin, xmax, ymax = shapely.total_bounds(self._geometrien)
+        zelle = self._zelle
+        self._x0, self._y0 = xmin, ymax
+        breite = int(np.ceil((xmax - xmin) / zelle)) + 1
+        hoehe = int(np.ceil((ymax - ymin) / zelle)) + 1
+
+        # Zellmittelpunkte entscheiden für alle Zellen, die keine Grenze berühren
+        spalten_x = xmin + (np.arange(breite) + 0.5) * zelle
+        zeilen_y = ymax - (np.arange(hoehe) + 0.5) * zelle
+        cx, cy = np.meshgrid(spalten_x, zeilen_y)
+        raster = np.full((hoehe, breite), _AUSSERHALB, dtype=np.int16)
+        for i, geometrie in enumerate(self._geometrien):
+            raster[shapely.contains_xy(geometrie, cx, cy)] = i
+
+        # Grenzzellen: Stützpunkte der auf zelle/2 verdichteten Grenzlinien und
+        # deren Nachbarzellen (jedes Liniensegment liegt damit vollständig in markierten Zellen)
+        grenzen = shapely.segmentize(shapely.boundary(self._geometrien), zelle / 2)
+        gx, gy = shapely.get_coordinates(grenzen).T
+        grenze = np.zeros((hoehe, breite), dtype=bool)
+        grenze[self._zeilen(gy).clip(0, hoehe - 1), self._spalten(gx).clip(0, breite - 1)] = True
+        for achse in (0, 1):
+            nachbarn = grenze.copy()
+            if achse == 0:
+                nachbarn[1:, :] |= grenze[:-1, :]
+                nachbarn[:-1, :] |= grenze[1:, :]
+            else:
+                nachbarn[:, 1:] |= grenze[:, :-1]
+                nachbarn[:, :-1] |= grenze[:, 1:]
+            grenze = nachbarn
+
+        raster[grenze] = _GRENZE
+        self._raster = raster
+
+    def _spalten(self, xs):
+        return np.floor((xs - self._x0) / self._zelle).astype(np.int64)
+
+    def _zeilen(self, ys):
+        return np.floor((self._y0 - ys) / self._zelle).astype(np.int64)
+
+    def _exakt(self, xs, ys):
+        """Exakte Prüfung: Kandidaten aus dem STRtree, dann contains je Bezirk."""
+        treffer = np.full(len(xs), _AUSSERHALB, dtype=np.int64)
+        punkt_idx, bezirk_idx = self._tree.query(shapely.points(xs, ys))
+        for i in np.unique(bezirk_idx):
+            kandidaten = punkt_idx[bezirk_idx == i]
+            innen = shapely.contains_xy(self._geometrien[i], xs[kandidaten], ys[kandidaten])
+            treffer[kandidaten[innen]] = i
+        return treffer
+
+    def locate_index(self, xs, ys):
+        """
+        Zeilennummern der Bezirke (Position in gdf_bezirke) für viele Punkte.
+
+        Args:
+            xs, ys (array-like): Koordinaten im CRS der Bezirksgrenzen
+
+        Returns:
+            np.ndarray: Position des Bezirks je Punkt, -1 außerhalb
+        """
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        hoehe, breite = self._raster.shape
+
+        with np.errstate(invalid="ignore"):
+            gueltig = np.isfinite(xs) & np.isfinite(ys)
+            spalte = np.where(gueltig, self._spalten(np.where(gueltig, xs, self._x0)), -1)
+            zeile = np.where(gueltig, self._zeilen(np.where(gueltig, ys, self._y0)), -1)
+        innen = (spalte >= 0) & (spalte < breite) & (zeile >= 0) & (zeile < hoehe)
+
+        ergebnis = np.full(len(xs), _AUSSERHALB, dtype=np.int64)
+        ergebnis[innen] = self._raster[zeile[innen], spalte[innen]]
+
+        unsicher = np.flatnonzero(ergebnis == _GRENZE)
+        if unsicher.size:
+            ergebnis[unsicher] = self._exakt(xs[unsicher], ys[unsicher])
+        return ergebnis
+
+    def locate(self, xs, ys):
+        """
+        Bezirkscodes (SBZ) für viele Punkte.
+
+        Returns:
+            np.ndarray: Code je Punkt (dtype object), None außerhalb Leipzigs
+        """
+        index = self.locate_index(xs, ys)
+        codes = np.empty(len(index), dtype=object)
+        codes[index >= 0] = self.codes[index[index >= 0]]
+        return codes
+
+    def locate_ortsteil_index(self, xs, ys):
+        """
+        Zeilennummern der Ortsteile (Position in locator.ortsteile) für viele Punkte.
+
+        Returns:
+            np.ndarray: Position des Ortsteils je Punkt, -1 ohne Ortsteil
+                (auch wenn keine Ortsteile geladen sind)
+        """
+        if self.ortsteile is None:
+            return np.full(len(xs), _AUSSERHALB, dtype=np.int64)
+        return self._ortsteil_locator.locate_index(xs, ys)
+
+    def _locate_one(self, x, y):
+        """Bezirkscode eines einzelnen Punkts (None außerhalb)."""
+        return self.locate(np.array([x]), np.array([y]))[0]
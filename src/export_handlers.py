@@ -1,5 +1,21 @@
-import os  # ← Das fehlt!
+import json
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import numpy as np
 import pandas as pd
+import parquet_store
+import point_store
+import aggregate_cube
+import vector_tiles
+import density
+import metrics
+import schema
+
+# Anzahl Threads, auf denen export_all die Dateien schreibt
+EXPORT_THREADS = min(4, os.cpu_count() or 1)
 
 
 def export_single_csv(gdf, year, output_dir):
@@ -9,58 +25,292 @@ def export_single_csv(gdf, year, output_dir):
     df_for_csv.to_csv(csv_path, index=False, encoding='utf-8')
     return csv_path
 
-def export_single_geojson(gdf, year, output_dir):
-    """Exportiert gefilterte Daten als GeoJSON für ein Jahr."""
-    geojson_path = f"{output_dir}/geojson/Unfallorte{year}_Leipzig.geojson"
-    gdf.to_file(geojson_path, driver="GeoJSON")
+# Spalten, die nicht in die GeoJSON-Dateien übernommen werden: Koordinaten,
+# die bereits in der Geometrie stecken
+GEOJSON_OHNE_SPALTEN = ["LINREFX", "LINREFY", "XGCSWGS84", "YGCSWGS84"]
+
+# Dateiendung je GeoJSON-Format ("geojsonseq" = ein Feature pro Zeile, RFC 8142)
+GEOJSON_ENDUNGEN = {"geojson": ".geojson", "geojsonseq": ".geojsonl"}
+
+
+def geojson_path(output_dir, year, fmt="geojson"):
+    """Pfad der GeoJSON-Datei eines Jahres im gewünschten Format."""
+    return f"{output_dir}/geojson/Unfallorte{year}_Leipzig{GEOJSON_ENDUNGEN[fmt]}"
+
+
+def _geojson_features(gdf, precision):
+    """
+    Erzeugt die Features eines (Punkt-)GeoDataFrames als kompakte JSON-Zeilen.
+
+    Die Attribute werden von pandas in einem Schritt kodiert, die Koordinaten
+    direkt aus den x/y-Arrays formatiert (ohne Umweg über Shapely-Objekte).
+    """
+    properties = pd.DataFrame(gdf.drop(columns=[gdf.geometry.name]))
+    zeilen = properties.to_json(orient="records", lines=True, force_ascii=False).splitlines()
+
+    xs, ys = gdf.geometry.x.to_numpy(), gdf.geometry.y.to_numpy()
+    features = []
+    for props, x, y in zip(zeilen, xs, ys):
+        if np.isfinite(x) and np.isfinite(y):
+            geometry = f'{{"type":"Point","coordinates":[{x:.{precision}f},{y:.{precision}f}]}}'
+        else:
+            geometry = "null"
+        features.append(f'{{"type":"Feature","properties":{props},"geometry":{geometry}}}')
+    return features
+
+
+def write_geojson(gdf, path, fmt="geojson", precision=None, chunksize=10_000):
+    """
+    Schreibt Punkt-Features blockweise als GeoJSON bzw. GeoJSONSeq.
+
+    "geojson" behält das CRS der Daten (wie der OGR-Treiber mit "crs"-Angabe),
+    "geojsonseq" schreibt wie von RFC 8142 vorgesehen in WGS84, ein Feature pro
+    Zeile, sodass QGIS und andere Werkzeuge die Datei zeilenweise lesen können.
+
+    Args:
+        gdf (gpd.GeoDataFrame): Daten mit Punktgeometrien
+        path (str): Zieldatei
+        fmt (str): "geojson" oder "geojsonseq"
+        precision (int): Nachkommastellen der Koordinaten (Standard: 6 bei
+            Längen-/Breitengraden, 2 bei Metern)
+        chunksize (int): Anzahl Features pro Schreibvorgang
+
+    Returns:
+        str: Pfad der geschriebenen Datei
+    """
+    gdf = gdf.drop(columns=[spalte for spalte in GEOJSON_OHNE_SPALTEN if spalte in gdf.columns])
+    if fmt == "geojsonseq" and gdf.crs is not None and gdf.crs.to_epsg() != 4326:
+        gdf = gdf.to_crs("EPSG:4326")
+    if precision is None:
+        precision = 6 if gdf.crs is None or gdf.crs.is_geographic else 2
+
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        if fmt == "geojson":
+            name = os.path.splitext(os.path.basename(path))[0]
+            f.write(f'{{"type":"FeatureCollection","name":{json.dumps(name)},')
+            epsg = gdf.crs.to_epsg() if gdf.crs is not None else None
+            if epsg not in (None, 4326):
+                f.write(f'"crs":{{"type":"name","properties":{{"name":"urn:ogc:def:crs:EPSG::{epsg}"}}}},')
+            f.write('"features":[\n')
+
+        trenner = ",\n" if fmt == "geojson" else "\n"
+        erster_block = True
+        for start in range(0, len(gdf), chunksize):
+            features = _geojson_features(gdf.iloc[start:start + chunksize], precision)
+            if fmt == "geojson" and not erster_block:
+                f.write(trenner)
+            f.write(trenner.join(features))
+            if fmt == "geojsonseq":
+                f.write("\n")
+            erster_block = False
+
+        if fmt == "geojson":
+            f.write("\n]}\n")
+    return path
+
+
+def export_single_geojson(gdf, year, output_dir, fmt="geojson", precision=None):
+    """Exportiert gefilterte Daten als GeoJSON (bzw. GeoJSONSeq) für ein Jahr."""
+    path = write_geojson(gdf, geojson_path(output_dir, year, fmt), fmt=fmt, precision=precision)
 
     return {
-        'path': os.path.abspath(geojson_path),
+        'path': os.path.abspath(path),
         'year': year,
         'count': len(gdf)
     }
 
+def combined_csv_path(output_dir, years):
+    """Pfad der Gesamt-CSV; der Name nennt das erste und letzte Jahr (z. B. 2016-2024)."""
+    years = [int(year) for year in years]
+    return f"{output_dir}/csv/Unfallorte_Leipzig_{min(years)}-{max(years)}_GESAMT.csv"
+
+
 def export_combined_csv(all_results, output_dir):
-    """Kombiniert alle Jahre in eine Gesamt-CSV mit durchgehender ID."""
-    all_dfs = [result['gdf_filtered'].drop(columns=['geometry'])
-               for result in all_results]
+    """
+    Schreibt alle Jahre in eine Gesamt-CSV mit durchgehender ID.
 
-    df_combined = pd.concat(all_dfs, ignore_index=True)
-    df_combined.insert(0, 'UNFALL_ID', range(1, len(df_combined) + 1))
+    Die Jahre werden nacheinander angehängt (laufender UNFALL_ID-Versatz),
+    sodass immer nur die Daten eines Jahres zusätzlich im Speicher liegen.
+    Alle Jahre haben dank schema.normalize dieselben Spalten; die Kopfzeile
+    wird daher einmal aus schema.SPALTEN geschrieben.
+    """
+    spalten = list(schema.SPALTEN)
 
-    combined_path = f"{output_dir}/csv/Unfallorte_Leipzig_2016-2024_GESAMT.csv"
-    df_combined.to_csv(combined_path, index=False, encoding='utf-8')
+    combined_path = combined_csv_path(output_dir, [result['year'] for result in all_results])
+    with open(combined_path, 'w', encoding='utf-8', newline='') as f:
+        pd.DataFrame(columns=['UNFALL_ID'] + spalten).to_csv(f, index=False)
+        offset = 0
+        for result in all_results:
+            df = pd.DataFrame(result['gdf_filtered'][spalten])
+            df.insert(0, 'UNFALL_ID', range(offset + 1, offset + len(df) + 1))
+            df.to_csv(f, index=False, header=False)
+            offset += len(df)
 
     return combined_path
 
 
-def export_all(all_results, output_dir):
-    """Exportiert alle Daten: einzelne CSVs, GeoJSONs und Gesamtdatei."""
+def _gemessen(name, job, eltern, rows=None, ausgabe=None, **labels):
+    """
+    Umschließt eine Export-Aufgabe mit einem Messschritt (siehe metrics.stage).
+
+    Die geschriebenen Bytes werden aus dem Rückgabewert (Pfad bzw. Dict mit
+    'path') ermittelt, oder aus `ausgabe`, wenn die Aufgabe mehrere Dateien schreibt.
+    """
+    def ausfuehren():
+        with metrics.stage(name, parent=eltern, **labels) as schritt:
+            schritt.rows_in = rows
+            ergebnis = job()
+            pfad = ergebnis.get('path') if isinstance(ergebnis, dict) else ergebnis
+            schritt.wrote(ausgabe or pfad)
+        return ergebnis
+    return ausfuehren
+
+
+def _run_bounded(jobs, max_workers):
+    """
+    Führt Aufgaben (Funktionen ohne Argumente) auf einem Thread-Pool aus.
+
+    Es sind höchstens 2 * max_workers Aufgaben gleichzeitig angenommen; weitere
+    werden erst übergeben, wenn die älteste abgeschlossen ist. Fehler einer
+    Aufgabe werden im Hauptthread erneut ausgelöst.
+    """
+    if max_workers <= 1:
+        for job in jobs:
+            job()
+        return
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        in_arbeit = deque()
+        for job in jobs:
+            if len(in_arbeit) >= 2 * max_workers:
+                in_arbeit.popleft().result()
+            in_arbeit.append(pool.submit(job))
+        for future in in_arbeit:
+            future.result()
+
+
+def export_all(all_results, output_dir, changed_years=None, write_csv=True, write_geojson=True,
+               geojson_format="geojson", precision=None, write_tiles=False,
+               heatmap_raster=None, max_workers=EXPORT_THREADS):
+    """
+    Exportiert alle Daten: Parquet-Datensatz, einzelne CSVs, GeoJSONs und Gesamtdatei.
+
+    Der GeoParquet-Datensatz (partitioniert nach UJAHR) ist der maßgebliche
+    Datenspeicher für die Auswertungen, daneben wird der aggregierte
+    Unfallwürfel (auch im Speicher zurückgegeben, 'cube_data'), der binäre
+    Punktspeicher (point_store) und die Unfallschwerpunkte (hotspots) gespeichert. CSV und GeoJSON sind abgeleitete Exporte und
+    können abgeschaltet werden.
+
+    Mit `changed_years` werden nur die Einzeldateien dieser Jahre neu
+    geschrieben (die übrigen liegen bereits aktuell vor). Die Gesamtdatei
+    wird immer aus allen übergebenen Jahren erstellt.
+
+    `geojson_format` ("geojson" oder "geojsonseq") und `precision`
+    (Nachkommastellen der Koordinaten) werden an write_geojson weitergegeben.
+    Mit `write_tiles` entsteht zusätzlich die Vektorkachel-Datei für QGIS
+    (siehe vector_tiles), mit `heatmap_raster` (siehe
+    density.raster_from_boundaries) werden die Heatmap-Raster berechnet.
+
+    Die einzelnen Dateien werden parallel auf `max_workers` Threads
+    geschrieben (Parquet und Dateizugriffe geben den GIL frei).
+    """
+    parquet_files = []
     csv_files = []
     geojson_files = []
+    jobs = []
+
+    # Jede Datei ist ein eigener Messschritt unterhalb des aufrufenden Schritts
+    eltern = metrics.current()
+    gesamt = sum(result['count'] for result in all_results)
+
+    # Gesamtdatei, Würfel, Kacheln und Heatmaps zuerst einreihen, sie brauchen am längsten
+    combined_csv = combined_csv_path(output_dir, [result['year'] for result in all_results]) \
+        if write_csv else None
+    if write_csv:
+        jobs.append(_gemessen("combined_csv", partial(export_combined_csv, all_results, output_dir),
+                              eltern, gesamt))
+
+    # Aggregierter Würfel über alle Jahre (wird auch zurückgegeben, damit der
+    # Datensatz der Sitzung ihn nicht ein zweites Mal aufbaut)
+    cube = aggregate_cube.cube_path(output_dir)
+    wuerfel = {}
+
+    def cube_job():
+        wuerfel['cube'] = aggregate_cube.build_cube(result['gdf_filtered'] for result in all_results)
+        return aggregate_cube.write_cube(wuerfel['cube'], output_dir)
+    jobs.append(_gemessen("cube", cube_job, eltern, gesamt))
+
+    # Unfallschwerpunkte über alle Jahre (QGIS-Punktansicht lädt sie statt sie neu zu berechnen)
+    import hotspots  # erst hier: hotspots importiert write_geojson aus diesem Modul
+    hotspots_file = hotspots.hotspots_path(output_dir)
+
+    def hotspots_job():
+        unfaelle = pd.concat([result['gdf_filtered'][['UKATEGORIE', 'geometry']] for result in all_results],
+                             ignore_index=True)
+        return hotspots.write_hotspots(hotspots.find_hotspots(unfaelle), hotspots_file)
+    jobs.append(_gemessen("hotspots", hotspots_job, eltern, gesamt))
+
+    # Binärer Punktspeicher über alle Jahre (für schnelles Laden per Memory-Mapping)
+    points = point_store.points_path(output_dir)
+    jobs.append(_gemessen("points", partial(point_store.write_points, all_results, output_dir),
+                          eltern, gesamt))
+
+    # Vektorkacheln über alle Jahre
+    tiles = vector_tiles.tiles_path(output_dir) if write_tiles else None
+    if write_tiles:
+        jobs.append(_gemessen("tiles", lambda: vector_tiles.build_tiles(
+            (result['gdf_filtered'] for result in all_results), output_dir
+        ), eltern, gesamt))
+
+    # Heatmap-Raster je Jahr und Verkehrsmittel
+    heatmaps = os.path.join(density.heatmap_dir(output_dir), density.INDEX_NAME) if heatmap_raster else None
+    if heatmap_raster:
+        jobs.append(_gemessen("heatmaps", lambda: density.build_heatmaps(
+            all_results, output_dir, heatmap_raster
+        ), eltern, gesamt, ausgabe=density.heatmap_dir(output_dir)))
 
     # Einzelne Jahre exportieren
     for result in all_results:
+        year = result['year']
+        gdf = result['gdf_filtered']
+        changed = changed_years is None or year in changed_years
+
+        # Parquet (immer)
+        if changed:
+            jobs.append(_gemessen("parquet", partial(parquet_store.write_year, gdf, year, output_dir),
+                                  eltern, len(gdf), year=year))
+        parquet_files.append(os.path.join(parquet_store.dataset_dir(output_dir),
+                                          f"UJAHR={year}", "part-0.parquet"))
+
         # CSV
-        csv_path = export_single_csv(
-            result['gdf_filtered'],
-            result['year'],
-            output_dir
-        )
-        csv_files.append(csv_path)
+        if write_csv:
+            if changed:
+                jobs.append(_gemessen("csv", partial(export_single_csv, gdf, year, output_dir),
+                                      eltern, len(gdf), year=year))
+            csv_files.append(f"{output_dir}/csv/Unfallorte{year}_Leipzig.csv")
 
         # GeoJSON
-        geojson_info = export_single_geojson(
-            result['gdf_filtered'],
-            result['year'],
-            output_dir
-        )
-        geojson_files.append(geojson_info)
+        if write_geojson:
+            if changed:
+                jobs.append(_gemessen("geojson", partial(export_single_geojson, gdf, year, output_dir,
+                                                         fmt=geojson_format, precision=precision),
+                                      eltern, len(gdf), year=year))
+            geojson_files.append({
+                'path': os.path.abspath(geojson_path(output_dir, year, geojson_format)),
+                'year': year,
+                'count': result['count']
+            })
 
-    # Gesamtdatei
-    combined_csv = export_combined_csv(all_results, output_dir)
+    _run_bounded(jobs, max_workers)
 
     return {
+        'parquet_files': parquet_files,
+        'cube': cube,
+        'cube_data': wuerfel.get('cube'),
+        'points': points,
+        'hotspots': hotspots_file,
+        'tiles': tiles,
+        'heatmaps': heatmaps,
         'csv_files': csv_files,
         'geojson_files': geojson_files,
         'combined_csv': combined_csv
@@ -0,0 +1,204 @@
+"""
+Modul für den Export von Abbildungen ohne Bildschirm (z. B. Berichte auf einem Server).
+
+Für jede Kombination aus Stadtbezirk, Jahr und Verkehrsmittel entsteht eine
+Abbildung: Unfälle je Monat (mit dem Vorjahr zum Vergleich) und das
+Wochenprofil (Wochentag × Stunde). Die Zahlen kommen aus dem Würfel über
+time_series.build_counts, gezeichnet wird als PNG, SVG und/oder PDF:
+
+    export_figures(datensatz.wuerfel, "../data/results/figures",
+                   formate=("png", "pdf"), workers=4)
+
+matplotlib wird erst beim Zeichnen geladen, und zwar ohne pyplot direkt mit
+dem Agg-Backend – es braucht also weder einen Bildschirm noch plt.show().
+Jeder Prozess zeichnet eine Vorlage einmal und tauscht danach für jede
+Abbildung nur noch die Daten und Titel aus.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import metrics
+import time_series
+
+# Mögliche Ausgabeformate (matplotlib wählt den Writer anhand der Endung)
+FORMATE = ("png", "svg", "pdf")
+
+# Auflösung der PNG-Dateien und Größe der Abbildungen in Zoll
+DPI = 100
+GROESSE = (10, 3.6)
+
+MONATSNAMEN = ["Jan", "Feb", "Mär", "Apr", "Mai", "Jun", "Jul", "Aug", "Sep", "Okt", "Nov", "Dez"]
+# UWOCHENTAG im Unfallatlas: 1 = Sonntag ... 7 = Samstag
+WOCHENTAGE = ["So", "Mo", "Di", "Mi", "Do", "Fr", "Sa"]
+
+
+def figure_path(out_dir, jahr, bezirk, art, fmt="png"):
+    """Pfad einer Abbildung: <out_dir>/<Jahr>/<Stadtbezirk>_<Art>.<Format>."""
+    return os.path.join(out_dir, str(jahr), f"{bezirk}_{art}.{fmt}")
+
+
+def _vorlage():
+    """
+    Zeichnet die leere Vorlage einer Abbildung (Figure mit Agg-Canvas, ohne pyplot).
+
+    Returns:
+        dict: Figure und die Elemente, deren Daten je Abbildung ersetzt werden
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    from matplotlib.ticker import MaxNLocator
+
+    fig = Figure(figsize=GROESSE, dpi=DPI)
+    FigureCanvasAgg(fig)
+    monate_ax, woche_ax = fig.subplots(1, 2, width_ratios=[1, 1.4])
+
+    x = np.arange(1, time_series.MONATE + 1)
+    balken = monate_ax.bar(x, np.zeros(len(x)), color="tab:blue", label="Jahr")
+    (vorjahr,) = monate_ax.plot(x, np.zeros(len(x)), color="0.4", marker="o", markersize=3,
+                                linewidth=1, label="Vorjahr")
+    monate_ax.set_xticks(x, MONATSNAMEN, fontsize=8)
+    monate_ax.set_ylabel("Anzahl der Unfälle")
+    monate_ax.yaxis.set_major_locator(MaxNLocator(integer=True))
+    monate_ax.set_title("Unfälle je Monat", fontsize=10)
+    monate_ax.grid(True, axis="y", alpha=0.3)
+    monate_ax.legend(fontsize=8, loc="upper left")
+
+    profil = woche_ax.imshow(np.zeros((time_series.WOCHENTAGE, time_series.STUNDEN)),
+                             aspect="auto", cmap="Reds", interpolation="nearest")
+    woche_ax.set_yticks(np.arange(time_series.WOCHENTAGE), WOCHENTAGE, fontsize=8)
+    woche_ax.set_xticks(np.arange(0, time_series.STUNDEN, 3))
+    woche_ax.set_xlabel("Stunde")
+    woche_ax.set_title("Wochenprofil", fontsize=10)
+    farbskala = fig.colorbar(profil, ax=woche_ax, label="Unfälle")
+    farbskala.locator = MaxNLocator(integer=True)
+
+    titel = fig.suptitle("")
+    fig.tight_layout()
+    # Layout nur einmal berechnen: sonst zeichnet savefig jede Abbildung zweimal
+    fig.set_layout_engine(None)
+    return {"fig": fig, "monate_ax": monate_ax, "balken": balken, "vorjahr": vorjahr,
+            "profil": profil, "titel": titel}
+
+
+def _zeichnen(vorlage, jahr, bezirk, art, counts, vorjahr_counts):
+    """Setzt die Daten eines Jahres in die Vorlage ein (counts: Monat × Wochentag × Stunde)."""
+    monate = counts.sum(axis=(1, 2))
+    for balken, wert in zip(vorlage["balken"], monate):
+        balken.set_height(wert)
+
+    vorjahr = vorjahr_counts.sum(axis=(1, 2)) if vorjahr_counts is not None \
+        else np.full(time_series.MONATE, np.nan)
+    vorlage["vorjahr"].set_ydata(vorjahr)
+    hoechstwert = np.nanmax(np.r_[monate, vorjahr, 0])
+    vorlage["monate_ax"].set_ylim(0, max(hoechstwert * 1.15, 1))
+
+    profil = counts.sum(axis=0)
+    vorlage["profil"].set_data(profil)
+    vorlage["profil"].set_clim(0, max(profil.max(), 1))
+
+    teilnehmer = "alle Unfälle" if art == "Gesamt" else f"mit Beteiligung {art}"
+    vorlage["titel"].set_text(f"{bezirk} {jahr} – {teilnehmer} ({int(monate.sum())})")
+
+
+def _render(aufgabe, out_dir, formate):
+    """
+    Zeichnet die gewünschten Jahre einer Kombination aus Verkehrsmittel und Stadtbezirk.
+
+    Args:
+        aufgabe (dict): {'art', 'bezirk', 'jahre' (zu zeichnen), 'erstes_jahr',
+            'vorhanden' (Jahre mit Daten), 'counts' (alle Jahre × Monat × Wochentag × Stunde)}
+
+    Returns:
+        list: Pfade der geschriebenen Dateien
+    """
+    vorlage = _vorlage()
+    paths = []
+    for jahr in aufgabe["jahre"]:
+        i = jahr - aufgabe["erstes_jahr"]
+        # Fehlt das Vorjahr in den Daten, gibt es keinen Vergleich (statt Nullen)
+        vorjahr = aufgabe["counts"][i - 1] if jahr - 1 in aufgabe["vorhanden"] else None
+        _zeichnen(vorlage, jahr, aufgabe["bezirk"], aufgabe["art"], aufgabe["counts"][i], vorjahr)
+        for fmt in formate:
+            path = figure_path(out_dir, jahr, aufgabe["bezirk"], aufgabe["art"], fmt)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            vorlage["fig"].savefig(path, dpi=DPI)
+            paths.append(path)
+    return paths
+
+
+def _render_gemessen(aufgabe, out_dir, formate):
+    """_render als gemessener Schritt "render" (Zeilen = geschriebene Dateien)."""
+    with metrics.stage("render", art=aufgabe["art"], district=aufgabe["bezirk"]) as schritt:
+        paths = _render(aufgabe, out_dir, formate)
+        schritt.rows_out = len(paths)
+    return paths
+
+
+def _init_worker():
+    """Startet einen Worker-Prozess (vom Hauptprozess geerbte Messungen verwerfen)."""
+    metrics.take_records()
+
+
+def _render_in_worker(aufgabe, out_dir, formate):
+    """
+    Zeichnet eine Aufgabe in einem Worker-Prozess.
+
+    Returns:
+        tuple: (Pfade, Messungen für den Hauptprozess)
+    """
+    return _render_gemessen(aufgabe, out_dir, formate), metrics.take_records()
+
+
+def export_figures(cube, out_dir, stadtbezirke=None, jahre=None, arten=None, formate=("png",),
+                   workers=1):
+    """
+    Schreibt eine Abbildung je Stadtbezirk, Jahr und Verkehrsmittel.
+
+    Args:
+        cube (pd.DataFrame): Unfallwürfel
+        out_dir (str): Zielverzeichnis (je Jahr ein Unterordner)
+        stadtbezirke (iterable): Stadtbezirke (Standard: alle)
+        jahre (iterable): Jahre (Standard: alle im Würfel)
+        arten (iterable): "Gesamt" und/oder Verkehrsmittel (Standard: alle aus time_series.ARTEN)
+        formate (iterable): Ausgabeformate aus FORMATE
+        workers (int): Anzahl paralleler Prozesse (1 = seriell)
+
+    Returns:
+        list: Pfade der geschriebenen Dateien (sortiert)
+    """
+    formate = list(dict.fromkeys(formate))
+    falsch = [fmt for fmt in formate if fmt not in FORMATE]
+    if falsch:
+        raise ValueError(f"Unbekanntes Format: {', '.join(falsch)} (möglich: {', '.join(FORMATE)})")
+
+    zaehlungen = time_series.build_counts(cube)
+    # Nur Jahre, die im Würfel vorkommen (Lücken im Jahresbereich sind NaN)
+    vorhanden = [int(jahr) for jahr, da in zip(zaehlungen["jahre"], zaehlungen["vorhanden"]) if da]
+    jahre = vorhanden if jahre is None else sorted(int(jahr) for jahr in jahre
+                                                   if int(jahr) in vorhanden)
+    if not jahre:
+        return []
+
+    # Je Aufgabe alle Jahre mitgeben (ein paar hundert KB), damit es immer ein Vorjahr gibt
+    aufgaben = []
+    for art in arten or zaehlungen["arten"]:
+        for bezirk in stadtbezirke or zaehlungen["bezirke"]:
+            aufgaben.append({"art": art, "bezirk": bezirk, "jahre": jahre,
+                             "erstes_jahr": int(zaehlungen["jahre"][0]), "vorhanden": vorhanden,
+                             "counts": time_series.select(zaehlungen, bezirk, art)})
+
+    paths = []
+    if workers <= 1 or len(aufgaben) <= 1:
+        for aufgabe in aufgaben:
+            paths.extend(_render_gemessen(aufgabe, out_dir, formate))
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(aufgaben)),
+                                 initializer=_init_worker) as executor:
+            for ergebnis, messungen in executor.map(_render_in_worker, aufgaben,
+                                                    [out_dir] * len(aufgaben),
+                                                    [formate] * len(aufgaben)):
+                metrics.add_records(messungen)
+                paths.extend(ergebnis)
+    return sorted(paths)
@@ -6,8 +6,13 @@ import tempfile
 
 # QGIS-Pfad für macOS (LTR Version)
 import sys
+import os
 import platform
 
+import density
+import tile_cache
+import vector_tiles
+
 
 # QGIS-Pfad automatisch erkennen
 def get_qgis_path():
@@ -27,9 +32,12 @@ def get_qgis_path():
 QGIS_PATH = get_qgis_path()
 
 
-def create_qgis_script(geojson_files):
+def create_qgis_script(geojson_files, basemap=None):
     """
     Erstellt ein QGIS-Python-Skript mit Heatmap-Darstellung.
+
+    Mit basemap (MBTiles-Datei aus tile_cache) kommt die Basiskarte aus dem
+    lokalen Kachel-Cache statt von tile.openstreetmap.org.
     """
     script_heatmap = """from qgis.core import (QgsRasterLayer, QgsVectorLayer, QgsProject, 
                           QgsHeatmapRenderer, QgsGradientColorRamp, QgsUnitTypes)
@@ -37,8 +45,7 @@ from qgis.utils import iface
 from PyQt5.QtGui import QColor
 
 # 1. OpenStreetMap laden
-osm_url = "type=xyz&url=https://tile.openstreetmap.org/{z}/{x}/{y}.png&zmax=19&zmin=0"
-osm_layer = QgsRasterLayer(osm_url, "OpenStreetMap", "wms")
+""" + f'osm_url = "{tile_cache.qgis_uri(basemap)}"\n' + """osm_layer = QgsRasterLayer(osm_url, "OpenStreetMap", "wms")
 
 if osm_layer.isValid():
     QgsProject.instance().addMapLayer(osm_layer)
@@ -101,15 +108,176 @@ print("\\n✓ Alle Heatmap-Layer geladen!")
     return script_heatmap
 
 
-def visualize_in_qgis_heatmap(geojson_files):
+def create_tiles_script(tiles_path, basemap=None):
     """
-    Öffnet QGIS mit allen GeoJSON-Layern und OpenStreetMap-Basiskarte.
+    Erstellt ein QGIS-Python-Skript, das die Vektorkacheln aller Jahre als
+    einen Layer in Heatmap-Optik lädt: große, stark transparente Kreise, deren
+    Größe mit der Anzahl der zusammengefassten Unfälle ("ANZAHL") wächst.
+    """
+    safe_path = tiles_path.replace('\\', '\\\\')
+    xmin, ymin, xmax, ymax = vector_tiles.tiles_extent(tiles_path)
+
+    script_heatmap = """from qgis.core import (QgsRasterLayer, QgsVectorTileLayer, QgsProject, QgsMarkerSymbol,
+                       QgsVectorTileBasicRenderer, QgsVectorTileBasicRendererStyle,
+                       QgsWkbTypes, QgsSymbolLayer, QgsProperty, QgsRectangle,
+                       QgsCoordinateReferenceSystem)
+from qgis.utils import iface
+
+# 1. OpenStreetMap laden
+""" + f'osm_url = "{tile_cache.qgis_uri(basemap)}"\n' + """osm_layer = QgsRasterLayer(osm_url, "OpenStreetMap", "wms")
+
+if osm_layer.isValid():
+    QgsProject.instance().addMapLayer(osm_layer)
+    print("✓ OpenStreetMap geladen")
+else:
+    print("✗ OpenStreetMap-Fehler")
+
+"""
+    script_heatmap += f"""# 2. Vektorkacheln (alle Jahre in einem Layer)
+tiles_path = "{safe_path}"
+extent = QgsRectangle({xmin}, {ymin}, {xmax}, {ymax})
+layer_name = "{vector_tiles.LAYER_NAME}"
+"""
+    script_heatmap += """tiles_layer = QgsVectorTileLayer("type=mbtiles&url=" + tiles_path, "Heatmap Unfaelle (Vektorkacheln)")
+
+if tiles_layer.isValid():
+    # Transparente Kreise überlagern sich zu einer Dichtedarstellung
+    symbol = QgsMarkerSymbol.createSimple({"color": "255,0,0,35", "outline_style": "no"})
+    symbol.symbolLayer(0).setDataDefinedProperty(
+        QgsSymbolLayer.PropertySize, QgsProperty.fromExpression('4 + 2 * sqrt("ANZAHL")'))
+
+    style = QgsVectorTileBasicRendererStyle("Heatmap", layer_name, QgsWkbTypes.PointGeometry)
+    style.setSymbol(symbol)
+    renderer = QgsVectorTileBasicRenderer()
+    renderer.setStyles([style])
+    tiles_layer.setRenderer(renderer)
+
+    QgsProject.instance().addMapLayer(tiles_layer)
+    print("✓ Heatmap geladen (Vektorkacheln)")
+else:
+    print("✗ Vektorkachel-Fehler: " + tiles_path)
+
+# 3. Auf Leipzig zoomen
+canvas = iface.mapCanvas()
+canvas.setDestinationCrs(QgsCoordinateReferenceSystem("EPSG:3857"))
+canvas.setExtent(extent)
+canvas.refresh()
+print("✓ Gezoomt auf Leipzig")
+"""
+    return script_heatmap
+
+
+def create_raster_script(index_path, basemap=None):
+    """
+    Erstellt ein QGIS-Python-Skript, das die vorberechneten Heatmap-Raster
+    (siehe density) lädt: eine Gruppe je Art (gesamt und je Verkehrsmittel)
+    mit einem Layer je Jahr. Alle Layer einer Art nutzen dieselbe Farbskala.
+    """
+    index = density.load_index(index_path)
+
+    script_heatmap = """from qgis.core import (QgsRasterLayer, QgsProject, QgsColorRampShader, QgsRasterShader,
+                       QgsSingleBandPseudoColorRenderer)
+from qgis.utils import iface
+from PyQt5.QtGui import QColor
+
+# 1. OpenStreetMap laden
+""" + f'osm_url = "{tile_cache.qgis_uri(basemap)}"\n' + """osm_layer = QgsRasterLayer(osm_url, "OpenStreetMap", "wms")
+
+if osm_layer.isValid():
+    QgsProject.instance().addMapLayer(osm_layer)
+    print("✓ OpenStreetMap geladen")
+else:
+    print("✗ OpenStreetMap-Fehler")
+
+# 2. Raster-Daten (gemeinsames Maximum je Art in Unfällen je km²)
+"""
+    script_heatmap += f"skala = {index['skala']!r}\n"
+    script_heatmap += "raster_list = [\n"
+    for eintrag in index["dateien"]:
+        safe_path = eintrag['path'].replace('\\', '\\\\')
+        script_heatmap += f'    {{"path": "{safe_path}", "year": {eintrag["year"]}, "art": "{eintrag["art"]}"}},\n'
+
+    script_heatmap += """]
+
+
+def heatmap_stil(layer, maximum):
+    # Transparent bei 0, über Gelb nach Rot beim gemeinsamen Maximum
+    ramp = QgsColorRampShader(0, maximum)
+    ramp.setColorRampType(QgsColorRampShader.Interpolated)
+    ramp.setColorRampItemList([
+        QgsColorRampShader.ColorRampItem(0, QColor(255, 255, 0, 0), "0"),
+        QgsColorRampShader.ColorRampItem(maximum * 0.2, QColor(255, 200, 0, 140), ""),
+        QgsColorRampShader.ColorRampItem(maximum, QColor(255, 0, 0, 230), "%.0f je km²" % maximum),
+    ])
+    shader = QgsRasterShader()
+    shader.setRasterShaderFunction(ramp)
+    renderer = QgsSingleBandPseudoColorRenderer(layer.dataProvider(), 1, shader)
+    renderer.setClassificationMin(0)
+    renderer.setClassificationMax(maximum)
+    layer.setRenderer(renderer)
+
+
+# 3. Raster laden: eine Gruppe je Art, sichtbar ist nur das letzte Jahr (gesamt)
+root = QgsProject.instance().layerTreeRoot()
+letztes_jahr = max(item["year"] for item in raster_list)
+gruppen = {}
+erster_layer = None
+
+for item in raster_list:
+    art = item["art"]
+    if art not in gruppen:
+        gruppen[art] = root.insertGroup(len(gruppen), "Heatmap " + art)
+        gruppen[art].setItemVisibilityChecked(art == "GESAMT")
+        gruppen[art].setExpanded(art == "GESAMT")
+
+    layer_name = "Heatmap " + art + " " + str(item["year"])
+    raster_layer = QgsRasterLayer(item["path"], layer_name)
+
+    if raster_layer.isValid():
+        heatmap_stil(raster_layer, skala[art] or 1)
+        QgsProject.instance().addMapLayer(raster_layer, False)
+        knoten = gruppen[art].addLayer(raster_layer)
+        knoten.setItemVisibilityChecked(item["year"] == letztes_jahr)
+        if erster_layer is None:
+            erster_layer = raster_layer
+    else:
+        print("✗ Raster-Fehler: " + layer_name)
+
+print("✓ Heatmap-Raster geladen")
+
+# 4. Auf Leipzig zoomen
+if erster_layer is not None:
+    iface.setActiveLayer(erster_layer)
+    iface.zoomToActiveLayer()
+    print("✓ Gezoomt auf Leipzig")
+
+print("\\n✓ Alle Heatmap-Layer geladen!")
+"""
+    return script_heatmap
+
+
+def visualize_in_qgis_heatmap(geojson_files, tiles=None, heatmaps=None, basemap=None):
+    """
+    Öffnet QGIS mit OpenStreetMap-Basiskarte und den Unfällen als Heatmap –
+    aus den vorberechneten Rastern, falls vorhanden, sonst aus den
+    Vektorkacheln (ein Layer) oder aus allen GeoJSON-Layern.
 
     Args:
         geojson_files (list): Liste mit GeoJSON-Datei-Infos
+        tiles (str): Pfad zur MBTiles-Datei (optional)
+        heatmaps (str): Pfad zum JSON-Index der Heatmap-Raster (optional)
+        basemap (str): Pfad zur MBTiles-Datei der Basiskarte (optional, siehe tile_cache)
     """
     # QGIS-Skript erstellen
-    qgis_script = create_qgis_script(geojson_files)
+    if heatmaps and os.path.isfile(heatmaps):
+        qgis_script = create_raster_script(heatmaps, basemap)
+        layer_count = len(density.load_index(heatmaps)["dateien"])
+    elif tiles and os.path.isfile(tiles):
+        qgis_script = create_tiles_script(os.path.abspath(tiles), basemap)
+        layer_count = 1
+    else:
+        qgis_script = create_qgis_script(geojson_files, basemap)
+        layer_count = len(geojson_files)
 
     # Temporäres Skript speichern
     with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False, encoding='utf-8') as f:
@@ -122,6 +290,6 @@ def visualize_in_qgis_heatmap(geojson_files):
             subprocess.run(["open", "-a", "QGIS-LTR", "--args", "--code", temp_script_path])
         else:
             subprocess.run([QGIS_PATH, "--code", temp_script_path])
-        print(f"✓ QGIS geöffnet mit {len(geojson_files)} Layern")
+        print(f"✓ QGIS geöffnet mit {layer_count} Layern")
     except Exception as e:
         print(f"✗ Fehler beim Öffnen von QGIS: {e}")
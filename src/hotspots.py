@@ -0,0 +1,319 @@
+"""
+Modul für die Erkennung von Unfallschwerpunkten (Hotspots).
+
+Die Unfälle werden mit DBSCAN auf den projizierten Koordinaten (EPSG:25833,
+Meter) gruppiert: Ein Unfall mit mindestens MIN_PUNKTE Unfällen im Umkreis von
+RADIUS Metern (sich selbst eingeschlossen) ist ein Kernpunkt, benachbarte
+Kernpunkte bilden zusammen einen Schwerpunkt, Unfälle am Rand werden dem
+nächstgelegenen Schwerpunkt zugeschlagen, alle übrigen bleiben Rauschen.
+
+Die Nachbarsuche läuft über ein Gitter (Grid-Hash) mit Zellen der Kantenlänge
+RADIUS/√2: Alle Punkte einer Zelle liegen höchstens RADIUS auseinander, es
+müssen also nur die 5×5 umliegenden Zellen geprüft werden. Zusammenhängende
+Kernpunkte werden zellweise verbunden (Union-Find über die Zellen), sodass der
+Speicherbedarf mit der Zahl der belegten Zellen wächst und nicht mit der Zahl
+der Punktpaare – auch für den bundesweiten Datensatz.
+"""
+import os
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+
+import metrics
+import parquet_store
+import point_store
+from aggregate_cube import VERKEHRSMITTEL_SPALTEN, jahreszeit_spalte
+from constants import VERKEHRSMITTEL
+from export_handlers import write_geojson
+
+# Standardparameter: Umkreis in Metern und Mindestanzahl Unfälle im Umkreis
+RADIUS = 25
+MIN_PUNKTE = 5
+
+# Punkte je Block bei der Nachbarsuche (begrenzt den Speicherbedarf)
+BLOCK = 65536
+
+# Gewichtung der Unfallkategorien für die Schwere (1 = Getötete, 2 = Schwer-, 3 = Leichtverletzte)
+KATEGORIEN = {1: "GETOETET", 2: "SCHWERVERLETZT", 3: "LEICHTVERLETZT"}
+GEWICHTE = {1: 10, 2: 3, 3: 1}
+
+EPSG = 25833
+HOTSPOT_DIR = "hotspots"
+HOTSPOTS_NAME = "Hotspots_Leipzig.geojson"
+
+
+def hotspots_path(processed_dir):
+    """Pfad der GeoJSON-Datei mit den Schwerpunkten."""
+    return os.path.join(processed_dir, HOTSPOT_DIR, HOTSPOTS_NAME)
+
+
+# ------------------------------------------
+# DBSCAN mit Grid-Hash
+# ------------------------------------------
+
+def _gitter(xs, ys, radius):
+    """
+    Ordnet die Punkte den Gitterzellen zu.
+
+    Die Zellschlüssel sind spaltenweise fortlaufend (gx * hoehe + gy), die
+    5 Nachbarzellen einer Spalte liegen also im sortierten Array direkt
+    hintereinander und ihre Punkte bilden einen zusammenhängenden Bereich.
+
+    Returns:
+        tuple: (Zelle je Punkt, Punkte nach Zelle sortiert, belegte Zellen,
+                Beginn der Punkte je Zelle (plus Ende), Zellen je Spalte)
+    """
+    kante = radius / np.sqrt(2)
+    # Rand von zwei Zellen, damit die Nachbarzellen nie in die nächste Spalte reichen
+    gx = np.floor((xs - xs.min()) / kante).astype(np.int64) + 2
+    gy = np.floor((ys - ys.min()) / kante).astype(np.int64) + 2
+    hoehe = int(gy.max()) + 3
+    zelle = gx * hoehe + gy
+
+    ordnung = np.argsort(zelle, kind="stable")
+    zellen, start = np.unique(zelle[ordnung], return_index=True)
+    return zelle, ordnung, zellen, np.append(start, len(zelle)), hoehe
+
+
+def _paare(index, xs, ys, radius, gitter):
+    """
+    Punktpaare mit dem ersten Punkt aus `index` (nach Zellen sortiert), dem
+    zweiten aus den 5×5 umliegenden Zellen und einem Abstand von höchstens `radius`.
+
+    Yields:
+        tuple: (k, j) als Arrays je Nachbarspalte – k ist die Position in
+               `index`, j die Nummer des Nachbarpunkts
+    """
+    zelle, ordnung, zellen, grenzen, hoehe = gitter
+    for dx in range(-2, 3):
+        # index ist nach Zellen sortiert: nur im passenden Ausschnitt von zellen suchen
+        basis = zelle[index] + dx * hoehe
+        von = np.searchsorted(zellen, basis[0] - 2)
+        bis = np.searchsorted(zellen, basis[-1] + 2, side="right")
+        ausschnitt = zellen[von:bis]
+        erste = np.searchsorted(ausschnitt, basis - 2) + von
+        letzte = np.searchsorted(ausschnitt, basis + 2, side="right") + von
+
+        # Für jeden Punkt alle Punkte der Nachbarzellen dieser Spalte aufzählen
+        anfang = grenzen[erste]
+        n = grenzen[letzte] - anfang
+        kk = np.repeat(np.arange(len(index)), n)
+        jj = ordnung[np.repeat(anfang - (np.cumsum(n) - n), n) + np.arange(n.sum())]
+
+        ii = index[kk]
+        nah = (xs[ii] - xs[jj]) ** 2 + (ys[ii] - ys[jj]) ** 2 <= radius ** 2
+        yield kk[nah], jj[nah]
+
+
+def _bloecke(index, block):
+    """Teilt ein Index-Array in Blöcke."""
+    for anfang in range(0, len(index), block):
+        yield index[anfang:anfang + block]
+
+
+def _komponenten(knoten, a, b):
+    """
+    Zusammenhangskomponenten eines Graphen (Union-Find mit Pfadverkürzung,
+    vektorisiert). Jeder Knoten erhält den kleinsten Knoten seiner Komponente.
+    """
+    eltern = np.arange(knoten)
+    while True:
+        minimum = np.minimum(eltern[a], eltern[b])
+        neu = eltern.copy()
+        np.minimum.at(neu, eltern[a], minimum)
+        np.minimum.at(neu, eltern[b], minimum)
+        while True:
+            kuerzer = neu[neu]
+            if np.array_equal(kuerzer, neu):
+                break
+            neu = kuerzer
+        if np.array_equal(neu, eltern):
+            return eltern
+        eltern = neu
+
+
+def dbscan(xs, ys, radius=RADIUS, min_punkte=MIN_PUNKTE, block=BLOCK):
+    """
+    DBSCAN-Clustering von Punkten in projizierten Koordinaten.
+
+    Args:
+        xs, ys (np.ndarray): Koordinaten in Metern
+        radius (float): Umkreis für die Nachbarschaft
+        min_punkte (int): Mindestanzahl Punkte im Umkreis (inkl. des Punkts selbst)
+        block (int): Punkte je Block bei der Nachbarsuche
+
+    Returns:
+        np.ndarray: Schwerpunkt-Nummer je Punkt (0, 1, ...), -1 für Rauschen
+    """
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    n = len(xs)
+    labels = np.full(n, -1, dtype=np.int64)
+    if n == 0:
+        return labels
+
+    gitter = _gitter(xs, ys, radius)
+    _, ordnung, zellen, grenzen, _ = gitter
+
+    # Die Blöcke laufen in Zellreihenfolge, dann sind die Zellsuchen
+    # (searchsorted) sortiert und bleiben im Cache
+    # 1. Nachbarn zählen -> Kernpunkte
+    nachbarn = np.zeros(n, dtype=np.int64)
+    for index in _bloecke(ordnung, block):
+        for kk, _ in _paare(index, xs, ys, radius, gitter):
+            nachbarn[index] += np.bincount(kk, minlength=len(index))
+    kern = nachbarn >= min_punkte
+
+    # 2. Kernpunkte einer Zelle gehören immer zusammen; Zellen verbinden,
+    #    zwischen deren Kernpunkten mindestens ein Paar im Umkreis liegt
+    zell_id = np.empty(n, dtype=np.int64)
+    zell_id[ordnung] = np.repeat(np.arange(len(zellen)), np.diff(grenzen))
+    kanten = [np.empty(0, dtype=np.int64)]
+    for index in _bloecke(ordnung[kern[ordnung]], block):
+        for kk, jj in _paare(index, xs, ys, radius, gitter):
+            von, nach = zell_id[index[kk]], zell_id[jj]
+            beide = kern[jj] & (von != nach)
+            kanten.append(np.unique(von[beide] * len(zellen) + nach[beide]))
+    kanten = np.unique(np.concatenate(kanten))
+    komponente = _komponenten(len(zellen), kanten // len(zellen), kanten % len(zellen))
+
+    kern_idx = np.flatnonzero(kern)
+    _, labels[kern_idx] = np.unique(komponente[zell_id[kern_idx]], return_inverse=True)
+
+    # 3. Randpunkte: Nicht-Kernpunkte mit einem Kernpunkt im Umkreis
+    rand = ordnung[~kern[ordnung] & (nachbarn[ordnung] > 1)]
+    zuordnung = np.full(n, np.iinfo(np.int64).max)
+    for index in _bloecke(rand, block):
+        for kk, jj in _paare(index, xs, ys, radius, gitter):
+            treffer = kern[jj]
+            np.minimum.at(zuordnung, index[kk[treffer]], labels[jj[treffer]])
+    zugeordnet = rand[zuordnung[rand] < np.iinfo(np.int64).max]
+    labels[zugeordnet] = zuordnung[zugeordnet]
+    return labels
+
+
+# ------------------------------------------
+# Schwerpunkte der Unfalldaten
+# ------------------------------------------
+
+def load_points(processed_dir, jahre=None):
+    """
+    Lädt die Unfallpunkte mit den für die Schwerpunkte benötigten Spalten:
+    aus dem binären Punktspeicher (Spalten "x"/"y" in EPSG:25833), sonst aus
+    dem Parquet-Datensatz (Geometrie).
+    """
+    spalten = ["UJAHR", "UMONAT", "UKATEGORIE"] + VERKEHRSMITTEL_SPALTEN
+    if point_store.points_exist(processed_dir):
+        return point_store.read_frame(processed_dir, columns=["x", "y"] + spalten, years=jahre)
+    return parquet_store.read_dataset(processed_dir, columns=["geometry"] + spalten, years=jahre)
+
+
+def auswahl(unfaelle, jahre=None, verkehrsmittel=None, jahreszeiten=None):
+    """
+    Schränkt die Unfälle auf Jahre, Verkehrsmittel (mindestens eines beteiligt)
+    und Jahreszeiten ein.
+
+    Args:
+        unfaelle (gpd.GeoDataFrame): Unfälle
+        jahre (list): Jahre (None = alle)
+        verkehrsmittel (list): Namen aus VERKEHRSMITTEL, z. B. ["Rad"] (None = alle)
+        jahreszeiten (list): z. B. ["Winter"] (None = alle)
+    """
+    maske = np.ones(len(unfaelle), dtype=bool)
+    if jahre:
+        maske &= unfaelle["UJAHR"].isin([int(jahr) for jahr in jahre]).to_numpy()
+    if verkehrsmittel:
+        spalten = [VERKEHRSMITTEL[name] for name in verkehrsmittel]
+        maske &= (unfaelle[spalten].fillna(0).to_numpy() == 1).any(axis=1)
+    if jahreszeiten:
+        maske &= np.asarray(jahreszeit_spalte(unfaelle["UMONAT"]).isin(list(jahreszeiten)))
+    return unfaelle[maske]
+
+
+def find_hotspots(unfaelle, radius=RADIUS, min_punkte=MIN_PUNKTE, jahre=None,
+                  verkehrsmittel=None, jahreszeiten=None):
+    """
+    Findet die Unfallschwerpunkte und sortiert sie nach Anzahl und Schwere.
+
+    Args:
+        unfaelle (pd.DataFrame): Unfallpunkte mit Geometrie oder mit den
+            Spalten "x"/"y" in EPSG:25833 (z. B. aus load_points)
+        radius (float): Umkreis in Metern
+        min_punkte (int): Mindestanzahl Unfälle im Umkreis
+        jahre, verkehrsmittel, jahreszeiten: Einschränkungen (siehe auswahl)
+
+    Returns:
+        gpd.GeoDataFrame: Ein Punkt (Schwerpunkt der Unfälle) je Hotspot mit
+            RANG, ANZAHL, GETOETET, SCHWERVERLETZT, LEICHTVERLETZT, SCHWERE
+            und RADIUS_M (größter Abstand eines Unfalls zum Mittelpunkt)
+    """
+    unfaelle = auswahl(unfaelle, jahre, verkehrsmittel, jahreszeiten)
+    if "x" in unfaelle.columns and "y" in unfaelle.columns:
+        xs, ys = unfaelle["x"].to_numpy(), unfaelle["y"].to_numpy()
+    else:
+        geometrie = unfaelle.geometry.to_crs(epsg=EPSG)
+        xs, ys = geometrie.x.to_numpy(), geometrie.y.to_numpy()
+    df = pd.DataFrame({
+        "x": xs,
+        "y": ys,
+        # Fehlende Kategorie (NA) -> NaN: der Unfall zählt mit, aber zu keiner Schwere
+        "UKATEGORIE": unfaelle["UKATEGORIE"].to_numpy(dtype="float64", na_value=np.nan),
+    })
+    df = df[np.isfinite(df["x"]) & np.isfinite(df["y"])]
+    df["HOTSPOT"] = dbscan(df["x"].to_numpy(), df["y"].to_numpy(), radius, min_punkte)
+    df = df[df["HOTSPOT"] >= 0]
+
+    for kategorie, spalte in KATEGORIEN.items():
+        df[spalte] = (df["UKATEGORIE"] == kategorie).astype(np.int64)
+    gruppen = df.groupby("HOTSPOT")
+    tabelle = gruppen[list(KATEGORIEN.values())].sum()
+    tabelle["ANZAHL"] = gruppen.size()
+    tabelle["x"] = gruppen["x"].mean()
+    tabelle["y"] = gruppen["y"].mean()
+    tabelle["SCHWERE"] = sum(tabelle[spalte] * GEWICHTE[kategorie] for kategorie, spalte in KATEGORIEN.items())
+
+    abstand = np.hypot(df["x"] - df["HOTSPOT"].map(tabelle["x"]), df["y"] - df["HOTSPOT"].map(tabelle["y"]))
+    tabelle["RADIUS_M"] = abstand.groupby(df["HOTSPOT"]).max().round(1)
+
+    tabelle = tabelle.sort_values(["ANZAHL", "SCHWERE"], ascending=False, kind="stable").reset_index(drop=True)
+    tabelle.insert(0, "RANG", np.arange(1, len(tabelle) + 1))
+    spalten = ["RANG", "ANZAHL"] + list(KATEGORIEN.values()) + ["SCHWERE", "RADIUS_M"]
+    return gpd.GeoDataFrame(tabelle[spalten], geometry=gpd.points_from_xy(tabelle["x"], tabelle["y"]),
+                            crs=f"EPSG:{EPSG}")
+
+
+def write_hotspots(hotspots, path):
+    """Schreibt die Schwerpunkte als GeoJSON (EPSG:25833) für QGIS."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return write_geojson(hotspots, path, "geojson", precision=1)
+
+
+def build_hotspots(processed_dir, path=None, radius=RADIUS, min_punkte=MIN_PUNKTE, jahre=None,
+                   verkehrsmittel=None, jahreszeiten=None):
+    """
+    Berechnet die Schwerpunkte aus dem Parquet-Datensatz und schreibt sie als GeoJSON.
+
+    Args:
+        processed_dir (str): Verzeichnis der verarbeiteten Daten
+        path (str): Zieldatei (Standard: hotspots_path(processed_dir))
+        radius, min_punkte, jahre, verkehrsmittel, jahreszeiten: siehe find_hotspots
+
+    Returns:
+        tuple: (Pfad der GeoJSON-Datei, gpd.GeoDataFrame der Schwerpunkte)
+    """
+    with metrics.stage("load_points") as schritt:
+        schritt.read(point_store.points_path(processed_dir) if point_store.points_exist(processed_dir)
+                     else parquet_store.dataset_dir(processed_dir))
+        unfaelle = load_points(processed_dir, jahre)
+        schritt.rows_out = len(unfaelle)
+
+    with metrics.stage("find_hotspots") as schritt:
+        tabelle = find_hotspots(unfaelle, radius, min_punkte, jahre, verkehrsmittel, jahreszeiten)
+        schritt.rows_in, schritt.rows_out = len(unfaelle), len(tabelle)
+
+    with metrics.stage("write_hotspots") as schritt:
+        path = write_hotspots(tabelle, path or hotspots_path(processed_dir))
+        schritt.rows_in = len(tabelle)
+        schritt.wrote(path)
+    return path, tabelle
@@ -1,12 +1,10 @@
 import sys
 import subprocess
 import os
-from visualization import visualize_in_qgis
-from heatmap_qgis_integration import visualize_in_qgis_heatmap
-from UnfaelleJahresvergleich import lade_unfaelle
-from UnfaelleJahresvergleich import plot_unfalltrend
-from UnfaelleStadtbezirkeNachJahreszeiten import user_input_choice
-from UnfaelleStadtbezirkeNachJahreszeiten import user_input_choice_2
+import argparse
+import atexit
+import importlib.util
+from constants import JAHRESZEITEN, VERKEHRSMITTEL, stadtteile
 """f
 Hauptskript: Filtert Unfalldaten für Leipzig und erstellt Visualisierungen!
 """
@@ -15,7 +13,7 @@ def install_required_packages():
     """
     Installiert automatisch benötigte Python-Pakete, falls nicht vorhanden.
     """
-    required_packages = ['pandas', 'geopandas']
+    required_packages = ['pandas', 'geopandas', 'shapely', 'pyarrow']
     """
     Der print-Block dient nur der besseren Darstellung im Terminal!
     """
@@ -29,10 +27,10 @@ def install_required_packages():
         "{Paketname} bereits installiert" ausgegeben, andernfalls installiert 
         PyCharm automatisch das fehlende Paket.
         """
-        try:
-            __import__(package)
+        # find_spec sucht das Paket nur, ohne es zu importieren (schneller Start)
+        if importlib.util.find_spec(package) is not None:
             print(f"✓ {package} bereits installiert")
-        except ImportError:
+        else:
             print(f"⊘ {package} nicht gefunden - installiere...")
             subprocess.check_call([sys.executable, "-m", "pip", "install", package])
             print(f"✓ {package} erfolgreich installiert")
@@ -47,9 +45,23 @@ install_required_packages()
 Hier werden jetzt die vorher definierten Module importiert. 
 Sie werden abgekürzt "as XX", bei der weiteren Nutzung 
 immer nur die Kürzel nutzen, etwa "dp.XXXXX"!
+
+Module, die pandas, geopandas oder matplotlib laden (data_processing,
+export_handlers, density, hotspots, batch_analysis, Visualisierungen), werden
+erst in den Funktionen importiert, die sie brauchen. So erscheint das Menü
+sofort, wenn die verarbeiteten Daten bereits aktuell sind.
 """
-import data_processing as dp
-import export_handlers as exp
+import build_cache as cache
+import metrics
+from dataset import AccidentDataset
+
+# Auswertungen des Batch-Betriebs (Implementierung in batch_analysis.AUSWERTUNGEN)
+AUSWERTUNGEN = {
+    "trend": "Unfälle je Stadtbezirk und Jahr",
+    "seasons": "Unfälle je Stadtbezirk und Jahreszeit",
+    "modes": "Verkehrsmittel je Stadtbezirk und Jahreszeit",
+    "subdistricts": "Unfälle je Ortsteil, Stadtbezirk und Jahr",
+}
 
 def input_user():
     print("\nWelche Auswertung möchtest du starten?")
@@ -67,53 +79,440 @@ def input_user_for_1():
 
     return input("Bitte Auswahl eingeben (1/2): ").strip().lower()
 
+def parse_args(argv=None):
+    """
+    Liest die Kommandozeilen-Optionen ein.
+
+    Ohne Unterbefehl startet das interaktive Menü. Die Unterbefehle laufen
+    ohne Eingaben, z. B. für nächtliche Berichte:
+        python main.py ingest
+        python main.py export
+        python main.py trend --districts Nord Süd --years 2022 2023 2024
+        python main.py seasons modes --out-dir ../data/results --format csv
+        python main.py hotspots --years 2023 2024 --modes Rad --radius 30
+        python main.py figures --formats png pdf --workers 4
+        python main.py basemap --max-zoom 17 --tile-url http://kacheln.intern/{z}/{x}/{y}.png
+    """
+    parser = argparse.ArgumentParser(description="Unfalldaten-Analyse Leipzig")
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="Anzahl paralleler Prozesse für die Verarbeitung der Jahre und das Zeichnen (Standard: 1)"
+    )
+    parser.add_argument(
+        "--force", action="store_true",
+        help="Alle Jahre neu verarbeiten, auch wenn sich die Rohdaten nicht geändert haben"
+    )
+    parser.add_argument(
+        "--no-csv", action="store_true",
+        help="Keine CSV-Dateien exportieren (Parquet bleibt der Datenspeicher)"
+    )
+    parser.add_argument(
+        "--no-geojson", action="store_true",
+        help="Keine GeoJSON-Dateien exportieren (werden nur für QGIS benötigt)"
+    )
+    parser.add_argument(
+        "--no-tiles", action="store_true",
+        help="Keine Vektorkacheln (MBTiles) für QGIS erstellen"
+    )
+    parser.add_argument(
+        "--no-heatmaps", action="store_true",
+        help="Keine Heatmap-Raster (Kerndichte je Jahr und Verkehrsmittel) berechnen"
+    )
+    parser.add_argument(
+        "--geojson-format", choices=["geojson", "geojsonseq"], default="geojson",
+        help="GeoJSON als FeatureCollection oder zeilenweise als GeoJSONSeq (.geojsonl)"
+    )
+    parser.add_argument(
+        "--precision", type=int, default=None,
+        help="Nachkommastellen der GeoJSON-Koordinaten (Standard: 2 bei Metern, 6 bei Grad)"
+    )
+    parser.add_argument(
+        "--metrics", metavar="DATEI",
+        help="Laufzeit, CPU-Zeit, Zeilen und Bytes je Verarbeitungsschritt sowie den Peak RSS "
+             "des Prozesses in diese Datei schreiben"
+    )
+    parser.add_argument(
+        "--metrics-format", choices=["json", "prometheus"], default="json",
+        help="Format der Messungen: JSON Lines oder Prometheus-Textdatei (Standard: json)"
+    )
+    parser.add_argument(
+        "--profile", metavar="VERZEICHNIS",
+        help="Jeden Verarbeitungsschritt mit cProfile profilieren (.prof/.txt je Schritt)"
+    )
+
+    subparsers = parser.add_subparsers(dest="befehl", metavar="BEFEHL")
+    subparsers.add_parser(
+        "ingest", help="Rohdaten verarbeiten (nur Parquet-Datensatz und Würfel)"
+    )
+    subparsers.add_parser(
+        "export", help="Rohdaten verarbeiten und CSV/GeoJSON exportieren"
+    )
+    for name, beschreibung in AUSWERTUNGEN.items():
+        auswertung = subparsers.add_parser(name, help=beschreibung)
+        auswertung.add_argument(
+            "weitere", nargs="*", metavar="AUSWERTUNG",
+            help="Weitere Auswertungen, die im selben Durchlauf berechnet werden"
+        )
+        auswertung.add_argument(
+            "--districts", nargs="+", choices=list(stadtteile), metavar="NAME",
+            help="Stadtbezirke (Standard: alle)"
+        )
+        auswertung.add_argument(
+            "--subdistricts", nargs="+", metavar="ORTSTEIL",
+            help="Ortsteile (Standard: alle, benötigt die Ortsteil-Datei)"
+        )
+        auswertung.add_argument(
+            "--years", nargs="+", type=int, metavar="JAHR",
+            help="Jahre (Standard: alle)"
+        )
+        auswertung.add_argument(
+            "--out-dir", default="../data/results",
+            help="Zielverzeichnis der Ergebnisdateien (Standard: ../data/results)"
+        )
+        auswertung.add_argument(
+            "--format", choices=["json", "csv"], default="json",
+            help="Ausgabeformat (Standard: json)"
+        )
+
+    schwerpunkte = subparsers.add_parser(
+        "hotspots", help="Unfallschwerpunkte finden (DBSCAN) und als GeoJSON schreiben"
+    )
+    schwerpunkte.add_argument(
+        "--years", nargs="+", type=int, metavar="JAHR",
+        help="Jahre (Standard: alle)"
+    )
+    schwerpunkte.add_argument(
+        "--modes", nargs="+", choices=list(VERKEHRSMITTEL), metavar="VERKEHRSMITTEL",
+        help=f"Nur Unfälle mit diesen Verkehrsmitteln ({', '.join(VERKEHRSMITTEL)})"
+    )
+    schwerpunkte.add_argument(
+        "--seasons", nargs="+", choices=JAHRESZEITEN, metavar="JAHRESZEIT",
+        help=f"Nur Unfälle in diesen Jahreszeiten ({', '.join(JAHRESZEITEN)})"
+    )
+    schwerpunkte.add_argument(
+        "--radius", type=float, default=None,
+        help="Umkreis in Metern (Standard: hotspots.RADIUS = 25)"
+    )
+    schwerpunkte.add_argument(
+        "--min-points", type=int, default=None,
+        help="Mindestanzahl Unfälle im Umkreis (Standard: hotspots.MIN_PUNKTE = 5)"
+    )
+    schwerpunkte.add_argument(
+        "--out-dir", default="../data/results",
+        help="Zielverzeichnis der Ergebnisdatei hotspots.geojson (Standard: ../data/results)"
+    )
+
+    abbildungen = subparsers.add_parser(
+        "figures", help="Abbildungen je Stadtbezirk, Jahr und Verkehrsmittel ohne Bildschirm speichern"
+    )
+    abbildungen.add_argument(
+        "--districts", nargs="+", choices=list(stadtteile), metavar="NAME",
+        help="Stadtbezirke (Standard: alle)"
+    )
+    abbildungen.add_argument(
+        "--years", nargs="+", type=int, metavar="JAHR",
+        help="Jahre (Standard: alle)"
+    )
+    abbildungen.add_argument(
+        "--modes", nargs="+", choices=["Gesamt"] + list(VERKEHRSMITTEL), metavar="VERKEHRSMITTEL",
+        help=f"Gesamt und/oder Verkehrsmittel ({', '.join(VERKEHRSMITTEL)}; Standard: alle)"
+    )
+    abbildungen.add_argument(
+        "--formats", nargs="+", choices=["png", "svg", "pdf"], default=["png"],
+        help="Dateiformate (Standard: png)"
+    )
+    abbildungen.add_argument(
+        "--out-dir", default="../data/results/figures",
+        help="Zielverzeichnis, je Jahr ein Unterordner (Standard: ../data/results/figures)"
+    )
+    # Wie die allgemeine Option --workers; ohne Angabe gilt deren Wert (SUPPRESS)
+    abbildungen.add_argument(
+        "--workers", type=int, default=argparse.SUPPRESS,
+        help="Anzahl paralleler Prozesse zum Zeichnen (Standard: --workers vor dem Unterbefehl bzw. 1)"
+    )
+
+    basiskarte = subparsers.add_parser(
+        "basemap", help="Kacheln der Basiskarte in den lokalen Cache laden (für QGIS ohne Internet)"
+    )
+    basiskarte.add_argument(
+        "--tile-url", default=None,
+        help="Kachel-URL mit {z}/{x}/{y}, auch file:// (Standard: tile_cache.TILE_URL, OpenStreetMap)"
+    )
+    basiskarte.add_argument(
+        "--min-zoom", type=int, default=None,
+        help="Kleinste Zoomstufe (Standard: tile_cache.MIN_ZOOM = 10)"
+    )
+    basiskarte.add_argument(
+        "--max-zoom", type=int, default=None,
+        help="Größte Zoomstufe (Standard: tile_cache.MAX_ZOOM = 13)"
+    )
+    basiskarte.add_argument(
+        "--threads", type=int, default=None,
+        help="Gleichzeitige Downloads (Standard: tile_cache.THREADS = 2)"
+    )
+
+    args = parser.parse_args(argv)
+    unbekannt = [name for name in getattr(args, "weitere", []) if name not in AUSWERTUNGEN]
+    if unbekannt:
+        parser.error(f"unbekannte Auswertung: {', '.join(unbekannt)} "
+                     f"(möglich: {', '.join(AUSWERTUNGEN)})")
+    return args
+
 def setup_directories(data_dir: str) -> None:
     """Erstellt benötigte Output-Verzeichnisse falls nicht vorhanden."""
     dirs = [
         f"{data_dir}/processed/csv",
         f"{data_dir}/processed/geojson",
+        f"{data_dir}/processed/cache",
         f"{data_dir}/temp"
     ]
     for directory in dirs:
         os.makedirs(directory, exist_ok=True)
     print("✓ Verzeichnisstruktur geprüft/erstellt\n")
 
-def outputs_already_exist(processed_dir:str, years) -> bool:
+def process_and_export(plan, raw_dir, processed_dir, bezirke_file, exports, workers=1,
+                       precision=None, tiles=False, heatmaps=False, ortsteile_file=None):
     """
-    Prüft, ob für alle Jahre bereits CSV- und GeoJSON-Dateien existieren
-    UND eine kombinierte CSV vorhanden ist.
-    Wenn ja, kann die Verarbeitung übersprungen werden.
+    Verarbeitet die geänderten Jahre, übernimmt die übrigen aus dem Cache
+    und exportiert alles. Aktualisiert anschließend das Manifest.
+
+    Returns:
+        tuple: (created_files, all_results)
     """
-    csv_dir = os.path.join(processed_dir, "csv")
-    geo_dir = os.path.join(processed_dir, "geojson")
+    import data_processing as dp
+    import export_handlers as exp
+    import density
 
-    # Wenn es die Ordner gar nicht gibt: sicher neu rechnen
-    if not (os.path.isdir(csv_dir) and os.path.isdir(geo_dir)):
-        return False
+    # Schritt 1: Bezirksgrenzen einmalig laden
+    print("[1/4] Lade Leipziger Bezirksgrenzen...")
+    with metrics.stage("load_bezirke") as schritt:
+        schritt.read(bezirke_file)
+        gdf_leipzig = dp.load_bezirke(bezirke_file)
+        schritt.rows_out = len(gdf_leipzig)
+    print(f"✓ Bezirke geladen (CRS: {gdf_leipzig.crs})")
+    if plan["signatures"]["ortsteile"]:
+        print("✓ Ortsteile werden im selben Durchlauf zugeordnet")
+    else:
+        print("⊘ Keine Ortsteil-Datei gefunden – nur Stadtbezirke")
+    print()
 
-    for year in years:
-        csv_file = os.path.join(csv_dir, f"Unfallorte{year}_Leipzig.csv")
-        geo_file = os.path.join(geo_dir, f"Unfallorte{year}_Leipzig.geojson")
-        if not (os.path.isfile(csv_file) and os.path.isfile(geo_file)):
-            return False
+    # Schritt 2: Geänderte Jahre verarbeiten
+    print("[2/4] Verarbeite Unfalldaten...")
+    if workers > 1:
+        print(f"  → parallel mit {workers} Prozessen")
+    for source in plan["changed_sources"]:
+        print(f"  → {source.name}: mehrere Jahre in einem Durchlauf")
+    results_by_year = {}
+
+    for result in dp.process_years(plan["changed"], raw_dir, bezirke_file,
+                                   gdf_leipzig=gdf_leipzig,
+                                   workers=workers,
+                                   ortsteile_path=ortsteile_file,
+                                   multi_sources=plan["changed_sources"],
+                                   exclude_years=plan["exclude_years"]):  # raw_dir!
+        if result:
+            year = result['year']
+            cache.store_result(processed_dir, result)
+            results_by_year[year] = result
+            print(f"  ✓ Jahr {year}: {result['count']} Unfälle in Leipzig")
+    # Welche Jahre in Mehrjahresdateien stecken, steht erst jetzt fest
+    plan["changed"] = sorted(results_by_year)
+    previous = cache.load_manifest(processed_dir)
+    removed = set(plan["removed"])
+    for source in plan["changed_sources"]:
+        alte_jahre = previous.get("sources", {}).get(source.key, {}).get("years", [])
+        removed.update(year for year in alte_jahre if year not in results_by_year
+                       and year not in plan["export_only"] + plan["cached"])
+    plan["removed"] = sorted(removed)
+
+    for year in plan["export_only"] + plan["cached"]:
+        with metrics.stage("load_cached_result", year=year) as schritt:
+            result = cache.load_cached_result(processed_dir, year)
+            schritt.rows_out = result['count']
+        results_by_year[year] = result
+        print(f"  ✓ Jahr {year}: {result['count']} Unfälle in Leipzig (unverändert)")
+
+    all_results = [results_by_year[year] for year in sorted(results_by_year)]
 
-    # Optional: kombinierte CSV prüfen
-    combined_csv = os.path.join(csv_dir, "Unfallorte_Leipzig_2016-2024_GESAMT.csv")
-    if not os.path.isfile(combined_csv):
-        return False
+    # Schritt 3: Daten exportieren
+    print(f"\n[3/4] Exportiere Daten...")
+    to_export = set(plan["changed"]) | set(plan["export_only"])
+    geojson_format = next((fmt for fmt in exports if fmt.startswith("geojson")), None)
+    with metrics.stage("export_all") as schritt:
+        created_files = exp.export_all(all_results, processed_dir,
+                                       changed_years=to_export,
+                                       write_csv="csv" in exports,
+                                       write_geojson=geojson_format is not None,
+                                       geojson_format=geojson_format or "geojson",
+                                       precision=precision,
+                                       write_tiles=tiles,
+                                       heatmap_raster=density.raster_from_boundaries(gdf_leipzig)
+                                       if heatmaps else None)  # processed_dir!
+        schritt.rows_in = sum(result['count'] for result in all_results)
+    print(f"✓ {len(to_export)} Jahre neu exportiert")
+    print(f"✓ Parquet-Datensatz: {len(created_files['parquet_files'])} Jahre")
+    if created_files['combined_csv']:
+        print(f"✓ Gesamtdatei: {os.path.basename(created_files['combined_csv'])}")
+    if created_files['tiles']:
+        print(f"✓ Vektorkacheln: {os.path.basename(created_files['tiles'])}")
+    if created_files['heatmaps']:
+        print(f"✓ Heatmap-Raster: {os.path.dirname(created_files['heatmaps'])}")
+
+    # Gesamtdatei mit anderem Jahresbereich im Namen (z. B. nach einem neuen Jahr) ersetzen
+    alte_gesamtdatei = previous.get("combined_csv")
+    if (created_files['combined_csv'] and alte_gesamtdatei
+            and os.path.abspath(alte_gesamtdatei) != os.path.abspath(created_files['combined_csv'])
+            and os.path.isfile(alte_gesamtdatei)):
+        os.remove(alte_gesamtdatei)
+
+    # Jahre ohne Rohdatei: Dateien entfernen (Würfel & Co. sind schon ohne sie geschrieben)
+    for year in plan["removed"]:
+        cache.remove_year(processed_dir, year, previous.get("years", {}).get(str(year), {}))
+        print(f"⊘ Jahr {year}: Rohdatei nicht mehr vorhanden – verarbeitete Dateien entfernt")
+
+    cache.save_manifest(processed_dir, cache.build_manifest(plan, all_results, created_files,
+                                                            previous=previous))
+    return created_files, all_results
+
+def build(years, raw_dir, processed_dir, bezirke_file, exports, force=False, workers=1,
+          precision=None, tiles=False, heatmaps=False, ortsteile_file=None):
+    """
+    Bringt die verarbeiteten Daten auf den aktuellen Stand (nur geänderte
+    Jahre werden neu verarbeitet).
 
-    return True
+    Returns:
+        tuple: (created_files, datensatz); datensatz ist None, wenn es keine Rohdaten gibt
+    """
+    # Prüfen, welche Jahre sich seit dem letzten Lauf geändert haben
+    manifest = cache.load_manifest(processed_dir)
+    plan = cache.plan_build(manifest, years, raw_dir, bezirke_file, processed_dir,
+                            exports=exports, force=force, ortsteile_file=ortsteile_file,
+                            precision=precision)
+    if not (plan["changed"] or plan["changed_sources"] or plan["export_only"] or plan["cached"]):
+        print(f"✗ Keine Unfalldaten in {raw_dir} gefunden. Bitte die Unfallatlas-Dateien "
+              f"(z. B. Unfallorte2024_LinRef.csv) dort ablegen und erneut starten.\n")
+        return cache.created_files_from_manifest({}), None
+    combined_csv = manifest.get("combined_csv")
+    combined_ok = "csv" not in exports or bool(combined_csv) and os.path.isfile(combined_csv)
+    cube_ok = bool(manifest.get("cube")) and os.path.isfile(manifest["cube"])
+    points_ok = bool(manifest.get("points")) and os.path.isfile(manifest["points"])
+    tiles_ok = not tiles or bool(manifest.get("tiles")) and os.path.isfile(manifest["tiles"])
+    heatmaps_ok = not heatmaps or bool(manifest.get("heatmaps")) and os.path.isfile(manifest["heatmaps"])
+
+    if (not plan["changed"] and not plan["changed_sources"] and not plan["export_only"]
+            and not plan["removed"] and manifest.get("years")
+            and combined_ok and cube_ok and points_ok and tiles_ok and heatmaps_ok):
+        print("✓ Verarbeitete Daten bereits aktuell – überspringe Verarbeitung.\n")
+        cache.save_manifest(processed_dir, cache.refresh_signatures(manifest, plan))
+        created_files = cache.created_files_from_manifest(manifest)
+        # Unfalldaten werden erst geladen, wenn eine Auswertung sie braucht
+        return created_files, AccidentDataset.from_disk()
+
+    created_files, all_results = process_and_export(plan, raw_dir, processed_dir, bezirke_file,
+                                                    exports, workers=workers, precision=precision,
+                                                    tiles=tiles, heatmaps=heatmaps,
+                                                    ortsteile_file=ortsteile_file)
+    # Auswertungen nutzen die Daten direkt aus dem Speicher
+    return created_files, AccidentDataset.from_results(all_results, wuerfel=created_files['cube_data'])
+
+def run_batch(args, datensatz):
+    """Führt die Auswertungen eines Unterbefehls ohne Menü aus und schreibt die Ergebnisse."""
+    import batch_analysis
+
+    auswertungen = list(dict.fromkeys([args.befehl] + args.weitere))
+    print(f"[4/4] Berechne Auswertungen: {', '.join(auswertungen)}")
+    with metrics.stage("batch_analysis"):
+        ergebnisse = batch_analysis.run(auswertungen, datensatz.wuerfel, args.out_dir,
+                                        stadtbezirke=args.districts, jahre=args.years,
+                                        fmt=args.format, ortsteile=args.subdistricts)
+    for name, path in ergebnisse.items():
+        print(f"✓ {name}: {path}")
+
+def run_hotspots(args, processed_dir):
+    """Berechnet die Unfallschwerpunkte für die gewählte Auswahl und gibt die größten aus."""
+    import hotspots
+
+    radius = hotspots.RADIUS if args.radius is None else args.radius
+    min_punkte = hotspots.MIN_PUNKTE if args.min_points is None else args.min_points
+    print(f"[4/4] Suche Unfallschwerpunkte (Radius {radius:g} m, mind. {min_punkte} Unfälle)")
+    with metrics.stage("hotspots"):
+        path, tabelle = hotspots.build_hotspots(
+            processed_dir, os.path.join(args.out_dir, "hotspots.geojson"),
+            radius=radius, min_punkte=min_punkte, jahre=args.years,
+            verkehrsmittel=args.modes, jahreszeiten=args.seasons
+        )
+    print(f"✓ {len(tabelle)} Schwerpunkte: {path}")
+    for _, zeile in tabelle.head(10).iterrows():
+        print(f"  {zeile['RANG']:>3}. {zeile['ANZAHL']:>4} Unfälle, Schwere {zeile['SCHWERE']:>4} "
+              f"({zeile.geometry.x:.0f}, {zeile.geometry.y:.0f})")
+
+def run_figures(args, datensatz):
+    """Speichert die Abbildungen ohne Bildschirm (Agg-Backend) als PNG/SVG/PDF."""
+    # Agg wählen, bevor pyplot geladen wird: kein Fenster, plt.show() entfällt
+    import matplotlib
+    matplotlib.use("Agg")
+    import figures
+    from UnfaelleJahresvergleich import plot_unfalltrend, plot_zeitreihen
+
+    print(f"[4/4] Zeichne Abbildungen ({', '.join(args.formats)})")
+    os.makedirs(args.out_dir, exist_ok=True)
+    with metrics.stage("figures") as schritt:
+        paths = figures.export_figures(datensatz.wuerfel, args.out_dir, stadtbezirke=args.districts,
+                                       jahre=args.years, arten=args.modes, formate=args.formats,
+                                       workers=args.workers)
+        # Dazu die Übersichten für ganz Leipzig (wie Menüpunkt 2)
+        for fmt in args.formats:
+            for name, plot in (("Jahresvergleich", plot_unfalltrend), ("Zeitreihen", plot_zeitreihen)):
+                paths.append(os.path.join(args.out_dir, f"{name}.{fmt}"))
+                plot(datensatz.wuerfel, path=paths[-1])
+        schritt.rows_out = len(paths)
+    print(f"✓ {len(paths)} Abbildungen: {args.out_dir}")
+
+def run_basemap(args, bezirke_file, processed_dir):
+    """Lädt die Kacheln der Basiskarte für die Stadtbezirke in den lokalen Cache."""
+    import tile_cache
+
+    url = args.tile_url or tile_cache.TILE_URL
+    min_zoom = tile_cache.MIN_ZOOM if args.min_zoom is None else args.min_zoom
+    max_zoom = tile_cache.MAX_ZOOM if args.max_zoom is None else args.max_zoom
+    threads = tile_cache.THREADS if args.threads is None else args.threads
+    print(f"[1/1] Lade Basiskarte (Zoomstufen {min_zoom}–{max_zoom}) von {url}")
+    try:
+        ergebnis = tile_cache.seed_tiles(bezirke_file, processed_dir, url=url, min_zoom=min_zoom,
+                                         max_zoom=max_zoom, threads=threads)
+    except ValueError as e:
+        print(f"✗ {e}")
+        return
+    print(f"✓ {ergebnis['tiles']} Kacheln: {ergebnis['downloaded']} geladen, "
+          f"{ergebnis['cached']} schon vorhanden: {ergebnis['path']}")
+    if ergebnis["failed"]:
+        print(f"✗ {len(ergebnis['failed'])} Kacheln fehlgeschlagen (beim nächsten Lauf erneut), z. B.:")
+        for zoom, x, y, fehler in ergebnis["failed"][:5]:
+            print(f"  {zoom}/{x}/{y}: {fehler}")
+
+def write_metrics(path, fmt):
+    """Schreibt die gesammelten Messungen (wird beim Beenden aufgerufen)."""
+    print(f"✓ Messungen ({fmt}): {metrics.write(path, fmt)}")
 
 # Hier folgte jetzt die Hauptfunktion, die den gesamten Workflow koordinieren soll.
-def main():
+def main(argv=None):
     """Hauptfunktion: Koordiniert den gesamten Workflow."""
+    args = parse_args(argv)
+
+    # Messungen je Verarbeitungsschritt: beim Beenden schreiben (auch nach Fehlern)
+    if args.profile:
+        metrics.enable_profiling(args.profile)
+    if args.metrics:
+        atexit.register(write_metrics, args.metrics, args.metrics_format)
 
-    # Konfiguration
-    years = range(2016, 2025)
+    # Konfiguration; die Jahre ergeben sich aus den Dateien in data/raw
+    years = None
     data_dir = "../data"
     raw_dir = f"{data_dir}/raw"
     processed_dir = f"{data_dir}/processed"
     bezirke_file = f"{raw_dir}/Stadtbezirke_Leipzig_UTM33N.json"
+    # Optional: feinere Ortsteile (werden ohne Datei einfach weggelassen)
+    ortsteile_file = f"{raw_dir}/Ortsteile_Leipzig_UTM33N.json"
 
     print("=" * 60)
     print("UNFALLDATEN-ANALYSE LEIPZIG")
@@ -123,60 +522,93 @@ def main():
     setup_directories(data_dir)
 
 
-    # # NEU: Prüfen, ob bereits alles vorliegt
-    # if outputs_already_exist(processed_dir, years):
-    #     print("✔ Verarbeitete Daten bereits vorhanden – überspringe Verarbeitung.\n")
-    #     # Wenn du später hier nur noch Visualisierung starten willst, kannst du das tun:
-    #     # qgis.visualize_in_qgis( ... )
-    #     return
-
-    # Schritt 1: Bezirksgrenzen einmalig laden
-    print("[1/4] Lade Leipziger Bezirksgrenzen...")
-    gdf_leipzig = dp.load_bezirke(bezirke_file)
-    print(f"✓ Bezirke geladen (CRS: {gdf_leipzig.crs})\n")
-
-    # Schritt 2: Alle Jahre verarbeiten
-    print("[2/4] Verarbeite Unfalldaten...")
-    all_results = []
-
-    for year in years:
-        result = dp.process_year(year, raw_dir, gdf_leipzig)  # raw_dir!
-        if result:
-            all_results.append(result)
-            print(f"  ✓ Jahr {year}: {result['count']} Unfälle in Leipzig")
+    # Die Basiskarte braucht nur die Bezirksgrenzen, keine verarbeiteten Daten
+    if args.befehl == "basemap":
+        run_basemap(args, bezirke_file, processed_dir)
+        return
 
-    # Schritt 3: Daten exportieren
-    print(f"\n[3/4] Exportiere Daten...")
-    created_files = exp.export_all(all_results, processed_dir)  # processed_dir!
-    print(f"✓ {len(created_files['csv_files'])} CSV-Dateien erstellt")
-    print(f"✓ {len(created_files['geojson_files'])} GeoJSON-Dateien erstellt")
-    print(f"✓ Gesamtdatei: {os.path.basename(created_files['combined_csv'])}")
+    # Abgeleitete Exportformate (Parquet wird immer geschrieben); "ingest" und
+    # die Auswertungen brauchen nur den Parquet-Datensatz und den Würfel
+    if args.befehl in ("ingest", "hotspots", "figures") or args.befehl in AUSWERTUNGEN:
+        exports = ()
+        tiles = heatmaps = False
+    else:
+        tiles = not args.no_tiles
+        heatmaps = not args.no_heatmaps
+        exports = tuple(fmt for fmt, disabled in (("csv", args.no_csv),
+                                                  (args.geojson_format, args.no_geojson))
+                        if not disabled)
+
+    created_files, datensatz = build(years, raw_dir, processed_dir, bezirke_file, exports,
+                                     force=args.force, workers=args.workers,
+                                     precision=args.precision, tiles=tiles, heatmaps=heatmaps,
+                                     ortsteile_file=ortsteile_file)
+    if datensatz is None:
+        return
+
+    if args.befehl in ("ingest", "export"):
+        print("✓ Daten verarbeitet")
+        return
+    if args.befehl in AUSWERTUNGEN:
+        run_batch(args, datensatz)
+        return
+    if args.befehl == "hotspots":
+        run_hotspots(args, processed_dir)
+        return
+    if args.befehl == "figures":
+        run_figures(args, datensatz)
+        return
 
     # Schritt 4: Input User
     print("=" * 60)
     print("WILLKOMMEN! DEINE EINGABE IST NUN ERFORDERLICH")
     print("=" * 60)
-    input = input_user()
-
-    # Schritt 5 Input prüfen
-    if input == "1":
-        print("Success 1")
-        input_for_1 = input_user_for_1()
-        if input_for_1 == "1":
-            visualize_in_qgis(created_files["geojson_files"])
-        elif input_for_1 == "2":
-            visualize_in_qgis_heatmap(created_files["geojson_files"])
-
-    elif input == "2":
-        print("Success 2")
-        plot_unfalltrend(lade_unfaelle()) #WAS BENÖTIGT DIE FUNKTION???
-    elif input == "3":
-        print("Success 3")
-        user_input_choice()
-        user_input_choice_2()
 
-    else:
-        print("\n\nFehlerhafte Eingabe. Bitte gib eine der Zahlen an, die Dir vorgeschlagen werden und drücke dann auf Enter.")
+    # Schritt 5 Input prüfen – das Menü läuft, bis [q] gewählt wird; alle
+    # Auswertungen teilen sich denselben Datensatz
+    while True:
+        auswahl = input_user()
+
+        if auswahl == "1":
+            print("Success 1")
+            import tile_cache
+            basemap = tile_cache.basemap_path(processed_dir)
+            if not os.path.isfile(basemap):
+                print("⊘ Keine lokale Basiskarte – OpenStreetMap wird online geladen "
+                      "(Cache anlegen: python main.py basemap)")
+            input_for_1 = input_user_for_1()
+            if input_for_1 == "1":
+                from visualization import visualize_in_qgis
+                # Schwerpunkte aus dem Export übernehmen; fehlen sie (älteres
+                # Manifest), einmal berechnen und für die Sitzung merken
+                hotspots_file = created_files.get("hotspots")
+                if not hotspots_file or not os.path.isfile(hotspots_file):
+                    import hotspots
+                    hotspots_file, _ = hotspots.build_hotspots(processed_dir)
+                    created_files["hotspots"] = hotspots_file
+                visualize_in_qgis(created_files["geojson_files"], tiles=created_files.get("tiles"),
+                                  hotspots=hotspots_file, basemap=basemap)
+            elif input_for_1 == "2":
+                from heatmap_qgis_integration import visualize_in_qgis_heatmap
+                visualize_in_qgis_heatmap(created_files["geojson_files"], tiles=created_files.get("tiles"),
+                                          heatmaps=created_files.get("heatmaps"), basemap=basemap)
+
+        elif auswahl == "2":
+            print("Success 2")
+            from UnfaelleJahresvergleich import plot_unfalltrend, plot_zeitreihen
+            plot_unfalltrend(datensatz.wuerfel)
+            plot_zeitreihen(datensatz.wuerfel)
+        elif auswahl == "3":
+            print("Success 3")
+            from UnfaelleStadtbezirkeNachJahreszeiten import user_input_choice, user_input_choice_2
+            user_input_choice(datensatz)
+            user_input_choice_2(datensatz)
+        elif auswahl == "q":
+            print("\nAuf Wiedersehen!")
+            break
+
+        else:
+            print("\n\nFehlerhafte Eingabe. Bitte gib eine der Zahlen an, die Dir vorgeschlagen werden und drücke dann auf Enter.")
 
     # # Schritt X: QGIS-Visualisierung
     # print(f"\n[4/4] Öffne QGIS...")
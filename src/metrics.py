@@ -0,0 +1,308 @@
+"""
+Modul für Laufzeit-Messungen der einzelnen Verarbeitungsschritte.
+
+Jeder Schritt wird mit `stage` umschlossen und erfasst Wandzeit, CPU-Zeit,
+Zeilen (rein/raus), gelesene und geschriebene Bytes sowie den bisher höchsten
+Speicherbedarf des Prozesses (Peak RSS):
+
+    with metrics.stage("read_csv", year=2016) as schritt:
+        schritt.read(csv_path)
+        df = read_csv_typed(csv_path)
+        schritt.rows_out = len(df)
+
+Der Peak RSS ist der Höchststand des ganzen Prozesses seit dem Start
+(ru_maxrss) am Ende des Schritts, kein Wert des einzelnen Schritts; das Feld
+heißt daher "process_peak_rss_bytes".
+
+Verschachtelte Schritte erhalten den Pfad ihrer Eltern ("process_year/read_csv").
+Schritte, die mit einer Ausnahme enden, werden ebenfalls erfasst und erhalten
+das Label "error" mit dem Namen der Ausnahme (z. B. error="ValueError").
+Die Messungen werden immer gesammelt (das kostet nur ein paar Systemaufrufe je
+Schritt) und mit write_json bzw. write_prometheus geschrieben. Mit
+enable_profiling erhält zusätzlich jeder Schritt ein cProfile-Profil.
+
+Das Modul kommt ohne pandas & Co. aus, damit main.py schnell startet;
+cProfile wird erst geladen, wenn profiliert wird.
+"""
+import json
+import os
+import re
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Präfix der Prometheus-Metriken
+PROMETHEUS_PRAEFIX = "unfaelle_stage"
+
+# Anzahl Zeilen der Textzusammenfassung je Profil
+PROFIL_ZEILEN = 40
+
+_lock = threading.Lock()
+_lokal = threading.local()
+_messungen = []
+
+# Verzeichnis für die cProfile-Dateien (None = nicht profilieren) und ob gerade
+# ein Profiler läuft (cProfile erlaubt nur einen gleichzeitig)
+_profil_dir = None
+_profil_aktiv = False
+
+
+def peak_rss_bytes():
+    """Bisher höchster Speicherbedarf des Prozesses in Bytes (None ohne resource-Modul)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux liefert KB, macOS Bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _groesse(path):
+    """Größe einer Datei bzw. aller Dateien eines Verzeichnisses (0, wenn nicht vorhanden)."""
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(ordner, name))
+                   for ordner, _, namen in os.walk(path) for name in namen)
+    return os.path.getsize(path) if os.path.isfile(path) else 0
+
+
+class Schritt:
+    """Messwerte eines Schritts; rows_in/rows_out setzt der Aufrufer."""
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+        self.rows_in = None
+        self.rows_out = None
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    def read(self, *paths):
+        """Zählt die Größe der gelesenen Dateien (bzw. Verzeichnisse)."""
+        self.bytes_read += sum(_groesse(path) for path in paths if path)
+
+    def wrote(self, *paths):
+        """Zählt die Größe der geschriebenen Dateien (bzw. Verzeichnisse)."""
+        self.bytes_written += sum(_groesse(path) for path in paths if path)
+
+    def as_dict(self):
+        return {
+            "stage": self.name,
+            "labels": self.labels,
+            "wall_s": round(self.wall_s, 6),
+            "cpu_s": round(self.cpu_s, 6),
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "process_peak_rss_bytes": self.process_peak_rss_bytes,
+        }
+
+
+def _laufend():
+    """Der gerade laufende Schritt im aktuellen Thread (None außerhalb)."""
+    stapel = getattr(_lokal, "stapel", None)
+    return stapel[-1] if stapel else None
+
+
+def current():
+    """Pfad des gerade laufenden Schritts im aktuellen Thread (None außerhalb)."""
+    schritt = _laufend()
+    return schritt.name if schritt else None
+
+
+class stage:
+    """
+    Kontextmanager, der einen Schritt misst.
+
+    Args:
+        name (str): Name des Schritts
+        parent (str): Pfad des Elternschritts; Standard ist der laufende
+            Schritt im selben Thread, dessen Labels dann übernommen werden
+            (für Aufgaben auf einem Thread-Pool den Pfad mit current()
+            vorher ermitteln und übergeben)
+        **labels: Zusätzliche Merkmale, z. B. year=2016
+
+    Die CPU-Zeit ist im Hauptthread die des ganzen Prozesses, in anderen
+    Threads nur die des eigenen Threads (parallele Schritte zählen sich
+    sonst gegenseitig mit).
+    """
+
+    def __init__(self, name, parent=None, **labels):
+        labels = {key: str(value) for key, value in labels.items()}
+        eltern = _laufend()
+        if parent is None and eltern is not None:
+            parent, labels = eltern.name, {**eltern.labels, **labels}
+        self._stage = Schritt(f"{parent}/{name}" if parent else name, labels)
+        self._cpu = time.process_time if threading.current_thread() is threading.main_thread() \
+            else time.thread_time
+        self._profil = None
+
+    def __enter__(self):
+        global _profil_aktiv
+        if not hasattr(_lokal, "stapel"):
+            _lokal.stapel = []
+        _lokal.stapel.append(self._stage)
+
+        if _profil_dir is not None:
+            with _lock:
+                if not _profil_aktiv:
+                    import cProfile
+                    _profil_aktiv = True
+                    self._profil = cProfile.Profile()
+            if self._profil is not None:
+                self._profil.enable()
+
+        self._start_wall = time.perf_counter()
+        self._start_cpu = self._cpu()
+        return self._stage
+
+    def __exit__(self, exc_type, exc, tb):
+        global _profil_aktiv
+        schritt = self._stage
+        schritt.wall_s = time.perf_counter() - self._start_wall
+        schritt.cpu_s = self._cpu() - self._start_cpu
+        schritt.process_peak_rss_bytes = peak_rss_bytes()
+        _lokal.stapel.pop()
+
+        if self._profil is not None:
+            self._profil.disable()
+            _profil_speichern(self._profil, schritt)
+            with _lock:
+                _profil_aktiv = False
+
+        # Fehlgeschlagene Schritte mit dem Namen der Ausnahme erfassen
+        if exc_type is not None:
+            schritt.labels = {**schritt.labels, "error": exc_type.__name__}
+        with _lock:
+            _messungen.append(schritt.as_dict())
+        return False
+
+
+def _profil_speichern(profil, schritt):
+    """Schreibt das Profil eines Schritts (.prof für snakeviz & Co., .txt zum Lesen)."""
+    import io
+    import pstats
+
+    teile = [schritt.name] + [f"{key}-{value}" for key, value in sorted(schritt.labels.items())]
+    name = re.sub(r"[^\w.-]+", "_", "__".join(teile))
+    path = os.path.join(_profil_dir, name)
+    profil.dump_stats(path + ".prof")
+
+    text = io.StringIO()
+    pstats.Stats(profil, stream=text).sort_stats("cumulative").print_stats(PROFIL_ZEILEN)
+    with open(path + ".txt", "w", encoding="utf-8") as f:
+        f.write(text.getvalue())
+
+
+def enable_profiling(profile_dir):
+    """
+    Profiliert ab jetzt jeden Schritt mit cProfile (Dateien in profile_dir).
+
+    Da immer nur ein Profiler laufen kann, erhält bei verschachtelten oder
+    parallelen Schritten nur der äußere bzw. zuerst gestartete ein Profil.
+    Worker-Prozesse rufen enable_profiling mit profile_dir() selbst auf.
+    """
+    global _profil_dir
+    os.makedirs(profile_dir, exist_ok=True)
+    _profil_dir = profile_dir
+
+
+def profile_dir():
+    """Verzeichnis der Profile (None, wenn nicht profiliert wird)."""
+    return _profil_dir
+
+
+def records():
+    """Alle bisher abgeschlossenen Messungen (Liste von Dicts)."""
+    with _lock:
+        return list(_messungen)
+
+
+def take_records():
+    """Gibt die bisherigen Messungen zurück und leert die Liste (für Worker-Prozesse)."""
+    with _lock:
+        messungen = list(_messungen)
+        _messungen.clear()
+    return messungen
+
+
+def add_records(messungen):
+    """Übernimmt Messungen aus einem Worker-Prozess."""
+    with _lock:
+        _messungen.extend(messungen)
+
+
+def _atomar_schreiben(path, text):
+    """Schreibt eine Datei atomar (für den Textfile-Collector von Prometheus wichtig)."""
+    ordner = os.path.dirname(os.path.abspath(path))
+    os.makedirs(ordner, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+    return path
+
+
+def write_json(path):
+    """Schreibt alle Messungen als JSON Lines (eine Zeile je Schritt)."""
+    return _atomar_schreiben(path, "".join(json.dumps(messung, ensure_ascii=False) + "\n"
+                                           for messung in records()))
+
+
+def _prometheus_labels(messung):
+    labels = {"stage": messung["stage"], **messung["labels"]}
+    teile = []
+    for key, value in sorted(labels.items()):
+        value = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        teile.append(f'{key}="{value}"')
+    return "{" + ",".join(teile) + "}"
+
+
+# Prometheus-Metrik -> (Feld der Messung, Beschreibung, Summe über Wiederholungen?)
+_PROMETHEUS_METRIKEN = {
+    "wall_seconds": ("wall_s", "Wandzeit des Schritts in Sekunden", True),
+    "cpu_seconds": ("cpu_s", "CPU-Zeit des Schritts in Sekunden", True),
+    "rows_in": ("rows_in", "Eingelesene Zeilen", True),
+    "rows_out": ("rows_out", "Ausgegebene Zeilen", True),
+    "bytes_read": ("bytes_read", "Gelesene Bytes", True),
+    "bytes_written": ("bytes_written", "Geschriebene Bytes", True),
+    "process_peak_rss_bytes": ("process_peak_rss_bytes",
+                               "Höchster Speicherbedarf des ganzen Prozesses seit dem Start "
+                               "(ru_maxrss), gemessen am Ende des Schritts", False),
+}
+
+
+def write_prometheus(path):
+    """
+    Schreibt alle Messungen im Textformat für den Textfile-Collector des
+    node_exporter. Wiederholte Schritte mit gleichen Labels werden summiert
+    (Peak RSS: Maximum).
+    """
+    zeilen = []
+    for metrik, (feld, beschreibung, summieren) in _PROMETHEUS_METRIKEN.items():
+        werte = {}
+        for messung in records():
+            wert = messung[feld]
+            if wert is None:
+                continue
+            labels = _prometheus_labels(messung)
+            if labels in werte:
+                werte[labels] = werte[labels] + wert if summieren else max(werte[labels], wert)
+            else:
+                werte[labels] = wert
+        if not werte:
+            continue
+        name = f"{PROMETHEUS_PRAEFIX}_{metrik}"
+        zeilen.append(f"# HELP {name} {beschreibung}")
+        zeilen.append(f"# TYPE {name} gauge")
+        zeilen.extend(f"{name}{labels} {wert}" for labels, wert in werte.items())
+    return _atomar_schreiben(path, "\n".join(zeilen) + "\n")
+
+
+def write(path, fmt="json"):
+    """Schreibt die Messungen als "json" (JSON Lines) oder "prometheus"."""
+    return write_prometheus(path) if fmt == "prometheus" else write_json(path)
@@ -0,0 +1,117 @@
+"""
+Modul für den spaltenbasierten Datenspeicher der verarbeiteten Unfalldaten.
+
+Alle Jahre liegen als GeoParquet-Datensatz unter data/processed/parquet,
+partitioniert nach UJAHR (ein Unterordner "UJAHR=2016" usw. pro Jahr).
+Beim Lesen werden nur die benötigten Spalten geladen und Filter auf Jahr
+und Stadtbezirk direkt an Parquet weitergereicht.
+"""
+import json
+import os
+import shutil
+
+import geopandas as gpd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+DATASET_NAME = "parquet"
+PARTITION_COLUMN = "UJAHR"
+
+
+def dataset_dir(processed_dir):
+    """Verzeichnis des Parquet-Datensatzes."""
+    return os.path.join(processed_dir, DATASET_NAME)
+
+
+def _part_files(processed_dir):
+    """Alle Parquet-Dateien des Datensatzes (sortiert nach Jahr)."""
+    root = dataset_dir(processed_dir)
+    if not os.path.isdir(root):
+        return []
+    return sorted(
+        os.path.join(root, part, name)
+        for part in os.listdir(root) if part.startswith(f"{PARTITION_COLUMN}=")
+        for name in os.listdir(os.path.join(root, part)) if name.endswith(".parquet")
+    )
+
+
+def dataset_exists(processed_dir):
+    """Prüft, ob ein Parquet-Datensatz vorhanden ist."""
+    return bool(_part_files(processed_dir))
+
+
+def write_year(gdf, year, processed_dir):
+    """
+    Schreibt die Daten eines Jahres als Partition des GeoParquet-Datensatzes.
+    Eine bestehende Partition des Jahres wird ersetzt.
+
+    Args:
+        gdf (gpd.GeoDataFrame): Gefilterte Unfälle eines Jahres
+        year (int): Jahr
+        processed_dir (str): Verzeichnis der verarbeiteten Daten
+
+    Returns:
+        str: Pfad zur geschriebenen Parquet-Datei
+    """
+    part_dir = os.path.join(dataset_dir(processed_dir), f"{PARTITION_COLUMN}={year}")
+    shutil.rmtree(part_dir, ignore_errors=True)
+    os.makedirs(part_dir)
+
+    # Das Jahr steckt im Ordnernamen und wird nicht zusätzlich gespeichert
+    parquet_path = os.path.join(part_dir, "part-0.parquet")
+    gdf.drop(columns=[PARTITION_COLUMN], errors="ignore").to_parquet(parquet_path, index=False)
+    return parquet_path
+
+
+def _crs_from_schema(schema):
+    """Liest das CRS der Geometriespalte aus den GeoParquet-Metadaten."""
+    geo = json.loads((schema.metadata or {}).get(b"geo", b"{}"))
+    return geo.get("columns", {}).get("geometry", {}).get("crs")
+
+
+def read_dataset(processed_dir, columns=None, years=None, districts=None):
+    """
+    Liest den Parquet-Datensatz mit Spaltenauswahl und Filtern.
+
+    Die Schemata aller Jahre werden vereinigt: Spalten, die es nur in einzelnen
+    Jahrgängen gibt, sind in den übrigen Jahren leer (NaN).
+
+    Args:
+        processed_dir (str): Verzeichnis der verarbeiteten Daten
+        columns (list): Zu ladende Spalten (None = alle). Nicht vorhandene
+            Spalten werden übersprungen.
+        years (iterable): Nur diese Jahre laden (optional)
+        districts (iterable): Nur diese Stadtbezirke ("Name") laden (optional)
+
+    Returns:
+        pd.DataFrame oder gpd.GeoDataFrame (falls "geometry" geladen wird)
+    """
+    files = _part_files(processed_dir)
+    schema = pa.unify_schemas([pq.read_schema(path) for path in files])
+    schema = schema.append(pa.field(PARTITION_COLUMN, pa.uint16()))
+
+    dataset = ds.dataset(
+        dataset_dir(processed_dir),
+        schema=schema,
+        format="parquet",
+        partitioning=ds.partitioning(pa.schema([(PARTITION_COLUMN, pa.uint16())]), flavor="hive")
+    )
+
+    # Filter werden beim Lesen ausgewertet (ganze Jahres-Partitionen entfallen)
+    filter_expr = None
+    if years is not None:
+        filter_expr = ds.field(PARTITION_COLUMN).isin([int(year) for year in years])
+    if districts is not None:
+        district_expr = ds.field("Name").isin(list(districts))
+        filter_expr = district_expr if filter_expr is None else filter_expr & district_expr
+
+    if columns is not None:
+        columns = [column for column in columns if column in schema.names]
+
+    df = dataset.to_table(columns=columns, filter=filter_expr).to_pandas()
+
+    if "geometry" in df.columns:
+        df["geometry"] = gpd.GeoSeries.from_wkb(df["geometry"])
+        return gpd.GeoDataFrame(df, geometry="geometry", crs=_crs_from_schema(schema))
+    return df
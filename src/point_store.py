@@ -0,0 +1,244 @@
+"""
+Modul für den binären Punktspeicher der verarbeiteten Unfälle.
+
+Jeder Unfall ist ein Datensatz fester Länge (NumPy-Record, siehe DTYPE):
+Koordinaten in EPSG:25833 und die kleinen Ganzzahl-Codes (Zeit, Kategorie,
+Unfallart, Stadtbezirk, Ortsteil, beteiligte Verkehrsmittel). Alle Jahre
+liegen nach Jahr sortiert in einer .npy-Datei, daneben ein kleiner JSON-Index
+mit den Zeilenbereichen der Jahre und den Namen der Stadtbezirke/Ortsteile.
+
+Gelesen wird per Memory-Mapping (np.load mit mmap_mode="r"): Das Öffnen kostet
+unabhängig von der Anzahl der Unfälle nur Mikrosekunden, erst beim Zugriff
+werden die benötigten Seiten geladen. Mehrere Prozesse, die dieselbe Datei
+öffnen, teilen sich die Seiten im Cache des Betriebssystems – an Worker
+übergibt man daher den Pfad, nicht das Array.
+"""
+import json
+import os
+
+import numpy as np
+
+POINTS_DIR = "points"
+POINTS_NAME = "Unfallpunkte_Leipzig.npy"
+INDEX_NAME = "Unfallpunkte_Leipzig.json"
+
+EPSG = 25833
+
+# Wert für fehlende Codes (Spalte gibt es im Jahrgang nicht bzw. kein Ortsteil)
+FEHLT = 255
+KEIN_ORTSTEIL = 65535
+
+# Verkehrsmittel (0/1)
+VERKEHRSMITTEL = ["IstRad", "IstPKW", "IstFuss", "IstKrad", "IstGkfz", "IstSonstige"]
+
+# Codes mit 1 Byte (fehlende Werte = FEHLT)
+CODES = ["UMONAT", "USTUNDE", "UWOCHENTAG", "UKATEGORIE", "UART", "UTYP1", "ULICHTVERH"]
+
+DTYPE = np.dtype(
+    [("x", "<f8"), ("y", "<f8"), ("UJAHR", "<u2")]
+    + [(spalte, "u1") for spalte in CODES]
+    + [("SBZ", "u1"), ("OT", "<u2")]
+    + [(spalte, "u1") for spalte in VERKEHRSMITTEL]
+)
+
+
+def points_path(processed_dir):
+    """Pfad der Punktdatei."""
+    return os.path.join(processed_dir, POINTS_DIR, POINTS_NAME)
+
+
+def index_path(processed_dir):
+    """Pfad des JSON-Index (Jahresbereiche, Namen der Stadtbezirke und Ortsteile)."""
+    return os.path.join(processed_dir, POINTS_DIR, INDEX_NAME)
+
+
+def points_exist(processed_dir):
+    """Prüft, ob Punktdatei und Index vorhanden sind."""
+    return os.path.isfile(points_path(processed_dir)) and os.path.isfile(index_path(processed_dir))
+
+
+def _codes(df, spalte, fehlt=FEHLT, dtype="u1"):
+    """Ganzzahlige Spalte mit festem Wert für fehlende Werte (ganze Spalte oder einzelne Zeilen)."""
+    if spalte not in df.columns:
+        return np.full(len(df), fehlt, dtype=dtype)
+    werte = np.asarray(df[spalte].astype("float64"), dtype=np.float64)
+    return np.where(np.isnan(werte), fehlt, werte).astype(dtype)
+
+
+def to_records(gdf, ortsteile=None):
+    """
+    Wandelt die Unfälle eines Jahres in Datensätze des Punktspeichers um.
+
+    Args:
+        gdf (gpd.GeoDataFrame): Gefilterte Unfälle (Ergebnis von process_year)
+        ortsteile (dict): OT-Code -> laufende Nummer (wird um neue Codes ergänzt)
+
+    Returns:
+        np.ndarray: Datensätze mit DTYPE
+    """
+    records = np.zeros(len(gdf), dtype=DTYPE)
+    if gdf.crs is not None and gdf.crs.to_epsg() != EPSG:
+        gdf = gdf.to_crs(epsg=EPSG)
+    records["x"] = gdf.geometry.x.to_numpy()
+    records["y"] = gdf.geometry.y.to_numpy()
+
+    records["UJAHR"] = _codes(gdf, "UJAHR", 0, "<u2")
+    for spalte in CODES:
+        records[spalte] = _codes(gdf, spalte)
+    records["SBZ"] = _codes(gdf, "SBZ")
+
+    records["OT"] = KEIN_ORTSTEIL
+    if ortsteile is not None and "OT" in gdf.columns:
+        codes = gdf["OT"].to_numpy(dtype=object)
+        vorhanden = ~gdf["OT"].isna().to_numpy()
+        for code in dict.fromkeys(codes[vorhanden]):
+            ortsteile.setdefault(code, len(ortsteile))
+        records["OT"][vorhanden] = [ortsteile[code] for code in codes[vorhanden]]
+
+    for spalte in VERKEHRSMITTEL:
+        records[spalte] = _codes(gdf, spalte, 0)
+    return records
+
+
+def write_points(results, processed_dir):
+    """
+    Schreibt die Unfälle aller Jahre in die Punktdatei (nach Jahr sortiert).
+
+    Die Datei wird erst unter einem temporären Namen geschrieben und dann
+    umbenannt, damit Leser nie eine halbe Datei sehen.
+
+    Args:
+        results (list): Ergebnisse von process_year ({'year', 'gdf_filtered', ...})
+        processed_dir (str): Verzeichnis der verarbeiteten Daten
+
+    Returns:
+        str: Pfad der Punktdatei
+    """
+    path = points_path(processed_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    results = sorted(results, key=lambda result: result['year'])
+    anzahl = sum(len(result['gdf_filtered']) for result in results)
+    stadtbezirke, ortsteile, ortsteil_namen, jahre = {}, {}, {}, {}
+
+    tmp_path = path + ".tmp"
+    ziel = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=DTYPE, shape=(anzahl,))
+    start = 0
+    for result in results:
+        gdf = result['gdf_filtered']
+        ziel[start:start + len(gdf)] = to_records(gdf, ortsteile)
+        jahre[str(result['year'])] = [start, start + len(gdf)]
+        start += len(gdf)
+
+        if "SBZ" in gdf.columns and "Name" in gdf.columns:
+            for sbz, name in gdf[["SBZ", "Name"]].drop_duplicates().itertuples(index=False):
+                stadtbezirke[str(int(sbz))] = name
+        if "OT" in gdf.columns and "Ortsteil" in gdf.columns:
+            for ot, name in gdf[["OT", "Ortsteil"]].dropna().drop_duplicates().itertuples(index=False):
+                ortsteil_namen[ot] = name
+    ziel.flush()
+    del ziel
+    os.replace(tmp_path, path)
+
+    index = {
+        "epsg": EPSG,
+        "count": anzahl,
+        "years": jahre,
+        "stadtbezirke": stadtbezirke,
+        "ortsteile": [[ot, ortsteil_namen.get(ot)] for ot in ortsteile],
+    }
+    with open(index_path(processed_dir) + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, indent=2)
+    os.replace(index_path(processed_dir) + ".tmp", index_path(processed_dir))
+    return path
+
+
+def load_index(processed_dir):
+    """Lädt den JSON-Index der Punktdatei."""
+    with open(index_path(processed_dir), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def open_points(processed_dir, years=None, index=None):
+    """
+    Öffnet die Punktdatei per Memory-Mapping (ohne sie einzulesen).
+
+    Args:
+        processed_dir (str): Verzeichnis der verarbeiteten Daten
+        years (iterable): Nur diese Jahre (optional); ein zusammenhängender
+            Jahresbereich bleibt eine Sicht auf die Datei, sonst wird kopiert
+        index (dict): Bereits geladener Index (optional)
+
+    Returns:
+        np.ndarray: Datensätze mit DTYPE (schreibgeschützt)
+    """
+    punkte = np.load(points_path(processed_dir), mmap_mode="r")
+    if years is None:
+        return punkte
+
+    bereiche = (index or load_index(processed_dir))["years"]
+    bereiche = sorted(bereiche[str(int(year))] for year in years if str(int(year)) in bereiche)
+    if not bereiche:
+        return punkte[:0]
+    if all(a[1] == b[0] for a, b in zip(bereiche, bereiche[1:])):
+        return punkte[bereiche[0][0]:bereiche[-1][1]]
+    return np.concatenate([punkte[start:stop] for start, stop in bereiche])
+
+
+def district_names(index):
+    """Namen der Stadtbezirke als Array (Position = SBZ-Code, None für unbekannte Codes)."""
+    namen = np.full(FEHLT + 1, None, dtype=object)
+    for sbz, name in index["stadtbezirke"].items():
+        namen[int(sbz)] = name
+    return namen
+
+
+def read_frame(processed_dir, columns=None, years=None, districts=None):
+    """
+    Lädt Unfälle aus der Punktdatei als DataFrame (Gegenstück zu
+    parquet_store.read_dataset für die Felder des Punktspeichers).
+
+    Neben den Feldern aus DTYPE gibt es die Spalten "Name" (Stadtbezirk) und
+    "Ortsteil". "OT" enthält wie im Parquet-Datensatz den Ortsteil-Code (nicht
+    die laufende Nummer der Punktdatei), ohne Ortsteil None. Fehlende Codes
+    werden wie im Parquet-Datensatz zu NaN.
+
+    Args:
+        processed_dir (str): Verzeichnis der verarbeiteten Daten
+        columns (list): Zu ladende Spalten (None = alle). Nicht vorhandene
+            Spalten werden übersprungen.
+        years (iterable): Nur diese Jahre laden (optional)
+        districts (iterable): Nur diese Stadtbezirke ("Name") laden (optional)
+
+    Returns:
+        pd.DataFrame: Eine Zeile je Unfall
+    """
+    import pandas as pd
+
+    index = load_index(processed_dir)
+    punkte = open_points(processed_dir, years, index)
+    namen = district_names(index)
+
+    if districts is not None:
+        codes = [int(sbz) for sbz, name in index["stadtbezirke"].items() if name in set(districts)]
+        punkte = punkte[np.isin(punkte["SBZ"], codes)]
+
+    if columns is None:
+        columns = list(DTYPE.names) + ["Name", "Ortsteil"]
+
+    tabelle = {}
+    for spalte in columns:
+        if spalte == "Name":
+            tabelle[spalte] = namen[punkte["SBZ"]]
+        elif spalte in ("OT", "Ortsteil"):
+            # Laufende Nummer -> [OT-Code, Name] aus dem Index (letzter Eintrag: kein Ortsteil)
+            feld = 0 if spalte == "OT" else 1
+            werte = np.array([eintrag[feld] for eintrag in index["ortsteile"]] + [None], dtype=object)
+            ot = punkte["OT"]
+            tabelle[spalte] = werte[np.where(ot == KEIN_ORTSTEIL, len(werte) - 1, ot)]
+        elif spalte in DTYPE.names:
+            werte = np.asarray(punkte[spalte])
+            if spalte in CODES + ["SBZ"] and (werte == FEHLT).any():
+                werte = np.where(werte == FEHLT, np.nan, werte)
+            tabelle[spalte] = werte
+    return pd.DataFrame(tabelle)
@@ -0,0 +1,135 @@
+"""
+Modul für das einheitliche Spaltenschema der verarbeiteten Unfalldaten.
+
+Die Unfallatlas-Jahrgänge benennen einige Spalten unterschiedlich (z. B.
+"IstSonstig" bis 2018, danach "IstSonstige") und enthalten nicht alle die
+gleichen Spalten. normalize wird beim Einlesen einmal je Jahr angewendet
+(siehe data_processing) und liefert für jeden Jahrgang dieselben Spalten in
+derselben Reihenfolge mit festen Datentypen. Überbleibsel des Spatial Join
+(index_right, FID_left, FID_right) und nicht benötigte Spalten entfallen.
+
+Alle Dateien in data/processed folgen diesem Schema; Auswertungen müssen
+daher nichts mehr umbenennen, auffüllen oder umwandeln. Bei Änderungen am
+Schema SCHEMA_VERSION erhöhen, dann werden alle Jahre neu verarbeitet.
+
+pandas und geopandas werden erst in normalize geladen, damit build_cache die
+Version prüfen kann, ohne den Start von main.py zu verlangsamen.
+"""
+
+SCHEMA_VERSION = "3"
+
+# Spaltennamen einzelner Jahrgänge -> einheitlicher Name
+UMBENENNUNGEN = {
+    "OBJECTID_1": "OBJECTID",              # 2018
+    "OID_": "OBJECTID",                    # 2021, 2023, 2024
+    "UIDENTSTLA": "UIDENTSTLAE",           # 2017
+    "LICHT": "ULICHTVERH",                 # 2017
+    "IstStrasse": "IstStrassenzustand",    # 2016
+    "STRZUSTAND": "IstStrassenzustand",    # 2017–2020
+    "IstSonstig": "IstSonstige",           # 2016–2018
+}
+
+# Gebietsschlüssel mit fester Stellenzahl (2024 fehlen die führenden Nullen)
+GEBIETSSCHLUESSEL = {"ULAND": 2, "UREGBEZ": 1, "UKREIS": 2, "UGEMEINDE": 3}
+
+# Verkehrsmittel (0/1); fehlt die Spalte in einem Jahrgang, war keins beteiligt
+VERKEHRSMITTEL = ["IstRad", "IstPKW", "IstFuss", "IstKrad", "IstGkfz", "IstSonstige"]
+
+# Spalten der verarbeiteten Daten in dieser Reihenfolge -> dtype (Geometrie zuletzt);
+# Text ausdrücklich als "string" (fehlende Werte NA), nicht "str", dessen Typ von der
+# pandas-Version abhängt (object bis pandas 2, eigener Texttyp ab pandas 3)
+SPALTEN = {
+    # Kennungen und Gebietsschlüssel
+    "OBJECTID": "string",
+    "UIDENTSTLAE": "string",
+    "ULAND": "string",
+    "UREGBEZ": "string",
+    "UKREIS": "string",
+    "UGEMEINDE": "string",
+    # Zeitangaben und Unfallmerkmale
+    "UJAHR": "uint16",
+    "UMONAT": "uint8",
+    "USTUNDE": "uint8",
+    "UWOCHENTAG": "uint8",
+    "UKATEGORIE": "uint8",
+    "UART": "uint8",
+    "UTYP1": "uint8",
+    "ULICHTVERH": "uint8",
+    "IstStrassenzustand": "uint8",
+    # Beteiligte Verkehrsmittel
+    **{spalte: "uint8" for spalte in VERKEHRSMITTEL},
+    # Koordinaten
+    "LINREFX": "float64",
+    "LINREFY": "float64",
+    "XGCSWGS84": "float64",
+    "YGCSWGS84": "float64",
+    # Stadtbezirk und Ortsteil (leer ohne Ortsteil-Datei)
+    "SBZ": "string",
+    "Name": "string",
+    "OT": "string",
+    "Ortsteil": "string",
+}
+
+# Ganzzahlige Spalten, denen ein Wert fehlen darf, werden zu pandas-Typen mit NA
+_MIT_NA = {"uint8": "UInt8", "uint16": "UInt16"}
+
+
+def _spalte(df, spalte, dtype):
+    """
+    Eine Spalte des Schemas mit festem Datentyp (fehlende Spalten leer bzw. 0).
+
+    Ungültige Codes (Nachkommastellen, negativ oder zu groß für den Typ)
+    werden zu NA, statt beim Umwandeln abgeschnitten oder übergelaufen zu
+    werden (aus 1.5 würde sonst 1, aus -1 bei uint8 255).
+    """
+    import numpy as np
+    import pandas as pd
+
+    if spalte not in df.columns:
+        if spalte in VERKEHRSMITTEL:
+            return pd.Series(0, index=df.index, dtype=dtype)
+        if dtype in _MIT_NA or dtype == "string":
+            return pd.Series(pd.NA, index=df.index, dtype=_MIT_NA.get(dtype, dtype))
+        return pd.Series(np.nan, index=df.index, dtype=dtype)
+
+    werte = df[spalte]
+    if dtype in _MIT_NA and werte.dtype.kind in "fiu" and werte.dtype != pd.api.types.pandas_dtype(dtype):
+        zahlen = werte.to_numpy(dtype="float64", na_value=np.nan)
+        gueltig = (np.isfinite(zahlen) & (zahlen == np.round(zahlen))
+                   & (zahlen >= 0) & (zahlen <= np.iinfo(dtype).max))
+        if not gueltig.all():
+            werte = pd.Series(zahlen, index=werte.index).where(gueltig)
+    if dtype in _MIT_NA and werte.isna().any():
+        dtype = _MIT_NA[dtype]
+    # Mit dem dtype-Objekt vergleichen: "str" gleicht unter pandas 3 dem Namen "string"
+    if werte.dtype != pd.api.types.pandas_dtype(dtype):
+        werte = werte.astype(dtype)
+    if spalte in GEBIETSSCHLUESSEL:
+        werte = werte.str.zfill(GEBIETSSCHLUESSEL[spalte])
+    return werte
+
+
+def normalize(gdf):
+    """
+    Bringt die gefilterten Unfälle eines Jahrgangs in das einheitliche Schema.
+
+    Args:
+        gdf (gpd.GeoDataFrame): Ergebnis von filter_by_boundaries
+
+    Returns:
+        gpd.GeoDataFrame: Spalten SPALTEN (in dieser Reihenfolge) und Geometrie
+    """
+    import geopandas as gpd
+
+    for alt, neu in UMBENENNUNGEN.items():
+        if alt not in gdf.columns:
+            continue
+        if neu in gdf.columns:
+            # Beide Namen vorhanden (z. B. Datei mit mehreren Jahrgängen)
+            gdf[neu] = gdf[neu].fillna(gdf[alt])
+        else:
+            gdf = gdf.rename(columns={alt: neu})
+
+    spalten = {spalte: _spalte(gdf, spalte, dtype) for spalte, dtype in SPALTEN.items()}
+    spalten[gdf.geometry.name] = gdf.geometry
+    return gpd.GeoDataFrame(spalten, geometry=gdf.geometry.name, crs=gdf.crs)
@@ -0,0 +1,161 @@
+"""
+Modul für die Rohdaten-Quellen im Verzeichnis data/raw.
+
+Die Unfallorte kommen als einzelne Jahresdateien (Unfallorte2023_LinRef.csv),
+komprimiert (.csv.gz, .csv.zst), als ZIP-Archiv (auch mit mehreren Jahren)
+oder als eine Datei mit mehreren Jahren (z. B. Unfallorte_2016-2024_LinRef.csv).
+discover findet alle Quellen und die zugehörigen Jahre anhand der Dateinamen –
+ein neues Jahr braucht also nur eine neue Datei, keine Codeänderung.
+
+Gelesen wird immer als Datenstrom direkt aus der Datei bzw. dem Archiv, ohne
+vorher etwas auf die Festplatte zu entpacken. Bei Dateien mit mehreren Jahren
+stehen die Jahre erst nach dem Lesen fest (Spalte UJAHR); sie werden in einem
+Durchlauf aufgeteilt (siehe data_processing.process_source).
+"""
+import contextlib
+import gzip
+import io
+import os
+import re
+import zipfile
+
+# Jahresdatei: Unfallorte2023_LinRef.csv (Groß-/Kleinschreibung egal)
+_JAHRESDATEI = re.compile(r"^Unfallorte(\d{4})_LinRef\.csv$", re.IGNORECASE)
+
+# Sonstige Unfallorte-CSV ohne einzelnes Jahr im Namen: mehrere Jahre in einer Datei
+_MEHRJAHRESDATEI = re.compile(r"^Unfallorte.*\.csv$", re.IGNORECASE)
+
+# Komprimierte Einzeldateien (Endung -> Format)
+KOMPRESSION = {".gz": "gzip", ".zst": "zstd"}
+
+# Gibt es ein Jahr mehrfach, gewinnt die Quelle mit dem kleinsten Rang
+_RANG = {None: 0, "gzip": 1, "zstd": 2}
+
+# Lesepuffer: groß genug, um das Trennzeichen per peek() zu erkennen
+PUFFER = 1024 * 1024
+
+
+class Source:
+    """
+    Eine Rohdaten-Quelle: Datei oder Datei in einem ZIP-Archiv.
+
+    Attribute:
+        path (str): Pfad der Datei bzw. des Archivs
+        member (str): Name im ZIP-Archiv (None bei einer einzelnen Datei)
+        year (int): Jahr laut Dateiname (None bei mehreren Jahren in einer Datei)
+        key (str): Eindeutiger Schlüssel für das Manifest ("archiv.zip!csv/datei.csv")
+    """
+
+    def __init__(self, path, member=None, year=None):
+        self.path = path
+        self.member = member
+        self.year = year
+        self.key = f"{path}!{member}" if member else path
+
+    @property
+    def name(self):
+        """Dateiname ohne Verzeichnis (im Archiv: Name des Eintrags)."""
+        return os.path.basename(self.member or self.path)
+
+    @property
+    def compression(self):
+        """"gzip", "zstd" oder None (ZIP-Archive zählen nicht, sie haben Einträge)."""
+        return KOMPRESSION.get(os.path.splitext(self.name)[1].lower())
+
+    @contextlib.contextmanager
+    def open(self):
+        """
+        Öffnet die Quelle als gepufferten Binär-Datenstrom (entpackt beim Lesen).
+
+        Beispiel:
+            with source.open() as stream:
+                df = pd.read_csv(stream, sep=";")
+        """
+        with contextlib.ExitStack() as stack:
+            if self.member:
+                archiv = stack.enter_context(zipfile.ZipFile(self.path))
+                stream = stack.enter_context(archiv.open(self.member))
+            else:
+                stream = stack.enter_context(open(self.path, "rb"))
+
+            if self.compression == "gzip":
+                stream = stack.enter_context(gzip.GzipFile(fileobj=stream))
+            elif self.compression == "zstd":
+                stream = stack.enter_context(_zstd_reader(stream))
+            yield io.BufferedReader(stream, buffer_size=PUFFER)
+
+    def __repr__(self):
+        return f"Source({self.key!r}, year={self.year})"
+
+
+def _zstd_reader(stream):
+    """Entpackt einen Zstandard-Datenstrom (Python 3.14+ oder Paket "zstandard")."""
+    try:
+        from compression import zstd
+        return zstd.ZstdFile(stream)
+    except ImportError:
+        pass
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("Für .zst-Dateien wird das Paket 'zstandard' benötigt "
+                          "(pip install zstandard)") from None
+    return zstandard.ZstdDecompressor().stream_reader(stream)
+
+
+def _einordnen(path, member=None):
+    """Erstellt eine Source, falls der Name eine Unfallorte-CSV beschreibt (sonst None)."""
+    name = os.path.basename(member or path)
+    stamm, endung = os.path.splitext(name)
+    if endung.lower() in KOMPRESSION:
+        name = stamm
+
+    treffer = _JAHRESDATEI.match(name)
+    if treffer:
+        return Source(path, member, int(treffer.group(1)))
+    if _MEHRJAHRESDATEI.match(name):
+        return Source(path, member)
+    return None
+
+
+def discover(raw_dir):
+    """
+    Findet alle Rohdaten-Quellen in raw_dir (nicht rekursiv, ZIP-Archive mit Inhalt).
+
+    Gibt es ein Jahr mehrfach (z. B. .csv und .csv.gz), wird die unkomprimierte
+    Datei verwendet, danach gzip, zstd und zuletzt ZIP-Archive. Jahre mit
+    eigener Datei werden aus Mehrjahresdateien nicht übernommen.
+
+    Returns:
+        dict: {'years': {Jahr: Source}, 'multi': [Source]}
+    """
+    gefunden = []
+    if os.path.isdir(raw_dir):
+        for name in sorted(os.listdir(raw_dir)):
+            path = os.path.join(raw_dir, name)
+            if not os.path.isfile(path):
+                continue
+            if name.lower().endswith(".zip"):
+                with zipfile.ZipFile(path) as archiv:
+                    eintraege = [info.filename for info in archiv.infolist() if not info.is_dir()]
+                gefunden.extend(_einordnen(path, member) for member in eintraege)
+            else:
+                gefunden.append(_einordnen(path))
+
+    jahre, mehrjahr = {}, []
+    for source in gefunden:
+        if source is None:
+            continue
+        if source.year is None:
+            mehrjahr.append(source)
+            continue
+        rang = (source.member is not None, _RANG[source.compression])
+        bisher = jahre.get(source.year)
+        if bisher is None or rang < (bisher.member is not None, _RANG[bisher.compression]):
+            jahre[source.year] = source
+    return {"years": dict(sorted(jahre.items())), "multi": mehrjahr}
+
+
+def year_source(raw_dir, year):
+    """Quelle eines einzelnen Jahres (None, wenn es keine Jahresdatei gibt)."""
+    return discover(raw_dir)["years"].get(int(year))
@@ -0,0 +1,261 @@
+"""
+Modul für den lokalen Kachel-Cache der Basiskarte (OpenStreetMap als MBTiles).
+
+Die QGIS-Skripte laden die Basiskarte sonst bei jedem Start von
+tile.openstreetmap.org – langsam und auf Rechnern ohne Internet gar nicht.
+seed_tiles lädt einmal alle Kacheln für die Ausdehnung der Stadtbezirke und
+die gewünschten Zoomstufen und speichert sie in einer MBTiles-Datei (SQLite,
+Spezifikation 1.3). qgis_uri liefert dann die Quelle für QgsRasterLayer: die
+lokale Datei, falls vorhanden, sonst wie bisher den Online-Dienst.
+
+Die Kachel-URL ist frei wählbar ({z}/{x}/{y} werden ersetzt), z. B. ein
+eigener Kachelserver, ein lokaler Testserver (python -m http.server) oder
+ein Verzeichnis mit file:///pfad/{z}/{x}/{y}.png. Bereits gespeicherte
+Kacheln werden beim nächsten Lauf übersprungen; wechselt die URL, beginnt
+der Cache neu.
+
+Die Nutzungsbedingungen von tile.openstreetmap.org verbieten, für die
+Offline-Nutzung mehr als 250 Kacheln ab Zoomstufe 13 zu laden. Für höhere
+Zoomstufen muss daher ein anderer Kachelserver angegeben werden.
+
+Das Modul kommt ohne pandas & Co. aus; geopandas wird nur zum Lesen der
+Bezirksgrenzen in seed_tiles geladen.
+"""
+import math
+import os
+import sqlite3
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import metrics
+
+BASEMAP_NAME = "OpenStreetMap_Leipzig.mbtiles"
+
+# Online-Quelle der QGIS-Skripte (ohne lokalen Cache) und Standard-URL zum Befüllen
+OSM_URI = "type=xyz&url=https://tile.openstreetmap.org/{z}/{x}/{y}.png&zmax=19&zmin=0"
+TILE_URL = "https://tile.openstreetmap.org/{z}/{x}/{y}.png"
+ATTRIBUTION = "© OpenStreetMap-Mitwirkende"
+
+# Zoomstufen: 10 zeigt ganz Leipzig; darüber hinaus vergrößert QGIS die Kacheln
+MIN_ZOOM = 10
+MAX_ZOOM = 13
+
+# Rand um die Stadtbezirke in Grad (damit die Karte am Stadtrand nicht abbricht)
+RAND = 0.01
+
+# Gleichzeitige Downloads, Zeitlimit und Versuche je Kachel
+THREADS = 2
+TIMEOUT = 30
+VERSUCHE = 3
+
+USER_AGENT = "unfalldaten-leipzig/1.0 (Kachel-Cache fuer QGIS)"
+
+# Grenze der OSM-Nutzungsbedingungen: höchstens 250 Kacheln ab Zoomstufe 13
+OSM_HOST = "tile.openstreetmap.org"
+OSM_GRENZE = 250
+OSM_GRENZE_ZOOM = 13
+
+# Nach so vielen Kacheln wird in die Datei geschrieben (Abbruch verliert wenig)
+COMMIT_ALLE = 200
+
+
+def basemap_path(processed_dir):
+    """Pfad der MBTiles-Datei der Basiskarte (neben den Vektorkacheln)."""
+    return os.path.join(processed_dir, "tiles", BASEMAP_NAME)
+
+
+def qgis_uri(path=None):
+    """
+    Quelle der Basiskarte für QgsRasterLayer(uri, "OpenStreetMap", "wms").
+
+    Args:
+        path (str): MBTiles-Datei des Caches (optional)
+
+    Returns:
+        str: Lokale MBTiles-Datei, falls vorhanden, sonst OSM_URI
+    """
+    if path and os.path.isfile(path):
+        # Schrägstriche auch unter Windows: der Pfad steht in einem Python-String
+        return "type=mbtiles&url=" + Path(os.path.abspath(path)).as_posix()
+    return OSM_URI
+
+
+def _kachel(lon, lat, zoom):
+    """XYZ-Kachel (Spalte, Zeile von oben) eines Punktes in Grad."""
+    n = 2 ** zoom
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tile_range(bounds, min_zoom=MIN_ZOOM, max_zoom=MAX_ZOOM):
+    """
+    Alle XYZ-Kacheln, die eine Ausdehnung abdecken.
+
+    Args:
+        bounds (tuple): (west, süd, ost, nord) in Grad
+
+    Returns:
+        list: (zoom, x, y) je Kachel, nach Zoomstufe sortiert
+    """
+    west, sued, ost, nord = bounds
+    kacheln = []
+    for zoom in range(min_zoom, max_zoom + 1):
+        x0, y0 = _kachel(west, nord, zoom)
+        x1, y1 = _kachel(ost, sued, zoom)
+        kacheln.extend((zoom, x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1))
+    return kacheln
+
+
+def _bounds(bezirke_file):
+    """Ausdehnung der Stadtbezirke in Grad (mit RAND)."""
+    import geopandas as gpd
+
+    west, sued, ost, nord = gpd.read_file(bezirke_file).to_crs(epsg=4326).total_bounds
+    return west - RAND, sued - RAND, ost + RAND, nord + RAND
+
+
+def _osm_pruefen(url, kacheln):
+    """Bricht ab, wenn die Auswahl die Nutzungsbedingungen von tile.openstreetmap.org verletzt."""
+    host = urllib.parse.urlparse(url).hostname or ""
+    if host != OSM_HOST and not host.endswith("." + OSM_HOST):
+        return
+    anzahl = sum(1 for zoom, _, _ in kacheln if zoom >= OSM_GRENZE_ZOOM)
+    if anzahl > OSM_GRENZE:
+        raise ValueError(
+            f"{anzahl} Kacheln ab Zoomstufe {OSM_GRENZE_ZOOM} von {OSM_HOST} – die Nutzungsbedingungen "
+            f"erlauben höchstens {OSM_GRENZE}. Kleinere Zoomstufe wählen oder einen eigenen "
+            f"Kachelserver angeben (--tile-url)."
+        )
+
+
+def _laden(url):
+    """Lädt eine Kachel (mehrere Versuche bei Netzwerkfehlern und Serverfehlern)."""
+    anfrage = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
+    for versuch in range(1, VERSUCHE + 1):
+        try:
+            with urllib.request.urlopen(anfrage, timeout=TIMEOUT) as antwort:
+                return antwort.read()
+        except urllib.error.HTTPError as e:
+            # Fehlende Kachel oder Zugriff verweigert: erneut versuchen hilft nicht
+            if (e.code < 500 and e.code != 429) or versuch == VERSUCHE:
+                raise
+        except (urllib.error.URLError, TimeoutError):
+            if versuch == VERSUCHE:
+                raise
+        time.sleep(versuch)
+
+
+def _oeffnen(path, url):
+    """
+    Öffnet die MBTiles-Datei (legt sie an; bei anderer Kachel-URL neu).
+
+    Returns:
+        tuple: (Verbindung, Menge der vorhandenen Kacheln als (zoom, x, y))
+    """
+    if os.path.isfile(path):
+        db = sqlite3.connect(path)
+        zeile = db.execute("SELECT value FROM metadata WHERE name = 'source'").fetchone()
+        if zeile and zeile[0] == url:
+            vorhanden = {(zoom, x, 2 ** zoom - 1 - reihe) for zoom, x, reihe
+                         in db.execute("SELECT zoom_level, tile_column, tile_row FROM tiles")}
+            return db, vorhanden
+        db.close()
+        os.remove(path)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE metadata (name TEXT, value TEXT)")
+    db.execute("CREATE TABLE tiles (zoom_level INTEGER, tile_column INTEGER, "
+               "tile_row INTEGER, tile_data BLOB)")
+    db.execute("CREATE UNIQUE INDEX tile_index ON tiles (zoom_level, tile_column, tile_row)")
+    return db, set()
+
+
+def _metadaten(db, url, bounds, min_zoom, max_zoom):
+    """Schreibt die Metadaten (Zoomstufen und Ausdehnung des gesamten Caches)."""
+    zoom_min, zoom_max = db.execute("SELECT MIN(zoom_level), MAX(zoom_level) FROM tiles").fetchone()
+    zoom_min = min_zoom if zoom_min is None else min(zoom_min, min_zoom)
+    zoom_max = max_zoom if zoom_max is None else max(zoom_max, max_zoom)
+    west, sued, ost, nord = bounds
+    endung = os.path.splitext(urllib.parse.urlparse(url).path)[1].lower().lstrip(".")
+
+    metadata = {
+        "name": "OpenStreetMap Leipzig",
+        "format": "jpg" if endung in ("jpg", "jpeg") else "png",
+        "type": "baselayer",
+        "version": "1",
+        "minzoom": str(zoom_min),
+        "maxzoom": str(zoom_max),
+        "bounds": f"{west:.6f},{sued:.6f},{ost:.6f},{nord:.6f}",
+        "center": f"{(west + ost) / 2:.6f},{(sued + nord) / 2:.6f},{zoom_min + 2}",
+        "attribution": ATTRIBUTION,
+        "source": url,
+    }
+    db.execute("DELETE FROM metadata")
+    db.executemany("INSERT INTO metadata VALUES (?, ?)", metadata.items())
+
+
+def seed_tiles(bezirke_file, processed_dir, url=TILE_URL, min_zoom=MIN_ZOOM, max_zoom=MAX_ZOOM,
+               threads=THREADS):
+    """
+    Lädt die Kacheln der Basiskarte für die Stadtbezirke in den lokalen Cache.
+
+    Args:
+        bezirke_file (str): GeoJSON-Datei der Stadtbezirke (bestimmt die Ausdehnung)
+        processed_dir (str): Verzeichnis der verarbeiteten Daten
+        url (str): Kachel-URL mit {z}, {x} und {y} (http(s):// oder file://)
+        min_zoom (int): Kleinste Zoomstufe
+        max_zoom (int): Größte Zoomstufe
+        threads (int): Gleichzeitige Downloads
+
+    Returns:
+        dict: {'path', 'tiles' (insgesamt), 'cached' (schon vorhanden),
+               'downloaded', 'failed' (Liste von (zoom, x, y, Fehler))}
+    """
+    if min_zoom > max_zoom:
+        raise ValueError(f"Kleinste Zoomstufe {min_zoom} ist größer als die größte ({max_zoom})")
+
+    bounds = _bounds(bezirke_file)
+    kacheln = tile_range(bounds, min_zoom, max_zoom)
+    _osm_pruefen(url, kacheln)
+
+    path = basemap_path(processed_dir)
+    with metrics.stage("seed_basemap", min_zoom=min_zoom, max_zoom=max_zoom) as schritt:
+        schritt.rows_in = len(kacheln)
+        db, vorhanden = _oeffnen(path, url)
+        fehlend = [kachel for kachel in kacheln if kachel not in vorhanden]
+        geladen, fehler = 0, []
+
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, threads)) as pool:
+                auftraege = {pool.submit(_laden, url.format(z=zoom, x=x, y=y)): (zoom, x, y)
+                             for zoom, x, y in fehlend}
+                for auftrag in as_completed(auftraege):
+                    zoom, x, y = auftraege[auftrag]
+                    try:
+                        daten = auftrag.result()
+                    except (urllib.error.URLError, OSError) as e:
+                        fehler.append((zoom, x, y, str(e)))
+                        continue
+                    # MBTiles zählt die Zeilen von unten (TMS), die Kacheln von oben (XYZ)
+                    db.execute("INSERT OR REPLACE INTO tiles VALUES (?, ?, ?, ?)",
+                               (zoom, x, 2 ** zoom - 1 - y, sqlite3.Binary(daten)))
+                    geladen += 1
+                    schritt.bytes_read += len(daten)
+                    if geladen % COMMIT_ALLE == 0:
+                        db.commit()
+        finally:
+            _metadaten(db, url, bounds, min_zoom, max_zoom)
+            db.commit()
+            db.close()
+
+        schritt.rows_out = geladen
+        schritt.wrote(path)
+
+    return {"path": path, "tiles": len(kacheln), "cached": len(kacheln) - len(fehlend),
+            "downloaded": geladen, "failed": fehler}
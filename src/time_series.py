@@ -0,0 +1,263 @@
+"""
+Modul für Zeitreihen der Unfallzahlen (Monat, Wochentag, Stunde).
+
+Aus dem Unfallwürfel (siehe aggregate_cube) wird mit np.bincount ein dichtes
+Array der Unfallzahlen aufgebaut, Achsen siehe ACHSEN:
+
+    zaehlungen["counts"][art, bezirk, jahr, monat, wochentag, stunde]
+
+Leere Kombinationen sind 0, fehlende Monate entstehen also nicht. Jahre
+zwischen dem ersten und letzten Jahr, die im Würfel fehlen (keine Rohdaten),
+sind NaN statt 0 ("vorhanden" markiert die übrigen), damit gleitende
+Mittelwerte und Vorjahresvergleiche nicht mit erfundenen Nullen rechnen
+(sie sind dort ebenfalls NaN). Alle Funktionen rechnen entlang der letzten
+Achse und damit für alle Stadtbezirke und Verkehrsmittel in einem Aufruf:
+
+    zaehlungen = build_counts(cube)
+    reihen = monthly(zaehlungen)               # (Art, Bezirk, Jahre * 12)
+    mittel = rolling_mean(reihen, 12)          # gleitender Jahresmittelwert
+    delta, prozent = year_over_year(reihen)    # Veränderung zum Vorjahresmonat
+    zerlegung = decompose(reihen)              # Trend, Saison, Rest
+
+plot_small_multiples zeichnet die Monatsreihen aller Stadtbezirke in einer
+Abbildung (matplotlib wird erst dort geladen).
+"""
+import warnings
+
+import numpy as np
+
+from constants import VERKEHRSMITTEL, stadtteile
+
+# Arten der Zählung: alle Unfälle bzw. Unfälle mit Beteiligung des Verkehrsmittels
+ARTEN = {"Gesamt": "ANZAHL", **VERKEHRSMITTEL}
+
+# Achsen des Arrays counts und ihre Länge (Jahre je nach Daten)
+ACHSEN = ["Art", "Name", "UJAHR", "UMONAT", "UWOCHENTAG", "USTUNDE"]
+MONATE, WOCHENTAGE, STUNDEN = 12, 7, 24
+
+
+def _bezirk_codes(namen, bezirke):
+    """Position jedes Stadtbezirks in `bezirke` (-1 für unbekannte Namen)."""
+    import pandas as pd
+
+    return np.asarray(pd.Categorical(namen, categories=bezirke).codes, dtype=np.int64)
+
+
+def build_counts(cube):
+    """
+    Baut das dichte Array der Unfallzahlen aus dem Würfel (vektorisiert mit np.bincount).
+
+    Args:
+        cube (pd.DataFrame): Unfallwürfel (ANZAHL und Ist*-Summen je Zelle)
+
+    Returns:
+        dict: {'counts': np.ndarray mit den Achsen ACHSEN, 'arten': [...],
+               'bezirke': [...], 'jahre': np.ndarray, 'vorhanden': np.ndarray
+               (bool je Jahr: im Würfel enthalten, sonst counts NaN)}
+    """
+    bezirke = list(stadtteile)
+    # Codes als Gleitkommazahlen: fehlende Codes (NA) werden NaN und fallen unten heraus
+    jahr, monat, wochentag, stunde = (cube[spalte].to_numpy(dtype=np.float64, na_value=np.nan)
+                                      for spalte in ["UJAHR", "UMONAT", "UWOCHENTAG", "USTUNDE"])
+    bekannt = jahr[np.isfinite(jahr)]
+    jahre = np.arange(int(bekannt.min()), int(bekannt.max()) + 1) if len(bekannt) else np.arange(0)
+
+    bezirk = _bezirk_codes(cube["Name"], bezirke)
+    jahr = jahr - (jahre[0] if len(jahre) else 0)
+    monat = monat - 1
+    wochentag = wochentag - 1
+
+    # Zellen ohne Stadtbezirk oder mit fehlenden bzw. ungültigen Codes zählen nicht mit
+    # (Vergleiche mit NaN sind falsch); erst danach in Ganzzahlen umwandeln
+    gueltig = ((bezirk >= 0) & np.isfinite(jahr) & (monat >= 0) & (monat < MONATE) & (wochentag >= 0)
+               & (wochentag < WOCHENTAGE) & (stunde >= 0) & (stunde < STUNDEN))
+    form = (len(bezirke), len(jahre), MONATE, WOCHENTAGE, STUNDEN)
+    index = np.ravel_multi_index(tuple(achse[gueltig].astype(np.int64)
+                                       for achse in (bezirk, jahr, monat, wochentag, stunde)), form)
+
+    counts = np.stack([
+        np.bincount(index, weights=cube[spalte].to_numpy(dtype=np.float64)[gueltig],
+                    minlength=int(np.prod(form)))
+        for spalte in ARTEN.values()
+    ]).reshape((len(ARTEN),) + form)
+
+    # Jahre ohne Daten sind unbekannt, nicht unfallfrei
+    vorhanden = np.isin(jahre, bekannt)
+    counts[:, :, ~vorhanden] = np.nan
+
+    return {"counts": counts, "arten": list(ARTEN), "bezirke": bezirke, "jahre": jahre,
+            "vorhanden": vorhanden}
+
+
+def select(zaehlungen, bezirk=None, art="Gesamt"):
+    """
+    Zählungen eines Stadtbezirks (None = ganz Leipzig) und einer Art.
+
+    Returns:
+        np.ndarray: Achsen UJAHR, UMONAT, UWOCHENTAG, USTUNDE
+    """
+    counts = zaehlungen["counts"][zaehlungen["arten"].index(art)]
+    if bezirk is None:
+        return counts.sum(axis=0)
+    return counts[zaehlungen["bezirke"].index(bezirk)]
+
+
+def monthly(zaehlungen):
+    """
+    Unfälle je Monat für alle Arten und Stadtbezirke.
+
+    Returns:
+        np.ndarray: (Art, Bezirk, Jahre * 12), chronologisch
+    """
+    counts = zaehlungen["counts"]
+    return counts.sum(axis=(4, 5)).reshape(counts.shape[0], counts.shape[1], -1)
+
+
+def weekly_profile(zaehlungen):
+    """
+    Wochenprofil: Unfälle je Wochenstunde (UWOCHENTAG 1 = Sonntag 0 Uhr bis 7 = Samstag 23 Uhr) je Jahr.
+
+    Returns:
+        np.ndarray: (Art, Bezirk, Jahr, 7 * 24)
+    """
+    counts = zaehlungen["counts"]
+    return counts.sum(axis=3).reshape(counts.shape[:3] + (WOCHENTAGE * STUNDEN,))
+
+
+def month_axis(zaehlungen):
+    """Zeitpunkte der Monatsreihen als Dezimaljahre (z. B. 2016.0, 2016.083, ...)."""
+    return np.repeat(zaehlungen["jahre"], MONATE) + np.tile(np.arange(MONATE) / MONATE,
+                                                            len(zaehlungen["jahre"]))
+
+
+def rolling_mean(reihen, fenster=12):
+    """
+    Gleitender Mittelwert über die letzten `fenster` Werte (entlang der letzten Achse).
+
+    Die ersten fenster - 1 Werte sind NaN, damit das Ergebnis so lang ist wie die Reihe,
+    ebenso jedes Fenster mit einem fehlenden Wert (NaN, z. B. Jahre ohne Daten).
+    """
+    reihen = np.asarray(reihen, dtype=np.float64)
+    ergebnis = np.full(reihen.shape, np.nan)
+    if reihen.shape[-1] < fenster:
+        return ergebnis
+    # Summen und Anzahl fehlender Werte getrennt kumulieren (NaN würde sonst alle
+    # folgenden Fenster verderben)
+    fehlt = np.isnan(reihen)
+    null = np.zeros(reihen.shape[:-1] + (1,))
+    summen = np.concatenate([null, np.cumsum(np.where(fehlt, 0.0, reihen), axis=-1)], axis=-1)
+    luecken = np.concatenate([null, np.cumsum(fehlt, axis=-1)], axis=-1)
+    mittel = (summen[..., fenster:] - summen[..., :-fenster]) / fenster
+    vollstaendig = luecken[..., fenster:] == luecken[..., :-fenster]
+    ergebnis[..., fenster - 1:] = np.where(vollstaendig, mittel, np.nan)
+    return ergebnis
+
+
+def year_over_year(reihen, periode=MONATE):
+    """
+    Veränderung gegenüber derselben Periode des Vorjahres (entlang der letzten Achse).
+
+    Returns:
+        tuple: (Differenz, Veränderung in %) – im ersten Jahr und neben Jahren
+            ohne Daten NaN, in % auch bei 0 Unfällen im Vorjahr
+    """
+    reihen = np.asarray(reihen, dtype=np.float64)
+    delta = np.full(reihen.shape, np.nan)
+    prozent = np.full(reihen.shape, np.nan)
+    vorjahr = reihen[..., :-periode]
+    delta[..., periode:] = reihen[..., periode:] - vorjahr
+    with np.errstate(divide="ignore", invalid="ignore"):
+        prozent[..., periode:] = np.where(vorjahr > 0, delta[..., periode:] / vorjahr * 100, np.nan)
+    return delta, prozent
+
+
+def _zentrierter_mittelwert(reihen, periode):
+    """Zentrierter gleitender Mittelwert (bei gerader Periode 2×periode, wie bei der klassischen Zerlegung)."""
+    if periode % 2 == 0:
+        gewichte = np.r_[0.5, np.ones(periode - 1), 0.5] / periode
+    else:
+        gewichte = np.ones(periode) / periode
+    halb = len(gewichte) // 2
+
+    trend = np.full(reihen.shape, np.nan)
+    if reihen.shape[-1] >= len(gewichte):
+        fenster = np.lib.stride_tricks.sliding_window_view(reihen, len(gewichte), axis=-1)
+        trend[..., halb:reihen.shape[-1] - halb] = fenster @ gewichte
+    return trend
+
+
+def decompose(reihen, periode=MONATE):
+    """
+    Klassische additive Zerlegung in Trend, Saison und Rest (entlang der letzten Achse).
+
+    Trend = zentrierter gleitender Mittelwert über eine Periode, Saison =
+    mittlere Abweichung vom Trend je Monat (summiert sich über eine Periode
+    zu 0), Rest = Reihe - Trend - Saison. Am Anfang und Ende fehlt der Trend
+    für eine halbe Periode (NaN).
+
+    Args:
+        reihen (np.ndarray): Reihen, Länge ein Vielfaches von `periode`
+        periode (int): Länge eines Zyklus (12 für Monatsreihen)
+
+    Returns:
+        dict: {'trend', 'saison', 'rest'} jeweils in der Form von `reihen`
+    """
+    reihen = np.asarray(reihen, dtype=np.float64)
+    if reihen.shape[-1] % periode:
+        raise ValueError(f"Reihenlänge {reihen.shape[-1]} ist kein Vielfaches von {periode}")
+
+    trend = _zentrierter_mittelwert(reihen, periode)
+    zyklen = (reihen - trend).reshape(reihen.shape[:-1] + (-1, periode))
+    with warnings.catch_warnings():
+        # Monate, für die in keinem Jahr ein Trend vorliegt (sehr kurze Reihen)
+        warnings.simplefilter("ignore", RuntimeWarning)
+        saison = np.nanmean(zyklen, axis=-2)
+    saison = np.nan_to_num(saison - saison.mean(axis=-1, keepdims=True))
+    saison = np.tile(saison, reihen.shape[-1] // periode)
+    return {"trend": trend, "saison": saison, "rest": reihen - trend - saison}
+
+
+def plot_small_multiples(zaehlungen, art="Gesamt", fenster=12, path=None):
+    """
+    Zeichnet die Monatsreihen aller Stadtbezirke als kleine Diagramme in einer
+    Abbildung: Unfälle je Monat, gleitender Mittelwert und Trend.
+
+    Args:
+        zaehlungen (dict): Ergebnis von build_counts
+        art (str): Art aus ARTEN ("Gesamt" oder ein Verkehrsmittel)
+        fenster (int): Fenster des gleitenden Mittelwerts in Monaten
+        path (str): Abbildung zusätzlich als Datei speichern (optional)
+
+    Returns:
+        matplotlib.figure.Figure
+    """
+    import matplotlib.pyplot as plt
+
+    reihen = monthly(zaehlungen)[zaehlungen["arten"].index(art)]
+    mittel = rolling_mean(reihen, fenster)
+    trend = decompose(reihen)["trend"] if reihen.shape[-1] else reihen
+    x = month_axis(zaehlungen)
+
+    spalten = 5
+    zeilen = -(-len(zaehlungen["bezirke"]) // spalten)
+    fig, achsen = plt.subplots(zeilen, spalten, figsize=(3.2 * spalten, 2.6 * zeilen),
+                               sharex=True, sharey=True, squeeze=False)
+    for i, ax in enumerate(achsen.flat):
+        if i >= len(zaehlungen["bezirke"]):
+            ax.set_visible(False)
+            continue
+        ax.plot(x, reihen[i], color="0.75", linewidth=0.8, label="je Monat")
+        ax.plot(x, mittel[i], color="tab:blue", linewidth=1.5, label=f"Mittel {fenster} Monate")
+        ax.plot(x, trend[i], color="tab:red", linewidth=1, linestyle="--", label="Trend")
+        ax.set_title(zaehlungen["bezirke"][i], fontsize=10)
+        ax.grid(True, alpha=0.3)
+
+    achsen.flat[0].legend(fontsize=7, loc="upper left")
+    titel = "Unfälle je Monat" if art == "Gesamt" else f"Unfälle je Monat mit Beteiligung {art}"
+    if len(zaehlungen["jahre"]):
+        titel += f" ({zaehlungen['jahre'][0]}–{zaehlungen['jahre'][-1]})"
+    fig.suptitle(titel)
+    fig.tight_layout()
+    if path:
+        fig.savefig(path, dpi=150)
+    return fig
@@ -0,0 +1,287 @@
+"""
+Modul für die Vektorkacheln (MBTiles) der Unfallpunkte.
+
+Alle Jahre werden in eine einzige Kachelpyramide (Web Mercator, Mapbox Vector
+Tiles) geschrieben, die QGIS als einen Layer lädt. Auf den kleinen Zoomstufen
+werden nahe beieinander liegende Unfälle eines Jahres zu einem Punkt mit der
+Anzahl ("ANZAHL") zusammengefasst, erst auf der höchsten Zoomstufe liegt jeder
+Unfall einzeln vor. So muss QGIS nie alle Punkte auf einmal zeichnen.
+
+Die Kacheln werden ohne zusätzliche Abhängigkeiten kodiert (Protobuf von Hand,
+gzip-komprimiert, Speicherung in SQLite nach der MBTiles-Spezifikation 1.3).
+"""
+import gzip
+import json
+import math
+import os
+import sqlite3
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+TILES_NAME = "Unfaelle_Leipzig.mbtiles"
+LAYER_NAME = "unfaelle"
+
+# Zoomstufen: 10 zeigt ganz Leipzig, ab 16 wird jeder Unfall einzeln gezeigt
+MIN_ZOOM = 10
+MAX_ZOOM = 16
+
+# Kachelauflösung, Rastergröße für das Zusammenfassen und Randbereich (in Kacheleinheiten)
+EXTENT = 4096
+ZELLE = 256
+PUFFER = 64
+
+# Attribute der Punkte (alle als vorzeichenlose Ganzzahlen kodiert)
+ATTRIBUTE = ["UJAHR", "ANZAHL", "UKATEGORIE"]
+
+# Halbe Breite der Web-Mercator-Welt in Metern
+_HALBE_WELT = 20037508.342789244
+
+
+def tiles_path(processed_dir):
+    """Pfad der MBTiles-Datei."""
+    return os.path.join(processed_dir, "tiles", TILES_NAME)
+
+
+# ------------------------------------------
+# Protobuf-Kodierung (Mapbox Vector Tile 2.1)
+# ------------------------------------------
+
+def _varint(wert):
+    """Kodiert eine nicht-negative Ganzzahl als Protobuf-Varint."""
+    teile = bytearray()
+    while wert > 0x7F:
+        teile.append((wert & 0x7F) | 0x80)
+        wert >>= 7
+    teile.append(wert)
+    return bytes(teile)
+
+
+def _feld(nummer, daten):
+    """Längenbegrenztes Protobuf-Feld (wire type 2)."""
+    return _varint((nummer << 3) | 2) + _varint(len(daten)) + daten
+
+
+def _zigzag(wert):
+    """ZigZag-Kodierung für vorzeichenbehaftete Koordinaten."""
+    return (wert << 1) ^ (wert >> 63)
+
+
+def _encode_layer(lx, ly, attribute):
+    """
+    Kodiert die Punkte einer Kachel als MVT-Layer.
+
+    Args:
+        lx, ly (np.ndarray): Koordinaten innerhalb der Kachel (0..EXTENT)
+        attribute (dict): Attributname -> np.ndarray mit Ganzzahlen
+
+    Returns:
+        bytes: Layer-Nachricht
+    """
+    werte = {}
+    features = []
+    spalten = [attribute[name].tolist() for name in ATTRIBUTE]
+
+    for i, (x, y) in enumerate(zip(lx.tolist(), ly.tolist())):
+        tags = bytearray()
+        for schluessel, spalte in enumerate(spalten):
+            tags += _varint(schluessel) + _varint(werte.setdefault(spalte[i], len(werte)))
+
+        # MoveTo (Befehl 1, einmal) mit den Koordinaten des Punkts
+        geometrie = _varint(9) + _varint(_zigzag(x)) + _varint(_zigzag(y))
+        feature = _feld(2, bytes(tags)) + b"\x18\x01" + _feld(4, geometrie)  # type = POINT
+        features.append(_feld(2, feature))
+
+    layer = bytearray(b"\x78\x02")  # version = 2
+    layer += _feld(1, LAYER_NAME.encode("utf-8"))
+    layer += b"".join(features)
+    for name in ATTRIBUTE:
+        layer += _feld(3, name.encode("utf-8"))
+    for wert in werte:
+        layer += _feld(4, b"\x28" + _varint(int(wert)))  # uint_value
+    layer += b"\x28" + _varint(EXTENT)
+    return bytes(layer)
+
+
+# ------------------------------------------
+# Kachelpyramide
+# ------------------------------------------
+
+def _punkte(frames):
+    """Sammelt Web-Mercator-Koordinaten und Attribute der Unfälle aller Jahre."""
+    teile = []
+    for gdf in frames:
+        geometrie = gdf.geometry.to_crs("EPSG:3857")
+        teile.append(pd.DataFrame({
+            "x": geometrie.x.to_numpy(),
+            "y": geometrie.y.to_numpy(),
+            "UJAHR": gdf["UJAHR"].to_numpy(dtype="float64", na_value=np.nan),
+            "UKATEGORIE": gdf["UKATEGORIE"].to_numpy(dtype="float64", na_value=np.nan),
+        }))
+    punkte = pd.concat(teile, ignore_index=True)
+    # Ohne Koordinaten, Jahr oder Unfallkategorie (NA-Code) lässt sich kein Punkt zeichnen
+    punkte = punkte[np.isfinite(punkte).all(axis=1)]
+    return punkte.astype({"UJAHR": np.int64, "UKATEGORIE": np.int64})
+
+
+def _zoomstufe(punkte, zoom, max_zoom):
+    """
+    Punkte einer Zoomstufe in Kacheleinheiten (1 = eine Kachel).
+
+    Unterhalb von max_zoom werden die Unfälle eines Jahres je Rasterzelle
+    zusammengefasst (Schwerpunkt, Anzahl und schwerste Unfallkategorie).
+    """
+    kachel = 2 * _HALBE_WELT / 2 ** zoom
+    df = pd.DataFrame({
+        "px": (punkte["x"].to_numpy() + _HALBE_WELT) / kachel,
+        "py": (_HALBE_WELT - punkte["y"].to_numpy()) / kachel,
+        "UJAHR": punkte["UJAHR"].to_numpy(),
+        "UKATEGORIE": punkte["UKATEGORIE"].to_numpy(),
+    })
+
+    if zoom >= max_zoom:
+        df["ANZAHL"] = 1
+        return df
+
+    df["cx"] = np.floor(df["px"] * (EXTENT // ZELLE)).astype(np.int64)
+    df["cy"] = np.floor(df["py"] * (EXTENT // ZELLE)).astype(np.int64)
+    return df.groupby(["cx", "cy", "UJAHR"], sort=False).agg(
+        px=("px", "mean"),
+        py=("py", "mean"),
+        ANZAHL=("px", "size"),
+        UKATEGORIE=("UKATEGORIE", "min"),
+    ).reset_index()
+
+
+def _kacheln(df, zoom):
+    """
+    Verteilt die Punkte auf die Kacheln einer Zoomstufe.
+
+    Punkte nahe am Kachelrand werden zusätzlich in die Nachbarkachel
+    übernommen (PUFFER), damit Symbole an den Rändern nicht abgeschnitten werden.
+
+    Yields:
+        tuple: (x, y, Layer-Nachricht) je Kachel
+    """
+    anzahl = 2 ** zoom
+    tx0 = np.floor(df["px"].to_numpy()).astype(np.int64)
+    ty0 = np.floor(df["py"].to_numpy()).astype(np.int64)
+
+    teile = []
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            tx, ty = tx0 + dx, ty0 + dy
+            lx = np.round((df["px"].to_numpy() - tx) * EXTENT).astype(np.int64)
+            ly = np.round((df["py"].to_numpy() - ty) * EXTENT).astype(np.int64)
+            maske = (
+                (lx >= -PUFFER) & (lx < EXTENT + PUFFER)
+                & (ly >= -PUFFER) & (ly < EXTENT + PUFFER)
+                & (tx >= 0) & (tx < anzahl) & (ty >= 0) & (ty < anzahl)
+            )
+            teil = df.loc[maske, ATTRIBUTE].copy()
+            teil["tx"], teil["ty"], teil["lx"], teil["ly"] = tx[maske], ty[maske], lx[maske], ly[maske]
+            teile.append(teil)
+
+    alle = pd.concat(teile, ignore_index=True)
+    for (tx, ty), kachel in alle.groupby(["tx", "ty"], sort=True):
+        attribute = {name: kachel[name].to_numpy(dtype=np.int64) for name in ATTRIBUTE}
+        yield tx, ty, _encode_layer(kachel["lx"].to_numpy(), kachel["ly"].to_numpy(), attribute)
+
+
+def _bounds_wgs84(punkte):
+    """Ausdehnung der Punkte als (west, süd, ost, nord) in Grad."""
+    def lon(x):
+        return x / _HALBE_WELT * 180.0
+
+    def lat(y):
+        return math.degrees(math.atan(math.sinh(y / _HALBE_WELT * math.pi)))
+
+    return (lon(punkte["x"].min()), lat(punkte["y"].min()),
+            lon(punkte["x"].max()), lat(punkte["y"].max()))
+
+
+def build_tiles(frames, processed_dir, min_zoom=MIN_ZOOM, max_zoom=MAX_ZOOM):
+    """
+    Erstellt die MBTiles-Datei aus den Unfällen aller Jahre.
+
+    Args:
+        frames (iterable): GeoDataFrames mit Unfällen (mit UJAHR und UKATEGORIE)
+        processed_dir (str): Verzeichnis der verarbeiteten Daten
+        min_zoom (int): Kleinste Zoomstufe
+        max_zoom (int): Größte Zoomstufe (Einzelpunkte)
+
+    Returns:
+        str: Pfad der MBTiles-Datei
+    """
+    punkte = _punkte(frames)
+    path = tiles_path(processed_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    # Erst in eine temporäre Datei schreiben, damit QGIS nie eine halbe Datei sieht
+    tmp_path = path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    west, sued, ost, nord = _bounds_wgs84(punkte)
+    metadata = {
+        "name": "Unfälle Leipzig",
+        "format": "pbf",
+        "type": "overlay",
+        "version": "1",
+        "minzoom": str(min_zoom),
+        "maxzoom": str(max_zoom),
+        "bounds": f"{west:.6f},{sued:.6f},{ost:.6f},{nord:.6f}",
+        "center": f"{(west + ost) / 2:.6f},{(sued + nord) / 2:.6f},{min_zoom + 2}",
+        "json": json.dumps({"vector_layers": [{
+            "id": LAYER_NAME,
+            "fields": {name: "Number" for name in ATTRIBUTE},
+            "minzoom": min_zoom,
+            "maxzoom": max_zoom,
+        }]}),
+    }
+
+    with sqlite3.connect(tmp_path) as db:
+        db.execute("CREATE TABLE metadata (name TEXT, value TEXT)")
+        db.execute("CREATE TABLE tiles (zoom_level INTEGER, tile_column INTEGER, "
+                   "tile_row INTEGER, tile_data BLOB)")
+        db.executemany("INSERT INTO metadata VALUES (?, ?)", metadata.items())
+
+        for zoom in range(min_zoom, max_zoom + 1):
+            df = _zoomstufe(punkte, zoom, max_zoom)
+            db.executemany(
+                "INSERT INTO tiles VALUES (?, ?, ?, ?)",
+                # MBTiles zählt die Zeilen von unten (TMS), die Kacheln von oben (XYZ)
+                ((zoom, int(tx), int(2 ** zoom - 1 - ty), gzip.compress(_feld(3, layer), mtime=0))
+                 for tx, ty, layer in _kacheln(df, zoom))
+            )
+
+        db.execute("CREATE UNIQUE INDEX tile_index ON tiles (zoom_level, tile_column, tile_row)")
+    db.close()
+
+    os.replace(tmp_path, path)
+    return path
+
+
+def tiles_extent(path):
+    """
+    Liest die Ausdehnung der Kacheln (Metadaten "bounds") in Web Mercator,
+    z. B. um in QGIS auf Leipzig zu zoomen.
+
+    Returns:
+        tuple: (xmin, ymin, xmax, ymax) in EPSG:3857
+    """
+    # Nur lesend öffnen (sqlite3 würde eine fehlende Datei sonst anlegen)
+    with sqlite3.connect(Path(os.path.abspath(path)).as_uri() + "?mode=ro", uri=True) as db:
+        (bounds,) = db.execute("SELECT value FROM metadata WHERE name = 'bounds'").fetchone()
+    db.close()
+
+    west, sued, ost, nord = (float(wert) for wert in bounds.split(","))
+
+    def x(lon):
+        return lon / 180.0 * _HALBE_WELT
+
+    def y(lat):
+        return math.log(math.tan(math.pi / 4 + math.radians(lat) / 2)) / math.pi * _HALBE_WELT
+
+    return x(west), y(sued), x(ost), y(nord)
@@ -4,7 +4,10 @@ import geopandas as gpd
 import os
 import platform
 import subprocess
-from typing import List, Dict
+from typing import List, Dict, Optional
+
+import tile_cache
+import vector_tiles
 
 def get_qgis_path() -> str:
     """
@@ -30,13 +33,16 @@ def get_qgis_path() -> str:
 
 QGIS_PATH = get_qgis_path()
 
-def create_qgis_script(geojson_files: List[Dict]) -> str:
+def create_qgis_script(geojson_files: List[Dict], basemap: Optional[str] = None) -> str:
     """
      Baut ein QGIS-Python-Skript als String, das:
       - OpenStreetMap als Basiskarte lädt
       - alle Unfall-Layer (GeoJSON) lädt
       - auf den ersten Layer (Leipzig) zoomt
 
+    Mit basemap (MBTiles-Datei aus tile_cache) kommt die Basiskarte aus dem
+    lokalen Kachel-Cache statt von tile.openstreetmap.org.
+
     Erwartete Struktur eines Eintrags in geojson_files:
         {
             "path": "/pfad/zu/Unfallorte2016_Leipzig.geojson",
@@ -49,8 +55,7 @@ def create_qgis_script(geojson_files: List[Dict]) -> str:
 from qgis.utils import iface
 
 # 1. OpenStreetMap-Basiskarte laden
-osm_url = "type=xyz&url=https://tile.openstreetmap.org/{z}/{x}/{y}.png&zmax=19&zmin=0"
-osm_layer = QgsRasterLayer(osm_url, "OpenStreetMap", "wms")
+""" + f'osm_url = "{tile_cache.qgis_uri(basemap)}"\n' + """osm_layer = QgsRasterLayer(osm_url, "OpenStreetMap", "wms")
 
 if osm_layer.isValid():
     QgsProject.instance().addMapLayer(osm_layer)
@@ -98,6 +103,115 @@ print("\\n✓ Alle Layer geladen!")
     return script
 
 
+def create_tiles_script(tiles_path: str, basemap: Optional[str] = None) -> str:
+    """
+    Baut ein QGIS-Python-Skript als String, das:
+      - OpenStreetMap als Basiskarte lädt
+      - alle Unfälle aus der Vektorkachel-Datei (MBTiles) als einen Layer lädt
+      - auf Leipzig zoomt
+
+    Auf kleinen Zoomstufen sind die Unfälle zusammengefasst; die Symbolgröße
+    richtet sich nach der Anzahl ("ANZAHL"), die Farbe nach dem Jahr ("UJAHR").
+    Die Basiskarte kommt wie bei create_qgis_script aus basemap, falls vorhanden.
+    """
+    safe_path = tiles_path.replace("\\", "\\\\")
+    xmin, ymin, xmax, ymax = vector_tiles.tiles_extent(tiles_path)
+
+    script = """from qgis.core import (QgsRasterLayer, QgsVectorTileLayer, QgsProject, QgsMarkerSymbol,
+                       QgsVectorTileBasicRenderer, QgsVectorTileBasicRendererStyle,
+                       QgsWkbTypes, QgsSymbolLayer, QgsProperty, QgsRectangle,
+                       QgsCoordinateReferenceSystem)
+from qgis.utils import iface
+
+# 1. OpenStreetMap-Basiskarte laden
+""" + f'osm_url = "{tile_cache.qgis_uri(basemap)}"\n' + """osm_layer = QgsRasterLayer(osm_url, "OpenStreetMap", "wms")
+
+if osm_layer.isValid():
+    QgsProject.instance().addMapLayer(osm_layer)
+    print("✓ OpenStreetMap geladen")
+else:
+    print("✗ OpenStreetMap-Fehler")
+
+"""
+    script += f"""# 2. Vektorkacheln (alle Jahre in einem Layer)
+tiles_path = "{safe_path}"
+extent = QgsRectangle({xmin}, {ymin}, {xmax}, {ymax})
+layer_name = "{vector_tiles.LAYER_NAME}"
+"""
+    script += """tiles_layer = QgsVectorTileLayer("type=mbtiles&url=" + tiles_path, "Unfälle (Vektorkacheln)")
+
+if tiles_layer.isValid():
+    symbol = QgsMarkerSymbol.createSimple({"color": "200,30,30,180", "outline_style": "no"})
+    # Zusammengefasste Punkte größer darstellen, Farbton je Jahr
+    symbol.symbolLayer(0).setDataDefinedProperty(
+        QgsSymbolLayer.PropertySize, QgsProperty.fromExpression('1.5 + sqrt("ANZAHL")'))
+    symbol.symbolLayer(0).setDataDefinedProperty(
+        QgsSymbolLayer.PropertyFillColor,
+        QgsProperty.fromExpression('color_hsva(("UJAHR" - 2016) * 35 % 360, 80, 85, 180)'))
+
+    style = QgsVectorTileBasicRendererStyle("Unfälle", layer_name, QgsWkbTypes.PointGeometry)
+    style.setSymbol(symbol)
+    renderer = QgsVectorTileBasicRenderer()
+    renderer.setStyles([style])
+    tiles_layer.setRenderer(renderer)
+
+    QgsProject.instance().addMapLayer(tiles_layer)
+    print("✓ Vektorkacheln geladen")
+else:
+    print("✗ Vektorkachel-Fehler:", tiles_path)
+
+# 3. Auf Leipzig zoomen
+canvas = iface.mapCanvas()
+canvas.setDestinationCrs(QgsCoordinateReferenceSystem("EPSG:3857"))
+canvas.setExtent(extent)
+canvas.refresh()
+print("✓ Gezoomt auf Leipzig")
+"""
+    return script
+
+
+def create_hotspots_script(hotspots_path: str) -> str:
+    """
+    Baut den Skriptteil, der die Unfallschwerpunkte (siehe hotspots.py) als
+    oberste Ebene lädt: Symbolgröße nach Anzahl, Farbe nach mittlerer Schwere,
+    Beschriftung mit dem Rang für die 20 größten Schwerpunkte.
+
+    Der Skriptteil importiert alles, was er braucht, und läuft daher hinter
+    create_qgis_script ebenso wie hinter create_tiles_script.
+    """
+    safe_path = hotspots_path.replace("\\", "\\\\")
+    script = f"""
+# Unfallschwerpunkte (Hotspots)
+hotspots_path = "{safe_path}"
+"""
+    script += """from qgis.core import (QgsVectorLayer, QgsProject, QgsMarkerSymbol, QgsSymbolLayer, QgsProperty,
+                       QgsSingleSymbolRenderer, QgsPalLayerSettings, QgsVectorLayerSimpleLabeling)
+
+hotspots_layer = QgsVectorLayer(hotspots_path, "Unfallschwerpunkte", "ogr")
+
+if hotspots_layer.isValid():
+    symbol = QgsMarkerSymbol.createSimple({"color": "255,140,0,200", "outline_color": "90,0,0"})
+    symbol.symbolLayer(0).setDataDefinedProperty(
+        QgsSymbolLayer.PropertySize, QgsProperty.fromExpression('2 + sqrt("ANZAHL")'))
+    symbol.symbolLayer(0).setDataDefinedProperty(
+        QgsSymbolLayer.PropertyFillColor,
+        QgsProperty.fromExpression('''ramp_color('Reds', scale_linear("SCHWERE" / "ANZAHL", 1, 4, 0.3, 1))'''))
+    hotspots_layer.setRenderer(QgsSingleSymbolRenderer(symbol))
+
+    beschriftung = QgsPalLayerSettings()
+    beschriftung.isExpression = True
+    beschriftung.fieldName = '''if("RANG" <= 20, to_string("RANG"), '')'''
+    hotspots_layer.setLabeling(QgsVectorLayerSimpleLabeling(beschriftung))
+    hotspots_layer.setLabelsEnabled(True)
+
+    QgsProject.instance().addMapLayer(hotspots_layer)
+    print("✓ Unfallschwerpunkte geladen:", hotspots_layer.featureCount())
+else:
+    print("✗ Hotspot-Fehler:", hotspots_path)
+"""
+    return script
+
+
 def _build_qgis_command(temp_script_path: str) -> List[str]:
     """
     Baut den passenden subprocess-Befehl für das aktuelle Betriebssystem,
@@ -121,24 +235,37 @@ def _build_qgis_command(temp_script_path: str) -> List[str]:
         raise OSError(f"Betriebssystem {system} nicht unterstützt")
 
 
-def visualize_in_qgis(geojson_files: List[Dict]) -> None:
+def visualize_in_qgis(geojson_files: List[Dict], tiles: Optional[str] = None,
+                      hotspots: Optional[str] = None, basemap: Optional[str] = None) -> None:
     """
     Öffnet QGIS mit:
-      - OpenStreetMap-Basiskarte
-      - allen übergebenen GeoJSON-Layern
+      - OpenStreetMap-Basiskarte (aus dem lokalen Kachel-Cache, falls vorhanden)
+      - den Vektorkacheln aller Jahre (ein Layer) oder, falls keine
+        Kacheln vorhanden sind, allen übergebenen GeoJSON-Layern
+      - den Unfallschwerpunkten darüber (falls übergeben)
 
     Parameter:
         geojson_files: Liste von Dicts mit mindestens:
             - "path": Pfad zur GeoJSON-Datei
             - "year": Jahr (int)
             - "count": Anzahl Unfälle (int)
+        tiles: Pfad zur MBTiles-Datei (optional)
+        hotspots: Pfad zur GeoJSON-Datei der Unfallschwerpunkte (optional)
+        basemap: Pfad zur MBTiles-Datei der Basiskarte (optional, siehe tile_cache)
     """
-    if not geojson_files:
+    if tiles and os.path.isfile(tiles):
+        qgis_script = create_tiles_script(os.path.abspath(tiles), basemap)
+        layer_count = 1
+    elif geojson_files:
+        qgis_script = create_qgis_script(geojson_files, basemap)
+        layer_count = len(geojson_files)
+    else:
         print("✗ Keine GeoJSON-Dateien übergeben – breche ab.")
         return
 
-    # QGIS-Python-Skript erzeugen
-    qgis_script = create_qgis_script(geojson_files)
+    if hotspots and os.path.isfile(hotspots):
+        qgis_script += create_hotspots_script(os.path.abspath(hotspots))
+        layer_count += 1
 
     # Temporäre Skript-Datei schreiben
     with tempfile.NamedTemporaryFile(
@@ -152,6 +279,6 @@ def visualize_in_qgis(geojson_files: List[Dict]) -> None:
 
     try:
         subprocess.run(cmd, check=False)
-        print(f"✓ QGIS geöffnet mit {len(geojson_files)} Layern")
+        print(f"✓ QGIS geöffnet mit {layer_count} Layern")
     except Exception as e:
         print(f"✗ Fehler beim Öffnen von QGIS: {e}")
\ No newline at end of file
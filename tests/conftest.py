@@ -0,0 +1,9 @@
+"""
+Gemeinsame Einstellungen der Tests.
+
+Die Module liegen flach in src/ und werden wie von main.py direkt importiert.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src"))
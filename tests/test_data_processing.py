@@ -0,0 +1,104 @@
+"""
+Tests für das typisierte Einlesen der Unfallatlas-CSVs: Dezimaltrennzeichen
+je Koordinatenspalte, nicht lesbare Koordinaten und leere Codes bis zum Export.
+"""
+import io
+import os
+
+import numpy as np
+
+import data_processing
+
+BEZIRKE = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir,
+                       "data", "raw", "Stadtbezirke_Leipzig_UTM33N.json")
+
+KOPF = "OBJECTID;UJAHR;UMONAT;IstRad;LINREFX;LINREFY;XGCSWGS84;YGCSWGS84"
+
+
+def _csv(tmp_path, *zeilen):
+    path = tmp_path / "Unfallorte2024_LinRef.csv"
+    path.write_text("\n".join((KOPF,) + zeilen) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def test_detect_decimals_per_column():
+    sample = KOPF + "\n1;2024;5;1;739010,28;5690524,81;12.437168;51.339411\n"
+    assert data_processing.detect_decimals(sample, ";") == {
+        "LINREFX": ",", "LINREFY": ",", "XGCSWGS84": ".", "YGCSWGS84": ".",
+    }
+
+
+def test_read_csv_typed_mixed_decimals(tmp_path):
+    # LINREFX/Y mit Komma, WGS84 mit Punkt; eine Koordinate ist nicht lesbar
+    path = _csv(
+        tmp_path,
+        "1;2024;5;1;739010,28;5690524,81;12.437168;51.339411",
+        "2;2024;6;0;739020,5;5690530,0;12.4373;51.3395",
+        "3;2024;7;0;739030,75;kaputt;12.4374;x.y",
+    )
+
+    for chunksize in (None, 2):
+        df = data_processing.read_csv_typed(path, chunksize=chunksize)
+
+        for spalte in data_processing.KOORDINATEN:
+            assert df[spalte].dtype == np.float64
+        np.testing.assert_allclose(df["LINREFX"], [739010.28, 739020.5, 739030.75])
+        np.testing.assert_allclose(df["XGCSWGS84"], [12.437168, 12.4373, 12.4374])
+        assert np.isnan(df["LINREFY"].iloc[2]) and np.isnan(df["YGCSWGS84"].iloc[2])
+        assert df["YGCSWGS84"].iloc[:2].tolist() == [51.339411, 51.3395]
+        assert df["UMONAT"].tolist() == [5, 6, 7]
+
+
+def test_read_csv_typed_stream(tmp_path):
+    # Datenstrom wie von Source.open, Koordinaten nur mit Komma
+    path = _csv(tmp_path, "1;2024;5;1;739010,28;5690524,81;12,437168;51,339411")
+    with open(path, "rb") as f:
+        df = data_processing.read_csv_typed(io.BufferedReader(f))
+    assert df["XGCSWGS84"].tolist() == [12.437168]
+    assert df["LINREFX"].tolist() == [739010.28]
+
+
+def test_blank_codes_export_end_to_end(tmp_path):
+    # Leere und ungültige Codes dürfen den Export nicht abbrechen (NA bis in Würfel,
+    # Punktspeicher, Schwerpunkte, Kacheln, Heatmaps und Zeitreihen)
+    import geopandas as gpd
+
+    import density
+    import export_handlers
+    import time_series
+
+    bezirke = gpd.read_file(BEZIRKE)
+    raw = tmp_path / "raw"
+    raw.mkdir()
+    kopf = "OBJECTID;UJAHR;UMONAT;USTUNDE;UWOCHENTAG;UKATEGORIE;IstRad;IstPKW;XGCSWGS84;YGCSWGS84"
+    (raw / "Unfallorte2024_LinRef.csv").write_text("\n".join([
+        kopf,
+        "1;2024;5;8;2;3;1;0;12,3731;51,3397",
+        "2;2024;;9;3;;0;1;12,3745;51,3401",
+        "3;2024;1,5;10;4;2;0;1;12,3760;51,3410",
+        "4;2024;7;11;5;3;1;1;12,3770;51,3420",
+    ]) + "\n", encoding="utf-8")
+
+    result = data_processing.process_year(2024, str(raw), bezirke)
+    assert result["count"] == 4
+    gdf = result["gdf_filtered"]
+    assert gdf["UMONAT"].isna().sum() == 2 and gdf["UKATEGORIE"].isna().sum() == 1
+
+    out = tmp_path / "processed"
+    for unterordner in ("csv", "geojson"):
+        (out / unterordner).mkdir(parents=True)
+    ergebnis = export_handlers.export_all(
+        [result], str(out), write_tiles=True,
+        heatmap_raster=density.raster_from_boundaries(bezirke, zelle=200),
+    )
+
+    wuerfel = ergebnis["cube_data"]
+    assert wuerfel["ANZAHL"].sum() == 4
+    assert wuerfel["UMONAT"].isna().sum() == 2
+    for pfad in (ergebnis["cube"], ergebnis["points"], ergebnis["hotspots"], ergebnis["tiles"],
+                 ergebnis["heatmaps"], ergebnis["combined_csv"]):
+        assert os.path.isfile(pfad)
+
+    # Zeitreihen zählen nur Zellen mit allen Codes
+    zaehlungen = time_series.build_counts(wuerfel)
+    assert np.nansum(time_series.select(zaehlungen)) == 2
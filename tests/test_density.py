@@ -0,0 +1,84 @@
+"""
+Tests für die Heatmap-Raster: GeoTIFF-Kopf, Byte-Versatz der Bilddaten und
+das Zurücklesen über load_grid.
+"""
+import struct
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+from PIL import Image
+from shapely.geometry import Point
+
+import density
+
+RASTER = {"xmin": 310000.0, "ymax": 5700000.0, "breite": 40, "hoehe": 30, "zelle": 50, "sigma": 150}
+
+
+def _tags(path):
+    """Liest die Tags des ersten IFD als {Tag: (Typ, Anzahl, Wert bzw. Versatz)}."""
+    with open(path, "rb") as f:
+        daten = f.read()
+    assert daten[:4] == b"II*\x00"
+    (ifd,) = struct.unpack_from("<I", daten, 4)
+    (anzahl,) = struct.unpack_from("<H", daten, ifd)
+    tags = {}
+    for i in range(anzahl):
+        tag, typ, zahl, wert = struct.unpack_from("<HHII", daten, ifd + 2 + 12 * i)
+        tags[tag] = (typ, zahl, wert & 0xFFFF if typ == 3 and zahl == 1 else wert)
+    return daten, tags
+
+
+def test_write_geotiff_header(tmp_path):
+    grid = np.arange(RASTER["hoehe"] * RASTER["breite"], dtype=np.float32).reshape(30, 40) / 7
+    path = str(tmp_path / "raster.tif")
+
+    offset = density.write_geotiff(path, grid, RASTER)
+    daten, tags = _tags(path)
+
+    assert tags[256][2] == 40 and tags[257][2] == 30
+    assert tags[258][2] == 32 and tags[339][2] == 3  # Float32
+    assert tags[273][2] == offset
+    assert tags[279][2] == grid.nbytes == len(daten) - offset
+
+    skala = struct.unpack_from("<3d", daten, tags[33550][2])
+    tiepoint = struct.unpack_from("<6d", daten, tags[33922][2])
+    geokeys = struct.unpack_from("<16H", daten, tags[34735][2])
+    assert skala[:2] == (50.0, 50.0)
+    assert tiepoint[3:5] == (RASTER["xmin"], RASTER["ymax"])
+    assert geokeys[-1] == density.EPSG
+
+    # Unabhängiger Leser: Pillow öffnet das Bild als 32-Bit-Float
+    with Image.open(path) as bild:
+        assert bild.mode == "F"
+        np.testing.assert_array_equal(np.asarray(bild), grid)
+
+
+def test_build_heatmaps_load_grid(tmp_path):
+    # Drei Unfälle in einer Rasterzelle (einer mit Rad), ein Jahr ohne Unfälle
+    x, y = RASTER["xmin"] + 20 * 50 + 25, RASTER["ymax"] - 15 * 50 - 25
+    gdf = gpd.GeoDataFrame(
+        pd.DataFrame({"UJAHR": [2023] * 3, **{art: [0, 0, 0] for art in density.VERKEHRSMITTEL}}),
+        geometry=[Point(x, y)] * 3, crs=f"EPSG:{density.EPSG}"
+    )
+    gdf.loc[0, "IstRad"] = 1
+    results = [{"year": 2022, "gdf_filtered": gdf.iloc[:0], "count": 0},
+               {"year": 2023, "gdf_filtered": gdf, "count": 3}]
+
+    index = density.load_index(density.build_heatmaps(results, str(tmp_path), RASTER))
+    gesamt = density.load_grid(index, 2023)
+    rad = density.load_grid(index, 2023, "IstRad")
+
+    assert isinstance(gesamt, np.memmap) and gesamt.shape == (30, 40)
+    assert np.unravel_index(np.argmax(gesamt), gesamt.shape) == (15, 20)
+    # Die Glättung erhält die Summe: Dichte je km² mal Zellfläche ergibt die Anzahl
+    km2 = (RASTER["zelle"] / 1000) ** 2
+    assert abs(gesamt.sum() * km2 - 3) < 1e-3
+    assert abs(rad.sum() * km2 - 1) < 1e-3
+    assert index["skala"]["GESAMT"] == float(gesamt.max())
+    assert not density.load_grid(index, 2022).any()
+
+    # load_grid liest dieselben Werte wie ein GeoTIFF-Leser
+    eintrag = next(e for e in index["dateien"] if e["year"] == 2023 and e["art"] == "GESAMT")
+    with Image.open(eintrag["path"]) as bild:
+        np.testing.assert_array_equal(np.asarray(bild), gesamt)
@@ -0,0 +1,66 @@
+"""
+Tests für das DBSCAN der Unfallschwerpunkte: Vergleich mit einer einfachen
+O(n²)-Referenz über die volle Abstandsmatrix.
+"""
+import numpy as np
+import pytest
+
+import hotspots
+
+
+def _referenz(xs, ys, radius, min_punkte):
+    """DBSCAN über die Abstandsmatrix: (Kernpunkte, Komponente je Kernpunkt, Nachbarmatrix)."""
+    nah = (xs[:, None] - xs[None, :]) ** 2 + (ys[:, None] - ys[None, :]) ** 2 <= radius ** 2
+    kern = nah.sum(axis=1) >= min_punkte
+
+    komponente = np.full(len(xs), -1)
+    for start in np.flatnonzero(kern):
+        if komponente[start] >= 0:
+            continue
+        komponente[start] = start
+        stapel = [start]
+        while stapel:
+            i = stapel.pop()
+            for j in np.flatnonzero(nah[i] & kern & (komponente < 0)):
+                komponente[j] = start
+                stapel.append(j)
+    return kern, komponente, nah
+
+
+def _punkte(seed, n=1500):
+    """Zufällige Punkte: dichte Häufungen, Streuung und Punkte auf einem 5-m-Raster (genau RADIUS entfernt)."""
+    rng = np.random.default_rng(seed)
+    mitten = rng.uniform(0, 2000, size=(12, 2))
+    haufen = mitten[rng.integers(0, len(mitten), n // 2)] + rng.normal(0, 15, size=(n // 2, 2))
+    streuung = rng.uniform(0, 2000, size=(n // 3, 2))
+    raster = rng.integers(0, 60, size=(n - len(haufen) - len(streuung), 2)) * 5.0 + 2500
+    punkte = np.vstack([haufen, streuung, raster]) + [316000, 5690000]
+    return punkte[:, 0], punkte[:, 1]
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+@pytest.mark.parametrize("radius,min_punkte", [(25, 5), (40, 3)])
+def test_dbscan_wie_referenz(seed, radius, min_punkte):
+    xs, ys = _punkte(seed)
+    # Kleine Blöcke, damit die Nachbarsuche über Blockgrenzen hinweg geprüft wird
+    labels = hotspots.dbscan(xs, ys, radius=radius, min_punkte=min_punkte, block=97)
+    kern, komponente, nah = _referenz(xs, ys, radius, min_punkte)
+
+    # Kernpunkte: gleiche Zerlegung in Schwerpunkte, durchnummeriert ab 0
+    assert (labels[kern] >= 0).all()
+    paare = set(zip(komponente[kern], labels[kern]))
+    assert len(paare) == len(set(komponente[kern])) == len(set(labels[kern]))
+    assert set(labels[labels >= 0]) == set(range(len(paare)))
+
+    # Randpunkte gehören zu einem Schwerpunkt eines Kernpunkts im Umkreis, sonst Rauschen
+    for i in np.flatnonzero(~kern):
+        nachbar_labels = set(labels[nah[i] & kern])
+        if nachbar_labels:
+            assert labels[i] == min(nachbar_labels)
+        else:
+            assert labels[i] == -1
+
+
+def test_dbscan_leer_und_einzeln():
+    assert len(hotspots.dbscan(np.empty(0), np.empty(0))) == 0
+    assert hotspots.dbscan(np.array([1.0]), np.array([2.0]), min_punkte=1).tolist() == [0]
@@ -0,0 +1,45 @@
+"""
+Tests für das einheitliche Spaltenschema: ungültige Codes werden zu NA statt
+abgeschnitten oder übergelaufen.
+"""
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+from shapely.geometry import Point
+
+import schema
+
+
+def _gdf(**spalten):
+    anzahl = len(next(iter(spalten.values())))
+    return gpd.GeoDataFrame(
+        spalten, geometry=[Point(12.37, 51.34)] * anzahl, crs="EPSG:4326"
+    )
+
+
+def test_normalize_valid_codes():
+    gdf = _gdf(
+        UJAHR=np.array([2024, 2024], dtype=np.float32),
+        UMONAT=np.array([1, 12], dtype=np.float32),
+    )
+    df = schema.normalize(gdf)
+    assert df["UJAHR"].dtype == np.uint16
+    assert df["UMONAT"].dtype == np.uint8
+    assert df["UMONAT"].tolist() == [1, 12]
+
+
+def test_normalize_invalid_codes_become_na():
+    gdf = _gdf(
+        UJAHR=np.array([2024, 2024, 70000, 2024, 2024], dtype=np.float64),
+        UMONAT=np.array([5, 1.5, -1, 300, np.nan], dtype=np.float32),
+        IstRad=np.array([1, 0, 1, np.inf, 0], dtype=np.float32),
+    )
+    df = schema.normalize(gdf)
+
+    assert df["UMONAT"].dtype == pd.UInt8Dtype()
+    assert df["UMONAT"].isna().tolist() == [False, True, True, True, True]
+    assert df["UMONAT"].iloc[0] == 5
+    assert df["UJAHR"].dtype == pd.UInt16Dtype()
+    assert df["UJAHR"].isna().tolist() == [False, False, True, False, False]
+    assert df["IstRad"].dtype == pd.UInt8Dtype()
+    assert df["IstRad"].isna().tolist() == [False, False, False, True, False]
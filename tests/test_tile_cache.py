@@ -0,0 +1,161 @@
+"""
+Tests für den Kachel-Cache der Basiskarte: Befüllen aus einem Verzeichnis
+(file://) und von einem lokalen HTTP-Server statt tile.openstreetmap.org.
+"""
+import functools
+import json
+import sqlite3
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import tile_cache
+
+MIN_ZOOM, MAX_ZOOM = 10, 12
+
+
+@pytest.fixture
+def bezirke(tmp_path):
+    """Kleines Rechteck in der Leipziger Innenstadt als Bezirksgrenze (WGS84)."""
+    path = tmp_path / "bezirke.json"
+    ring = [[12.36, 51.33], [12.40, 51.33], [12.40, 51.35], [12.36, 51.35], [12.36, 51.33]]
+    path.write_text(json.dumps({"type": "FeatureCollection", "features": [{
+        "type": "Feature", "properties": {"Name": "Mitte"},
+        "geometry": {"type": "Polygon", "coordinates": [ring]},
+    }]}), encoding="utf-8")
+    return str(path)
+
+
+@pytest.fixture
+def kachel_baum(tmp_path, bezirke):
+    """Verzeichnis {z}/{x}/{y}.png mit allen benötigten Kacheln; Inhalt = "z/x/y"."""
+    wurzel = tmp_path / "kacheln"
+    for zoom, x, y in _erwartet(bezirke):
+        datei = wurzel / str(zoom) / str(x) / f"{y}.png"
+        datei.parent.mkdir(parents=True, exist_ok=True)
+        datei.write_bytes(f"{zoom}/{x}/{y}".encode())
+    return wurzel
+
+
+def _erwartet(bezirke):
+    """Kacheln (zoom, x, y), die seed_tiles für die Bezirke laden muss."""
+    return tile_cache.tile_range(tile_cache._bounds(bezirke), MIN_ZOOM, MAX_ZOOM)
+
+
+def _kacheln(path):
+    """Inhalt der MBTiles-Datei: {(zoom, Spalte, TMS-Zeile): Daten}."""
+    with sqlite3.connect(path) as db:
+        kacheln = {(z, x, reihe): bytes(daten) for z, x, reihe, daten
+                   in db.execute("SELECT zoom_level, tile_column, tile_row, tile_data FROM tiles")}
+    db.close()
+    return kacheln
+
+
+def _metadaten(path):
+    with sqlite3.connect(path) as db:
+        metadaten = dict(db.execute("SELECT name, value FROM metadata"))
+    db.close()
+    return metadaten
+
+
+def _pruefen(ergebnis, bezirke, url):
+    """Alle Kacheln mit umgedrehter Zeile (TMS) gespeichert, Metadaten vollständig."""
+    erwartet = _erwartet(bezirke)
+    assert ergebnis["tiles"] == len(erwartet) and not ergebnis["failed"]
+
+    kacheln = _kacheln(ergebnis["path"])
+    assert len(kacheln) == len(erwartet)
+    for zoom, x, y in erwartet:
+        assert kacheln[(zoom, x, 2 ** zoom - 1 - y)] == f"{zoom}/{x}/{y}".encode()
+
+    metadaten = _metadaten(ergebnis["path"])
+    west, sued, ost, nord = (float(wert) for wert in metadaten["bounds"].split(","))
+    assert west < 12.36 < 12.40 < ost and sued < 51.33 < 51.35 < nord
+    assert metadaten["source"] == url
+    assert metadaten["format"] == "png"
+    assert metadaten["type"] == "baselayer"
+    assert (metadaten["minzoom"], metadaten["maxzoom"]) == (str(MIN_ZOOM), str(MAX_ZOOM))
+    assert metadaten["attribution"] == tile_cache.ATTRIBUTION
+    assert tile_cache.qgis_uri(ergebnis["path"]).startswith("type=mbtiles&url=")
+
+
+def test_seed_tiles_file(tmp_path, bezirke, kachel_baum):
+    url = kachel_baum.as_uri() + "/{z}/{x}/{y}.png"
+    processed = str(tmp_path / "processed")
+
+    ergebnis = tile_cache.seed_tiles(bezirke, processed, url=url, min_zoom=MIN_ZOOM, max_zoom=MAX_ZOOM)
+    assert ergebnis["path"] == tile_cache.basemap_path(processed)
+    assert (ergebnis["downloaded"], ergebnis["cached"]) == (ergebnis["tiles"], 0)
+    _pruefen(ergebnis, bezirke, url)
+
+    # Zweiter Lauf: alles schon vorhanden, auch ohne die Quelle
+    for datei in kachel_baum.rglob("*.png"):
+        datei.unlink()
+    ergebnis = tile_cache.seed_tiles(bezirke, processed, url=url, min_zoom=MIN_ZOOM, max_zoom=MAX_ZOOM)
+    assert (ergebnis["downloaded"], ergebnis["cached"]) == (0, ergebnis["tiles"])
+    _pruefen(ergebnis, bezirke, url)
+
+
+class _Handler(SimpleHTTPRequestHandler):
+    """Liefert den Kachelbaum aus und merkt sich die angefragten Pfade."""
+
+    anfragen = []
+
+    def do_GET(self):
+        self.anfragen.append(self.path)
+        super().do_GET()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(kachel_baum):
+    _Handler.anfragen = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(_Handler, directory=str(kachel_baum)))
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_seed_tiles_http(tmp_path, bezirke, kachel_baum, server):
+    url = server + "/{z}/{x}/{y}.png"
+    processed = str(tmp_path / "processed")
+
+    # Eine Kachel fehlt auf dem Server: 404, ohne erneuten Versuch als fehlgeschlagen gemeldet
+    zoom, x, y = _erwartet(bezirke)[-1]
+    fehlend = kachel_baum / str(zoom) / str(x) / f"{y}.png"
+    fehlend.rename(fehlend.with_suffix(".bak"))
+    ergebnis = tile_cache.seed_tiles(bezirke, processed, url=url, min_zoom=MIN_ZOOM, max_zoom=MAX_ZOOM,
+                                     threads=4)
+    assert [fehler[:3] for fehler in ergebnis["failed"]] == [(zoom, x, y)]
+    assert ergebnis["downloaded"] == ergebnis["tiles"] - 1
+    assert len(_Handler.anfragen) == ergebnis["tiles"]
+
+    # Nächster Lauf lädt nur die fehlende Kachel
+    fehlend.with_suffix(".bak").rename(fehlend)
+    _Handler.anfragen = []
+    ergebnis = tile_cache.seed_tiles(bezirke, processed, url=url, min_zoom=MIN_ZOOM, max_zoom=MAX_ZOOM)
+    assert _Handler.anfragen == [f"/{zoom}/{x}/{y}.png"]
+    assert (ergebnis["downloaded"], ergebnis["cached"]) == (1, ergebnis["tiles"] - 1)
+    _pruefen(ergebnis, bezirke, url)
+
+    # Rerun: keine Anfragen mehr
+    _Handler.anfragen = []
+    ergebnis = tile_cache.seed_tiles(bezirke, processed, url=url, min_zoom=MIN_ZOOM, max_zoom=MAX_ZOOM)
+    assert _Handler.anfragen == [] and ergebnis["downloaded"] == 0
+
+
+def test_seed_tiles_neue_url(tmp_path, bezirke, kachel_baum, server):
+    processed = str(tmp_path / "processed")
+    tile_cache.seed_tiles(bezirke, processed, url=kachel_baum.as_uri() + "/{z}/{x}/{y}.png",
+                          min_zoom=MIN_ZOOM, max_zoom=MIN_ZOOM)
+
+    # Andere Kachel-URL: der Cache beginnt neu
+    url = server + "/{z}/{x}/{y}.png"
+    ergebnis = tile_cache.seed_tiles(bezirke, processed, url=url, min_zoom=MIN_ZOOM, max_zoom=MIN_ZOOM)
+    assert ergebnis["cached"] == 0 and ergebnis["downloaded"] == ergebnis["tiles"]
+    assert _metadaten(ergebnis["path"])["source"] == url
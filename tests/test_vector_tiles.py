@@ -0,0 +1,154 @@
+"""
+Tests für die Vektorkacheln: die von Hand kodierten Protobuf-Nachrichten
+werden mit einem kleinen unabhängigen Decoder wieder gelesen.
+"""
+import gzip
+import math
+import sqlite3
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+from shapely.geometry import Point
+
+import vector_tiles
+
+
+def _varint(daten, pos):
+    """Liest einen Protobuf-Varint ab pos; liefert (Wert, neue Position)."""
+    wert, shift = 0, 0
+    while True:
+        byte = daten[pos]
+        pos += 1
+        wert |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            return wert, pos
+
+
+def _felder(daten):
+    """Zerlegt eine Protobuf-Nachricht in (Feldnummer, Wert) – Varints und Längenfelder."""
+    pos, felder = 0, []
+    while pos < len(daten):
+        schluessel, pos = _varint(daten, pos)
+        nummer, typ = schluessel >> 3, schluessel & 7
+        if typ == 0:
+            wert, pos = _varint(daten, pos)
+        elif typ == 2:
+            laenge, pos = _varint(daten, pos)
+            wert, pos = daten[pos:pos + laenge], pos + laenge
+        else:
+            raise AssertionError(f"Unerwarteter wire type {typ}")
+        felder.append((nummer, wert))
+    return felder
+
+
+def _gepackt(daten):
+    """Liest gepackte Varints (tags, geometry)."""
+    pos, werte = 0, []
+    while pos < len(daten):
+        wert, pos = _varint(daten, pos)
+        werte.append(wert)
+    return werte
+
+
+def _decode_layer(daten):
+    """Dekodiert einen MVT-Layer mit Punkt-Features in ein Dict."""
+    layer = {"features": [], "keys": [], "values": []}
+    for nummer, wert in _felder(daten):
+        if nummer == 15:
+            layer["version"] = wert
+        elif nummer == 1:
+            layer["name"] = wert.decode("utf-8")
+        elif nummer == 2:
+            layer["features"].append(_felder(wert))
+        elif nummer == 3:
+            layer["keys"].append(wert.decode("utf-8"))
+        elif nummer == 4:
+            ((typ, zahl),) = _felder(wert)
+            assert typ == 5  # uint_value
+            layer["values"].append(zahl)
+        elif nummer == 5:
+            layer["extent"] = wert
+
+    punkte = []
+    for feature in layer["features"]:
+        felder = dict(feature)
+        assert felder[3] == 1  # POINT
+        tags = _gepackt(felder[2])
+        befehl, zx, zy = _gepackt(felder[4])
+        assert befehl == 9  # MoveTo, einmal
+        x, y = (zx >> 1) ^ -(zx & 1), (zy >> 1) ^ -(zy & 1)
+        attribute = {layer["keys"][k]: layer["values"][v] for k, v in zip(tags[::2], tags[1::2])}
+        punkte.append({"x": x, "y": y, **attribute})
+    layer["punkte"] = punkte
+    return layer
+
+
+def test_encode_layer_roundtrip():
+    lx = np.array([0, 4095, -64, 2048])
+    ly = np.array([0, 17, 4100, 2048])
+    attribute = {
+        "UJAHR": np.array([2020, 2021, 2020, 2024]),
+        "ANZAHL": np.array([1, 300, 1, 2]),
+        "UKATEGORIE": np.array([3, 1, 2, 3]),
+    }
+
+    layer = _decode_layer(vector_tiles._encode_layer(lx, ly, attribute))
+
+    assert layer["version"] == 2
+    assert layer["name"] == vector_tiles.LAYER_NAME
+    assert layer["extent"] == vector_tiles.EXTENT
+    assert layer["keys"] == vector_tiles.ATTRIBUTE
+    # Gleiche Werte werden nur einmal in der Werteliste gespeichert
+    assert len(layer["values"]) == len(set(layer["values"]))
+    assert layer["punkte"] == [
+        {"x": int(lx[i]), "y": int(ly[i]), **{name: int(werte[i]) for name, werte in attribute.items()}}
+        for i in range(len(lx))
+    ]
+
+
+def _kachel(lon, lat, zoom):
+    """XYZ-Kachel und Lage darin (in EXTENT-Einheiten) eines Punktes in Grad."""
+    n = 2 ** zoom
+    px = (lon + 180.0) / 360.0 * n
+    py = (1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n
+    return int(px), int(py), (px % 1) * vector_tiles.EXTENT, (py % 1) * vector_tiles.EXTENT
+
+
+def _lesen(path, zoom, x, y):
+    """Liest eine Kachel (XYZ) aus der MBTiles-Datei und dekodiert ihren Layer."""
+    with sqlite3.connect(path) as db:
+        (daten,) = db.execute(
+            "SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+            (zoom, x, 2 ** zoom - 1 - y)).fetchone()
+    db.close()
+    ((nummer, layer),) = _felder(gzip.decompress(daten))
+    assert nummer == 3
+    return _decode_layer(layer)
+
+
+def test_build_tiles(tmp_path):
+    # Zwei Unfälle am Augustusplatz (wenige Meter auseinander), einer in Grünau
+    lonlat = [(12.3810, 51.3397), (12.3811, 51.3397), (12.2880, 51.3150)]
+    gdf = gpd.GeoDataFrame(
+        pd.DataFrame({"UJAHR": [2023, 2023, 2024], "UKATEGORIE": [3, 2, 1]}),
+        geometry=[Point(lon, lat) for lon, lat in lonlat], crs="EPSG:4326"
+    ).to_crs(epsg=25833)
+
+    path = vector_tiles.build_tiles([gdf], str(tmp_path), min_zoom=12, max_zoom=16)
+
+    # Höchste Zoomstufe: jeder Unfall einzeln an seiner Position
+    for (lon, lat), jahr, kategorie in zip(lonlat, gdf["UJAHR"], gdf["UKATEGORIE"]):
+        x, y, lx, ly = _kachel(lon, lat, 16)
+        (punkt,) = [p for p in _lesen(path, 16, x, y)["punkte"]
+                    if abs(p["x"] - lx) <= 1 and abs(p["y"] - ly) <= 1]
+        assert (punkt["UJAHR"], punkt["ANZAHL"], punkt["UKATEGORIE"]) == (jahr, 1, kategorie)
+
+    # Zoomstufe 12: die beiden nahen Unfälle sind zusammengefasst (schwerste Kategorie)
+    x, y, _, _ = _kachel(*lonlat[0], 12)
+    punkte = {p["UJAHR"]: p for p in _lesen(path, 12, x, y)["punkte"]}
+    assert punkte[2023]["ANZAHL"] == 2 and punkte[2023]["UKATEGORIE"] == 2
+
+    west, sued, ost, nord = vector_tiles.tiles_extent(path)
+    assert west < ost and sued < nord